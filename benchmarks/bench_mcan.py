@@ -0,0 +1,274 @@
+""" bench_mcan.py
+    Benchmarks fuer die wichtigsten Pfade des Moduls mcan:
+    Dekodierung (Text, McanRecord, spaltenweise), Erstellung von
+    Datenrahmen (frame, response, writeInto), Hash und Rueckmelder.
+
+    Gemessen werden Datenrahmen pro Sekunde, das Verhaeltnis dazu zu einer
+    Referenzschleife in reinem Python (rechnerunabhaengiger Vergleichswert)
+    und der Speicher je Aufruf (tracemalloc): allocBytes ist der
+    Hoechstwert waehrend eines einzelnen Aufrufs, retainedBytes und
+    retainedBlocks sind der Unterschied zweier Snapshots vor und nach
+    vielen Aufrufen, geteilt durch die Anzahl der Aufrufe.
+    Als Verkehr dienen die Datenrahmen aus tests/testdata.
+
+    python benchmarks/bench_mcan.py                 Messen und ausgeben
+    python benchmarks/bench_mcan.py --save          als Baseline speichern
+    python benchmarks/bench_mcan.py --check         mit Baseline vergleichen,
+                                                    Exit-Code 1 bei Regression
+
+    Die Baseline enthaelt nur die Verhaeltnisse zur Referenzschleife und
+    den Speicher, nicht die absoluten Datenrahmen pro Sekunde.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mcan import mcanbatch, mcancommand, mcandecode, mcanhash, mcanlog, states
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOGFILE = os.path.join(HERE, '..', 'tests', 'testdata', 'mcan-20201216113413.log')
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+def loadTraffic():
+  with mcanlog.McanLogReader(LOGFILE) as reader:
+    return [bytes(frame) for _, frame in reader.frames()]
+
+# -----------------------------------------------------------------------------
+# Die einzelnen Pfade: jeweils eine Funktion, die n Aufrufe ausfuehrt
+# -----------------------------------------------------------------------------
+def benchDecodeText(traffic, n):
+  count = len(traffic)
+  for i in range(n):
+    mcandecode.McanDecode(traffic[i % count]).decode()
+
+def benchDecodeRecord(traffic, n):
+  count = len(traffic)
+  for i in range(n):
+    mcandecode.McanDecode(traffic[i % count]).decode(record=True)
+
+def benchDecodeBatch(traffic, n):
+  buf = b''.join(traffic)
+  repeat = max(n // len(traffic), 1)
+  mcanbatch.decodeFrames(buf * repeat)
+
+def benchCommandFrame(traffic, n):
+  cmd = mcancommand.McanCommand(0xcb7f)
+  cmd.setCommand(0x22)
+  for i in range(n):
+    cmd.setTrackState(0, i & 0xffff, 1, 0)
+    cmd.frame
+
+def benchCommandResponse(traffic, n):
+  cmd = mcancommand.McanCommand(0xcb7f)
+  cmd.setCommand(0x22)
+  for i in range(n):
+    cmd.setTrackState(0, i & 0xffff, 1, 0)
+    cmd.response
+
+def benchCommandWriteInto(traffic, n):
+  buf = bytearray(13)
+  template = mcancommand.McanTemplate.get(0xcb7f, 0x22)
+  for i in range(n):
+    template.writeTrackState(buf, 0, 0, i & 0xffff, 1, 0)
+
+def benchHash(traffic, n):
+  for i in range(n):
+    mcanhash.McanHash(0x43539A40 + (i & 0xff))
+
+def benchChangedStates(traffic, n):
+  st = states.States()
+  for i in range(n):
+    st.setStateBits(i & 0xffff)
+    st.changedStates
+    st.setRecentToCurrent()
+
+def benchStateBank(traffic, n):
+  bank = states.StateBank(64)
+  for i in range(n):
+    bank.setWord((i & 63) + 1, i & 0xffff)
+    bank.changedStates
+    bank.setRecentToCurrent()
+
+BENCHMARKS = ( ('decode.text',      benchDecodeText,       20000)
+             , ('decode.record',    benchDecodeRecord,     50000)
+             , ('decode.batch',     benchDecodeBatch,     500000)
+             , ('command.frame',    benchCommandFrame,     50000)
+             , ('command.response', benchCommandResponse,  50000)
+             , ('command.writeInto',benchCommandWriteInto, 100000)
+             , ('hash',             benchHash,            100000)
+             , ('states.changed',   benchChangedStates,    50000)
+             , ('statebank.changed',benchStateBank,        50000)
+             )
+
+def referenceLoop(traffic, n):
+  """ Vergleichsschleife: liest den Hash aus jedem Datenrahmen
+  """
+  count = len(traffic)
+  total = 0
+  for i in range(n):
+    frame = traffic[i % count]
+    total += (frame[2] << 8) | frame[3]
+  return total
+
+REFERENCE_CALLS = 200000
+
+# -----------------------------------------------------------------------------
+# Messung
+# -----------------------------------------------------------------------------
+# Anzahl der Aufrufe fuer die Speichermessung
+ALLOCCALLS = 200
+
+def rate(func, traffic, n):
+  """ Liefert die Aufrufe pro Sekunde eines Durchlaufs
+  """
+  start = time.perf_counter()
+  func(traffic, n)
+  return n / (time.perf_counter() - start)
+
+def relativeFps(func, traffic, n, referenceN, repeat=7):
+  """ Misst abwechselnd den Pfad und die Referenzschleife, damit beide
+      unter derselben Last laufen. Liefert (fps, relative): den schnellsten
+      Durchlauf und den Median der Verhaeltnisse je Runde.
+  """
+  best = 0
+  ratios = []
+  for _ in range(repeat):
+    referenceFps = rate(referenceLoop, traffic, referenceN)
+    fps = rate(func, traffic, n)
+    best = max(best, fps)
+    ratios.append(fps / referenceFps)
+  ratios.sort()
+  return best, ratios[len(ratios) // 2]
+
+def benchNothing(traffic, n):
+  """ leerer Pfad fuer den Abgleich der Speichermessung
+  """
+  pass
+
+def _callPeaks(func, args):
+  """ Liefert die Summe der Hoechstwerte je Aufruf func(arg, 1)
+      (tracemalloc muss laufen)
+  """
+  peaks = 0
+  for arg in args:
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func(arg, 1)
+    peaks += tracemalloc.get_traced_memory()[1] - base
+  return peaks
+
+def measureAlloc(func, traffic, calls=ALLOCCALLS):
+  """ Liefert (allocBytes, retainedBytes, retainedBlocks) je Aufruf.
+      allocBytes ist ohne den Anteil der Messschleife (Abgleich mit
+      benchNothing).
+  """
+  traceFilter = (tracemalloc.Filter(False, tracemalloc.__file__),)
+  # die Argumente vor der Messung anlegen
+  args = [traffic[i % len(traffic):] for i in range(calls)]
+  # Aufwaermen ausserhalb der Messung (nachgeladene Namen, Caches des Interpreters)
+  func(traffic, calls)
+  tracemalloc.start()
+  overhead = _callPeaks(benchNothing, args)
+  peaks = _callPeaks(func, args)
+  before = tracemalloc.take_snapshot()
+  func(traffic, calls)
+  after = tracemalloc.take_snapshot()
+  tracemalloc.stop()
+  # erst nach der Messung filtern: der Filter legt selbst Speicher an (re-Cache)
+  diff = after.filter_traces(traceFilter).compare_to(before.filter_traces(traceFilter), 'filename')
+  retainedBytes = sum(stat.size_diff for stat in diff)
+  retainedBlocks = sum(stat.count_diff for stat in diff)
+  return ( max(round((peaks - overhead) / calls), 0)
+         , round(retainedBytes / calls, 2), round(retainedBlocks / calls, 2))
+
+def measure(func, traffic, n, referenceN):
+  """ Liefert {'fps', 'relative', 'allocBytes', 'retainedBytes',
+      'retainedBlocks'} eines Pfades
+  """
+  fps, relative = relativeFps(func, traffic, n, referenceN)
+  allocBytes, retainedBytes, retainedBlocks = measureAlloc(func, traffic)
+  return { 'fps'           : round(fps)
+         , 'relative'      : round(relative, 4)
+         , 'allocBytes'    : allocBytes
+         , 'retainedBytes' : retainedBytes
+         , 'retainedBlocks': retainedBlocks
+         }
+
+def runAll(names=None, scale=1.0):
+  traffic = loadTraffic()
+  referenceN = max(int(REFERENCE_CALLS * scale), 1)
+  results = {}
+  for name, func, n in BENCHMARKS:
+    if names and name not in names:
+      continue
+    results[name] = measure(func, traffic, max(int(n * scale), 1), referenceN)
+  return results
+
+def baselineOf(results):
+  """ Liefert die rechnerunabhaengigen Werte fuer die Baseline
+  """
+  return {name: {key: value for key, value in result.items() if key != 'fps'}
+          for name, result in results.items()}
+
+def compare(results, baseline, threshold):
+  """ Liefert die Liste der Regressionen als Text
+  """
+  regressions = []
+  for name, result in sorted(results.items()):
+    base = baseline.get(name)
+    if base is None:
+      continue
+    if result['relative'] < base['relative'] * (1 - threshold):
+      regressions.append('{}: {} x reference < baseline {} x reference'.format(
+                           name, result['relative'], base['relative']))
+    # kleine Abweichungen des Speichers (z.B. durch den Interpreter) ignorieren
+    if result['allocBytes'] > base['allocBytes'] * (1 + threshold) + 64:
+      regressions.append('{}: {} bytes per call > baseline {} bytes'.format(
+                           name, result['allocBytes'], base['allocBytes']))
+    if result['retainedBytes'] > base['retainedBytes'] + 8:
+      regressions.append('{}: {} retained bytes per call > baseline {} bytes'.format(
+                           name, result['retainedBytes'], base['retainedBytes']))
+  return regressions
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='mcan benchmarks')
+  parser.add_argument('names', nargs='*', help='only these benchmarks')
+  parser.add_argument('--baseline', default=BASELINE)
+  parser.add_argument('--save', action='store_true', help='store results as baseline')
+  parser.add_argument('--check', action='store_true', help='fail on regression')
+  parser.add_argument('--threshold', type=float, default=0.25)
+  parser.add_argument('--scale', type=float, default=1.0, help='scale the number of calls')
+  args = parser.parse_args(argv)
+
+  results = runAll(args.names, args.scale)
+  for name, result in sorted(results.items()):
+    print('{:20} {:>12} fps {:>9.3f} x ref {:>8} bytes/call {:>8} retained'.format(
+            name, result['fps'], result['relative'], result['allocBytes'], result['retainedBytes']))
+  if args.save:
+    with open(args.baseline, 'w') as baselineFile:
+      json.dump(baselineOf(results), baselineFile, indent=2, sort_keys=True)
+      baselineFile.write('\n')
+  if args.check:
+    with open(args.baseline) as baselineFile:
+      regressions = compare(results, json.load(baselineFile), args.threshold)
+    for regression in regressions:
+      print('REGRESSION ' + regression)
+    return 1 if regressions else 0
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
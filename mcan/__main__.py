@@ -0,0 +1,189 @@
+""" __main__.py
+    Kommandozeile:
+      python -m mcan decode [datei] [--format text|jsonl|csv] [-o ausgabe]
+                            [--command 0x30] [--hash ef1d]
+                            [--start 'dd.mm.yyyy hh:mm:ss'] [--end ...]
+    Die Eingabe ist ein Mitschnitt im Text- oder Binaerformat (mcancapture),
+    ohne Datei bzw. mit '-' wird von stdin gelesen. Die Zeit wird fuer beide
+    Formate als Sekunden (float) ausgegeben.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from .mcanmsgarray import PRIO, CMDANDRESP, DLC, D0
+from .mcandecode import McanDecode, McanRecord
+from .mcancapture import McanCaptureReader, MAGIC, streamFrames
+from .mcanlog import McanLogReader, parseLines, parseTimestamp, formatTimestamp
+from .mcanparallel import isCapture
+
+# Anzahl der Zeilen, die gesammelt geschrieben werden
+_WRITECHUNK = 1024
+
+_CSVHEADER = ('time', 'prio', 'command', 'name', 'response', 'hash', 'dlc', 'data')
+
+# -----------------------------------------------------------------------------
+# Argumente
+# -----------------------------------------------------------------------------
+def _command(text):
+  number = McanDecode.commandNumber(text)
+  if number is not None:
+    return number
+  try:
+    return int(text, 16) & 0xfe
+  except ValueError:
+    raise argparse.ArgumentTypeError('unknown command: {}'.format(text))
+
+def _hash(text):
+  try:
+    return int(text.replace(' ', ''), 16)
+  except ValueError:
+    raise argparse.ArgumentTypeError('invalid hash: {}'.format(text))
+
+def _time(text):
+  try:
+    return float(text)
+  except ValueError:
+    pass
+  try:
+    return parseTimestamp(text)
+  except (ValueError, IndexError):
+    raise argparse.ArgumentTypeError('invalid time: {}'.format(text))
+
+def _parser():
+  parser = argparse.ArgumentParser(prog='python -m mcan')
+  commands = parser.add_subparsers(dest='action', required=True)
+  decode = commands.add_parser('decode', help='decode a capture (text or binary)')
+  decode.add_argument('input', nargs='?', default='-', help="capture file, '-' for stdin")
+  decode.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+  decode.add_argument('-f', '--format', choices=('text', 'jsonl', 'csv'), default='text')
+  decode.add_argument('-c', '--command', type=_command, action='append'
+                     , help='command number (hex) or name, can be repeated')
+  decode.add_argument('--hash', type=_hash, action='append', help='sender hash (hex), can be repeated')
+  decode.add_argument('--start', type=_time, help="'dd.mm.yyyy hh:mm:ss' or seconds")
+  decode.add_argument('--end', type=_time, help="'dd.mm.yyyy hh:mm:ss' or seconds (exclusive)")
+  return parser
+
+# -----------------------------------------------------------------------------
+# Eingabe
+# -----------------------------------------------------------------------------
+def _streamFrames(stream, start, end, command):
+  head = stream.peek(len(MAGIC))[:len(MAGIC)] if hasattr(stream, 'peek') else b''
+  if head == MAGIC:
+    return streamFrames(stream, start, end, command)
+  return parseLines(stream, start, end)
+
+def _fileFrames(path, start, end, command):
+  if isCapture(path):
+    with McanCaptureReader(path) as reader:
+      for timestamp, frame in reader.frames(start, end, command):
+        yield (timestamp, bytes(frame))
+  else:
+    with McanLogReader(path) as reader:
+      yield from reader.frames(start, end)
+
+def _frames(args):
+  command = args.command[0] if args.command and len(args.command) == 1 else None
+  if args.input == '-':
+    frames = _streamFrames(sys.stdin.buffer, args.start, args.end, command)
+  else:
+    frames = _fileFrames(args.input, args.start, args.end, command)
+  commands = None if args.command is None else set(args.command)
+  hashes = None if args.hash is None else set(args.hash)
+  for timestamp, frame in frames:
+    if commands is not None and frame[CMDANDRESP] & 0xfe not in commands:
+      continue
+    if hashes is not None and (frame[2] << 8) | frame[3] not in hashes:
+      continue
+    # Textformat: int, Binaerformat: float
+    yield (float(timestamp), frame)
+
+# -----------------------------------------------------------------------------
+# Ausgabe
+# -----------------------------------------------------------------------------
+def _textLines(frames):
+  for timestamp, frame in frames:
+    yield formatTimestamp(timestamp) + '\n' + McanDecode(bytearray(frame)).decode() + '\n'
+
+def _jsonLines(frames):
+  for timestamp, frame in frames:
+    rec = McanDecode(bytearray(frame)).decode(record=True)
+    item = { 'time': timestamp
+           , 'frame': bytes(frame).hex()
+           , 'name': McanDecode.commandName(rec.command)
+           , 'hash': rec.frame.getHash()
+           }
+    for name in McanRecord.__slots__[1:]:
+      value = getattr(rec, name)
+      if value is not None:
+        item[name] = value
+    yield json.dumps(item) + '\n'
+
+def _csvRows(frames):
+  yield _CSVHEADER
+  for timestamp, frame in frames:
+    command = frame[CMDANDRESP] & 0xfe
+    yield ( timestamp, frame[PRIO], command, McanDecode.commandName(command) or ''
+          , frame[CMDANDRESP] & 0x01, '{:02x}{:02x}'.format(frame[2], frame[3])
+          , frame[DLC], bytes(frame[D0:D0+8]).hex())
+
+def _write(out, lines):
+  chunk = []
+  for line in lines:
+    chunk.append(line)
+    if len(chunk) == _WRITECHUNK:
+      out.writelines(chunk)
+      chunk = []
+  out.writelines(chunk)
+
+def decode(args, out):
+  """ Dekodiert die Eingabe nach args in die Textdatei out
+  """
+  frames = _frames(args)
+  if args.format == 'csv':
+    writer = csv.writer(out, lineterminator='\n')
+    rows = _csvRows(frames)
+    chunk = []
+    for row in rows:
+      chunk.append(row)
+      if len(chunk) == _WRITECHUNK:
+        writer.writerows(chunk)
+        chunk = []
+    writer.writerows(chunk)
+  elif args.format == 'jsonl':
+    _write(out, _jsonLines(frames))
+  else:
+    _write(out, _textLines(frames))
+
+def main(argv=None):
+  args = _parser().parse_args(argv)
+  try:
+    if args.output == '-':
+      decode(args, sys.stdout)
+      sys.stdout.flush()
+    else:
+      with open(args.output, 'w', buffering=1 << 16, newline='') as out:
+        decode(args, out)
+  except BrokenPipeError:
+    # Ausgabe z.B. an head weitergeleitet: der Rest von stdout geht nach
+    # devnull, damit das Schliessen beim Beenden keinen Fehler mehr meldet
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 1
+  except (OSError, ValueError) as exc:
+    print('mcan: {}'.format(exc), file=sys.stderr)
+    return 2
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
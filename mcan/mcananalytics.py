@@ -0,0 +1,228 @@
+""" mcananalytics.py
+    Auswertungen ueber die Spalten eines Mitschnitts (McanColumns mit
+    timestamps in ms, z.B. aus mcanparallel.decodeParallel() oder
+    McanLogReader.batches() und mcanbatch.decodeFrames()):
+    Buslast in gleitenden Zeitfenstern, Datenrahmen je Befehl und je
+    Absender-Hash, Antwortzeiten und die aktivsten Absender.
+    Sind die Spalten numpy-Arrays, wird mit numpy gerechnet, sonst mit
+    array.array und den Funktionen der Standardbibliothek.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from .mcandecode import McanDecode
+
+# Bitrate des CAN-Busses der CS2 in bit/s
+BITRATE = 250000
+
+# Bits eines Datenrahmens mit 29-bit-Kennung ohne Stopfbits:
+# Rahmen ohne Daten 67 Bits, je Datenbyte 8 Bits
+_FRAMEBITS = 67
+
+# obere Grenzen der Klassen fuer Antwortzeiten in ms, die letzte Klasse
+# nimmt alle groesseren Werte auf
+LATENCY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+def _isNumpy(column):
+  return numpy is not None and isinstance(column, numpy.ndarray)
+
+def _commandLabel(command):
+  name = McanDecode.commandName(command)
+  if name is None:
+    return 'unknown command ({:02x})'.format(command)
+  return name
+
+# -----------------------------------------------------------------------------
+# Buslast
+# -----------------------------------------------------------------------------
+def busLoad(columns, window=1000, step=None, bitrate=BITRATE):
+  """ Liefert (starts, counts, loads) fuer die Zeitfenster
+      [start, start+window) im Abstand step (ms, Vorgabe: window):
+      Anzahl der Datenrahmen und Anteil der Bits an der Bitrate.
+  """
+  if step is None:
+    step = window
+  capacity = bitrate * window / 1000
+  timestamps = columns.timestamps
+  if _isNumpy(timestamps):
+    if len(timestamps) == 0:
+      return (numpy.zeros(0, 'i8'), numpy.zeros(0, 'i8'), numpy.zeros(0))
+    bits = numpy.zeros(len(timestamps) + 1, 'i8')
+    numpy.cumsum(numpy.asarray(columns.dlc, 'i8') * 8 + _FRAMEBITS, out=bits[1:])
+    starts = numpy.arange(timestamps[0], timestamps[-1] + 1, step, dtype='i8')
+    first = numpy.searchsorted(timestamps, starts, 'left')
+    last = numpy.searchsorted(timestamps, starts + window, 'left')
+    return (starts, last - first, (bits[last] - bits[first]) / capacity)
+  starts = array('q')
+  counts = array('q')
+  loads = array('d')
+  if len(timestamps) == 0:
+    return (starts, counts, loads)
+  bits = [0]
+  bits.extend(accumulate(dlc * 8 + _FRAMEBITS for dlc in columns.dlc))
+  for start in range(timestamps[0], timestamps[-1] + 1, step):
+    first = bisect_left(timestamps, start)
+    last = bisect_left(timestamps, start + window, first)
+    starts.append(start)
+    counts.append(last - first)
+    loads.append((bits[last] - bits[first]) / capacity)
+  return (starts, counts, loads)
+
+# -----------------------------------------------------------------------------
+# Zaehler
+# -----------------------------------------------------------------------------
+def commandCounts(columns, response=None):
+  """ Liefert {Name des Befehls: Anzahl}, mit response=0/1 nur fuer
+      Befehle bzw. Antworten
+  """
+  command = columns.command
+  if _isNumpy(command):
+    if response is not None:
+      command = command[columns.response == response]
+    counts = numpy.bincount(command, minlength=256)
+    items = ((int(cmd), int(counts[cmd])) for cmd in numpy.flatnonzero(counts))
+  else:
+    if response is not None:
+      command = [cmd for cmd, resp in zip(command, columns.response) if resp == response]
+    items = sorted(Counter(command).items())
+  return {_commandLabel(cmd): count for cmd, count in items}
+
+def hashCounts(columns):
+  """ Liefert {hash: Anzahl der Datenrahmen}
+  """
+  if _isNumpy(columns.hash):
+    counts = numpy.bincount(columns.hash, minlength=65536)
+    return {int(mcanHash): int(counts[mcanHash]) for mcanHash in numpy.flatnonzero(counts)}
+  return dict(Counter(columns.hash))
+
+def topTalkers(columns, n=10):
+  """ Liefert die n Absender-Hashes mit den meisten Datenrahmen als
+      Liste von (hash, Anzahl), absteigend sortiert
+  """
+  counts = hashCounts(columns)
+  return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+# -----------------------------------------------------------------------------
+# Antwortzeiten
+# -----------------------------------------------------------------------------
+def responseLatencies(columns, commands=None):
+  """ Liefert die Zeiten (ms) zwischen einer Anfrage und den zugehoerigen
+      Antworten als array in der Reihenfolge der Antworten. Zugeordnet wird
+      ueber (command, uid); Anfragen ohne uid (dlc < 4, z.B. Member ping)
+      gelten fuer alle Antworten mit dem Befehl bis zur naechsten Anfrage.
+  """
+  if _isNumpy(columns.timestamps):
+    return _responseLatenciesNumpy(columns, commands)
+  rows = zip( _toList(columns.timestamps), _toList(columns.command)
+            , _toList(columns.response), _toList(columns.dlc), _toList(columns.dataH))
+  pending = {}
+  latencies = array('q')
+  for timestamp, command, response, dlc, dataH in rows:
+    if commands is not None and command not in commands:
+      continue
+    uid = dataH if dlc >= 4 else None
+    if not response:
+      pending[(command, uid)] = timestamp
+      continue
+    requestTime = pending.pop((command, uid), None)
+    if requestTime is None:
+      requestTime = pending.get((command, None))
+    if requestTime is not None:
+      latencies.append(timestamp - requestTime)
+  return latencies
+
+def _lastBefore(keys, search, groups, size):
+  """ Liefert fuer jeden Schluessel group*size+index aus search die Position
+      des letzten kleineren Eintrags aus keys (sortiert) derselben Gruppe
+      oder -1
+  """
+  if not len(keys):
+    return numpy.full(len(search), -1)
+  pos = numpy.searchsorted(keys, search, 'left') - 1
+  found = keys[numpy.maximum(pos, 0)]
+  return numpy.where((pos >= 0) & (found // size == groups), found % size, -1)
+
+def _responseLatenciesNumpy(columns, commands):
+  """ responseLatencies() mit numpy: sortiert nach (command, uid, Position),
+      eine Antwort gehoert zur Anfrage direkt davor; sonst gilt die letzte
+      Anfrage ohne uid, sofern keine Antwort ohne uid sie schon verbraucht hat.
+  """
+  command = numpy.asarray(columns.command, 'i8')
+  response = numpy.asarray(columns.response) != 0
+  uid = numpy.where( numpy.asarray(columns.dlc) >= 4
+                   , numpy.asarray(columns.dataH, 'i8'), -1)
+  timestamps = numpy.asarray(columns.timestamps, 'i8')
+  if commands is not None:
+    keep = numpy.isin(command, list(commands))
+    command, response, uid, timestamps = command[keep], response[keep], uid[keep], timestamps[keep]
+  size = len(command)
+  positions = numpy.arange(size)
+  requestOf = numpy.full(size, -1)
+  # Anfrage mit demselben (command, uid) direkt vor der Antwort
+  order = numpy.lexsort((positions, uid, command))
+  previous, current = order[:-1], order[1:]
+  exact = ( (command[previous] == command[current]) & (uid[previous] == uid[current])
+          & ~response[previous] & response[current])
+  requestOf[current[exact]] = previous[exact]
+  # sonst die letzte noch nicht verbrauchte Anfrage ohne uid
+  broadcast = uid == -1
+  fallback = numpy.flatnonzero(response & (requestOf < 0) & ~broadcast)
+  if len(fallback):
+    requests = numpy.sort((command * size + positions)[broadcast & ~response])
+    consumed = numpy.sort((command * size + positions)[broadcast & response])
+    search = command[fallback] * size + fallback
+    request = _lastBefore(requests, search, command[fallback], size)
+    consumer = _lastBefore(consumed, search, command[fallback], size)
+    valid = request > consumer
+    requestOf[fallback[valid]] = request[valid]
+  answered = numpy.flatnonzero(requestOf >= 0)
+  return timestamps[answered] - timestamps[requestOf[answered]]
+
+def _toList(column):
+  return column.tolist()
+
+def latencyHistogram(latencies, buckets=LATENCY_BUCKETS):
+  """ Liefert die Anzahl der Antwortzeiten je Klasse (<= Grenze), die
+      letzte Klasse nimmt alle groesseren Werte auf
+  """
+  if _isNumpy(latencies):
+    index = numpy.searchsorted(numpy.asarray(buckets), latencies, 'left')
+    return numpy.bincount(index, minlength=len(buckets) + 1).tolist()
+  counts = [0] * (len(buckets) + 1)
+  for latency in latencies:
+    counts[bisect_left(buckets, latency)] += 1
+  return counts
+
+# -----------------------------------------------------------------------------
+# Zusammenfassung
+# -----------------------------------------------------------------------------
+def summary(columns, window=1000, n=10):
+  """ Liefert alle Auswertungen als dict
+  """
+  starts, counts, loads = busLoad(columns, window)
+  latencies = responseLatencies(columns)
+  return { 'frames'    : len(columns)
+         , 'maxLoad'   : float(max(loads)) if len(loads) else 0.0
+         , 'meanLoad'  : float(sum(loads) / len(loads)) if len(loads) else 0.0
+         , 'maxFrames' : int(max(counts)) if len(counts) else 0
+         , 'commands'  : commandCounts(columns)
+         , 'hashes'    : hashCounts(columns)
+         , 'topTalkers': topTalkers(columns, n)
+         , 'latencyMs' : latencyHistogram(latencies)
+         }
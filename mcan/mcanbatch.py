@@ -0,0 +1,165 @@
+""" mcanbatch.py
+    Spaltenweise Dekodierung vieler can-Datenrahmen, die lueckenlos
+    hintereinander in einem Puffer liegen (je 13 Bytes).
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from array import array
+from sys import byteorder
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from .mcanmsgarray import MSGLEN, PRIO, CMDANDRESP, HASHH, HASHL, DLC, D0, D4
+
+# typecode fuer vorzeichenlose 32-bit Werte im array-Modul
+_U32 = 'I' if array('I').itemsize == 4 else 'L'
+
+# Spalten mit typecode (array) und dtype (numpy), jeweils native Bytefolge
+_COLUMNS = ( ('prio',       'B',  'u1')
+           , ('command',    'B',  'u1')
+           , ('response',   'B',  'u1')
+           , ('hash',       'H',  'u2')
+           , ('dlc',        'B',  'u1')
+           , ('dataH',      _U32, 'u4')
+           , ('dataL',      _U32, 'u4')
+           , ('timestamps', 'q',  'i8')
+           )
+
+# Uebersetzungstabellen fuer das cmdAndResp-Byte
+_CMDTABLE  = bytes(i & 0xfe for i in range(256))
+_RESPTABLE = bytes(i & 0x01 for i in range(256))
+
+if numpy is not None:
+  _DTYPE = numpy.dtype([ ('prio',       'u1')
+                       , ('cmdAndResp', 'u1')
+                       , ('hash',       '>u2')
+                       , ('dlc',        'u1')
+                       , ('dataH',      '>u4')
+                       , ('dataL',      '>u4')
+                       ])
+
+# -----------------------------------------------------------------------------
+# Klasse fuer spaltenweise abgelegte can-Datenrahmen
+# -----------------------------------------------------------------------------
+class McanColumns():
+  """ Spalten der dekodierten Datenrahmen.
+      Jede Spalte ist ein numpy-Array bzw. ein array.array gleicher Laenge:
+        prio, command (ohne Antwortbit), response (0/1), hash, dlc,
+        dataH (d0-d3 als 32-bit Wert) und dataL (d4-d7 als 32-bit Wert).
+      timestamps (ms) ist optional (z.B. beim Einlesen von Mitschnitten).
+  """
+  def __init__(self, prio, command, response, hash, dlc, dataH, dataL
+              , timestamps=None):
+    self.prio = prio
+    self.command = command
+    self.response = response
+    self.hash = hash
+    self.dlc = dlc
+    self.dataH = dataH
+    self.dataL = dataL
+    self.timestamps = timestamps
+
+  def __len__(self):
+    return len(self.command)
+
+  def row(self, i):
+    """ Liefert die Werte eines Datenrahmens als tuple
+        (prio, command, response, hash, dlc, dataH, dataL)
+    """
+    return ( int(self.prio[i]), int(self.command[i]), int(self.response[i])
+           , int(self.hash[i]), int(self.dlc[i])
+           , int(self.dataH[i]), int(self.dataL[i])
+           )
+
+  def toBytes(self):
+    """ Liefert die Spalten als tuple von bytes (fuer die Uebertragung
+        zwischen Prozessen, vgl. fromBytes()).
+    """
+    parts = []
+    for name, _, _ in _COLUMNS:
+      column = getattr(self, name)
+      parts.append(None if column is None else bytes(column))
+    return tuple(parts)
+
+  @classmethod
+  def fromBytes(cls, parts, useNumpy=True):
+    """ Erstellt die Spalten aus einer Liste von Ergebnissen von toBytes(),
+        die Teile werden in der gegebenen Reihenfolge aneinandergehaengt.
+    """
+    columns = []
+    for i, (_, typecode, dtype) in enumerate(_COLUMNS):
+      if any(part[i] is None for part in parts):
+        columns.append(None)
+        continue
+      raw = b''.join(part[i] for part in parts)
+      if numpy is not None and useNumpy:
+        columns.append(numpy.frombuffer(raw, dtype=numpy.dtype(dtype)))
+      else:
+        column = array(typecode)
+        column.frombytes(raw)
+        columns.append(column)
+    return cls(*columns)
+
+# -----------------------------------------------------------------------------
+# Dekodierung
+# -----------------------------------------------------------------------------
+def decodeFrames(buffer, useNumpy=True):
+  """ Dekodiert N hintereinander liegende 13-Byte-Datenrahmen aus einem
+      bytes, bytearray oder memoryview und liefert ein McanColumns-Objekt.
+      Ist numpy vorhanden (und useNumpy gesetzt), sind die Spalten
+      numpy-Arrays, sonst array.array.
+  """
+  if len(buffer) % MSGLEN != 0:
+    raise ValueError('buffer length must be a multiple of 13')
+  if numpy is not None and useNumpy:
+    return _decodeNumpy(buffer)
+  return _decodeArray(buffer)
+
+def _decodeNumpy(buffer):
+  frames = numpy.frombuffer(buffer, dtype=_DTYPE)
+  cmdAndResp = frames['cmdAndResp']
+  return McanColumns( frames['prio'].copy()
+                    , cmdAndResp & 0xfe
+                    , cmdAndResp & 0x01
+                    , frames['hash'].astype(numpy.uint16)
+                    , frames['dlc'].copy()
+                    , frames['dataH'].astype(numpy.uint32)
+                    , frames['dataL'].astype(numpy.uint32)
+                    )
+
+def _decodeArray(buffer):
+  if isinstance(buffer, memoryview):
+    buffer = buffer.cast('B')
+  cmdAndResp = bytes(buffer[CMDANDRESP::MSGLEN])
+  return McanColumns( array('B', bytes(buffer[PRIO::MSGLEN]))
+                    , array('B', cmdAndResp.translate(_CMDTABLE))
+                    , array('B', cmdAndResp.translate(_RESPTABLE))
+                    , _column(buffer, (HASHH, HASHL), 'H')
+                    , array('B', bytes(buffer[DLC::MSGLEN]))
+                    , _column(buffer, range(D0, D0+4), _U32)
+                    , _column(buffer, range(D4, D4+4), _U32)
+                    )
+
+def _column(buffer, positions, typecode):
+  """ Setzt eine Spalte aus den (big endian) Bytes an den angegebenen
+      Positionen aller Datenrahmen zusammen.
+  """
+  size = len(positions)
+  raw = bytearray(len(buffer) // MSGLEN * size)
+  for i, pos in enumerate(positions):
+    raw[i::size] = bytes(buffer[pos::MSGLEN])
+  column = array(typecode)
+  column.frombytes(raw)
+  if byteorder == 'little':
+    column.byteswap()
+  return column
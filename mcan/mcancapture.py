@@ -0,0 +1,264 @@
+""" mcancapture.py
+    Binaeres Mitschnittformat mit Index
+
+    Aufbau der Datei (alle Zahlen little endian):
+      Kopf      32 Byte  magic 'MCAP', version, blockSize, count, indexOffset
+      Saetze    je 21 Byte  timestamp (ms, uint64) + 13-Byte-Datenrahmen
+      Index     je Block 24 Byte  erster timestamp (ms, uint64)
+                                  + 16 Byte Bitmap der Befehle (command >> 1)
+
+    Ein Block umfasst blockSize Saetze. Ueber den Index werden bei einer
+    Abfrage nur die Bloecke gelesen, die im Zeitraum liegen und den
+    gesuchten Befehl enthalten.
+    Zeitstempel werden als Sekunden (float) uebergeben und geliefert.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+from struct import Struct
+from sys import byteorder
+
+from .mcanmsgarray import MSGLEN, CMDANDRESP
+from .mcanlog import McanLogReader
+
+MAGIC = b'MCAP'
+VERSION = 1
+
+_HEADER = Struct('<4sHHQQ8x')
+_RECORD = Struct('<Q13s')
+_INDEX  = Struct('<Q16s')
+
+RECORDLEN = _RECORD.size
+_TSLEN = 8
+
+# -----------------------------------------------------------------------------
+# Klasse zum Schreiben eines binaeren Mitschnitts
+# -----------------------------------------------------------------------------
+class McanCaptureWriter():
+  """ Schreibt Datenrahmen mit Zeitstempel in einen binaeren Mitschnitt.
+      Die Zeitstempel muessen aufsteigend sein.
+  """
+  def __init__(self, path, blockSize=1024):
+    self.__file = open(path, 'wb')
+    self.__blockSize = blockSize
+    self.__count = 0
+    self.__lastTime = 0
+    self.__record = bytearray(RECORDLEN)
+    self.__index = []
+    self.__blockTime = 0
+    self.__bitmap = None
+    self.__file.write(_HEADER.pack(MAGIC, VERSION, blockSize, 0, 0))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def __len__(self):
+    return self.__count
+
+  def write(self, timestamp, frame):
+    """ Haengt einen Datenrahmen (13 Bytes) mit Zeitstempel (Sekunden) an
+    """
+    msTime = int(round(timestamp * 1000))
+    if msTime < self.__lastTime:
+      raise ValueError('timestamps must not decrease')
+    self.__lastTime = msTime
+    if self.__count % self.__blockSize == 0:
+      self.__closeBlock()
+      self.__blockTime = msTime
+      self.__bitmap = bytearray(16)
+    command = frame[CMDANDRESP] >> 1
+    self.__bitmap[command >> 3] |= 1 << (command & 7)
+    _RECORD.pack_into(self.__record, 0, msTime, bytes(frame))
+    self.__file.write(self.__record)
+    self.__count += 1
+
+  def __closeBlock(self):
+    if self.__bitmap is not None:
+      self.__index.append(_INDEX.pack(self.__blockTime, bytes(self.__bitmap)))
+
+  def close(self):
+    """ Schreibt den Index und den Kopf und schliesst die Datei
+    """
+    if self.__file.closed:
+      return
+    self.__closeBlock()
+    indexOffset = self.__file.tell()
+    for entry in self.__index:
+      self.__file.write(entry)
+    self.__file.seek(0)
+    self.__file.write(_HEADER.pack(MAGIC, VERSION, self.__blockSize
+                                  , self.__count, indexOffset))
+    self.__file.close()
+
+# -----------------------------------------------------------------------------
+# Klasse zum Lesen eines binaeren Mitschnitts
+# -----------------------------------------------------------------------------
+class McanCaptureReader():
+  """ Liest einen binaeren Mitschnitt per mmap.
+      Die gelieferten Datenrahmen sind memoryviews in die Datei (ohne
+      Kopie) und koennen direkt an McanMsgArray bzw. McanDecode
+      uebergeben werden. Sie bleiben auch nach close() gueltig, die Datei
+      wird dann erst mit dem letzten Datenrahmen ausgeblendet.
+  """
+  def __init__(self, path):
+    self.__file = open(path, 'rb')
+    self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+    self.__view = memoryview(self.__map)
+    magic, version, blockSize, count, indexOffset = _HEADER.unpack_from(self.__map, 0)
+    if magic != MAGIC or version != VERSION:
+      self.close()
+      raise ValueError('not a mcan capture file')
+    self.__blockSize = blockSize
+    self.__count = count
+    self.__blockTimes = []
+    self.__blockCommands = []
+    for pos in range(indexOffset, len(self.__map), _INDEX.size):
+      msTime, bitmap = _INDEX.unpack_from(self.__map, pos)
+      self.__blockTimes.append(msTime)
+      self.__blockCommands.append(bitmap)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def __len__(self):
+    return self.__count
+
+  def __iter__(self):
+    return self.frames()
+
+  @property
+  def blockSize(self):
+    return self.__blockSize
+
+  def close(self):
+    """ Schliesst die Datei. Sind noch gelieferte Datenrahmen in Gebrauch,
+        bleibt die Einblendung gueltig, bis der letzte davon freigegeben
+        ist; sie wird dann von der Garbage Collection geschlossen.
+    """
+    if self.__file.closed:
+      return
+    self.__file.close()
+    try:
+      self.__view.release()
+      self.__map.close()
+    except BufferError:
+      # memoryviews der Datenrahmen existieren noch
+      pass
+
+  def record(self, i):
+    """ Liefert (timestamp, memoryview) des i-ten Satzes
+    """
+    pos = _HEADER.size + i * RECORDLEN
+    msTime = _RECORD.unpack_from(self.__map, pos)[0]
+    return (msTime / 1000, self.__view[pos+_TSLEN:pos+RECORDLEN])
+
+  def __blocks(self, start, end, command):
+    first = 0
+    last = len(self.__blockTimes)
+    if start is not None:
+      first = max(bisect_right(self.__blockTimes, int(start * 1000)) - 1, 0)
+    if end is not None:
+      last = bisect_left(self.__blockTimes, int(end * 1000))
+    for block in range(first, last):
+      if command is not None:
+        bit = command >> 1
+        if not self.__blockCommands[block][bit >> 3] & (1 << (bit & 7)):
+          continue
+      yield block
+
+  def frames(self, start=None, end=None, command=None):
+    """ Generator ueber (timestamp, memoryview) im Zeitraum [start, end),
+        optional nur fuer einen Befehl (ohne Antwortbit).
+    """
+    msStart = None if start is None else int(start * 1000)
+    msEnd = None if end is None else int(end * 1000)
+    for block in self.__blocks(start, end, command):
+      first = block * self.__blockSize
+      last = min(first + self.__blockSize, self.__count)
+      for i in range(first, last):
+        pos = _HEADER.size + i * RECORDLEN
+        if command is not None and self.__map[pos+_TSLEN+CMDANDRESP] & 0xfe != command:
+          continue
+        msTime = _RECORD.unpack_from(self.__map, pos)[0]
+        if msStart is not None and msTime < msStart:
+          continue
+        if msEnd is not None and msTime >= msEnd:
+          return
+        yield (msTime / 1000, self.__view[pos+_TSLEN:pos+RECORDLEN])
+
+  def batch(self, first=0, last=None):
+    """ Liefert (timestamps, buffer) der Saetze first bis last (exklusiv).
+        timestamps sind ms als array, buffer enthaelt die Datenrahmen
+        lueckenlos (fuer mcanbatch.decodeFrames()).
+    """
+    if last is None or last > self.__count:
+      last = self.__count
+    count = max(last - first, 0)
+    pos = _HEADER.size + first * RECORDLEN
+    raw = self.__view[pos:pos + count * RECORDLEN]
+    buf = bytearray(count * MSGLEN)
+    for i in range(MSGLEN):
+      buf[i::MSGLEN] = raw[_TSLEN+i::RECORDLEN]
+    msTimes = bytearray(count * _TSLEN)
+    for i in range(_TSLEN):
+      msTimes[i::_TSLEN] = raw[i::RECORDLEN]
+    raw.release()
+    timestamps = array('q')
+    timestamps.frombytes(msTimes)
+    if byteorder != 'little':
+      timestamps.byteswap()
+    return (timestamps, buf)
+
+def streamFrames(stream, start=None, end=None, command=None):
+  """ Generator ueber (timestamp, bytes) eines binaeren Mitschnitts aus
+      einem Datenstrom ohne mmap (z.B. sys.stdin.buffer). Der Index
+      wird nicht genutzt, die Saetze werden der Reihe nach gelesen.
+  """
+  header = stream.read(_HEADER.size)
+  if len(header) < _HEADER.size:
+    return
+  magic, version, _, count, _ = _HEADER.unpack(header)
+  if magic != MAGIC or version != VERSION:
+    raise ValueError('not a mcan capture file')
+  msStart = None if start is None else int(start * 1000)
+  msEnd = None if end is None else int(end * 1000)
+  for _ in range(count):
+    record = stream.read(RECORDLEN)
+    if len(record) < RECORDLEN:
+      return
+    msTime, frame = _RECORD.unpack(record)
+    if command is not None and frame[CMDANDRESP] & 0xfe != command:
+      continue
+    if msStart is not None and msTime < msStart:
+      continue
+    if msEnd is not None and msTime >= msEnd:
+      return
+    yield (msTime / 1000, frame)
+
+# -----------------------------------------------------------------------------
+# Umwandlung
+# -----------------------------------------------------------------------------
+def convertLog(logPath, capturePath, blockSize=1024):
+  """ Wandelt einen Mitschnitt im Textformat in das binaere Format um.
+      Liefert die Anzahl der Datenrahmen.
+  """
+  with McanLogReader(logPath) as reader, \
+       McanCaptureWriter(capturePath, blockSize) as writer:
+    for timestamp, frame in reader.frames():
+      writer.write(timestamp, frame)
+    return len(writer)
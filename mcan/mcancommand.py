@@ -9,7 +9,20 @@
     ---------------------------------------------------------------------------
     (c) 2020
 """
-from .mcanmsgarray import McanMsgArray
+from bisect import bisect_right
+from struct import Struct
+
+from .mcanmsgarray import McanMsgArray, MSGLEN, CMDANDRESP
+
+# prio, cmdAndResp, hash, dlc, d0-d3, d4-d7
+_FRAME = Struct('>BBHBLL')
+
+def packFrame(buf, offset, prio, cmdAndResp, mcanHash, dlc, dataH=0, dataL=0):
+  """ Schreibt einen can-Datenrahmen direkt in buf an die Stelle offset.
+      dataH sind die Datenbytes d0-d3, dataL die Datenbytes d4-d7
+      (jeweils als 32-bit int).
+  """
+  _FRAME.pack_into(buf, offset, prio, cmdAndResp, mcanHash, dlc, dataH, dataL)
 
 # -----------------------------------------------------------------------------
 # Klasse zur Verwaltung eines Maerklin CANbus Befehls
@@ -17,6 +30,8 @@ from .mcanmsgarray import McanMsgArray
 class McanCommand(McanMsgArray):
   """ Klasse zur Verwaltung eines Maerklin CANbus Befehls
   """
+  __slots__ = ()
+
   def __init__(self, mcanHash):
     super().__init__()
     self.setHash(mcanHash)
@@ -32,14 +47,25 @@ class McanCommand(McanMsgArray):
     """ Liefert den can-Datenrahmen als 13-byte-langes bytearray mit
         aktiviertem Antwortbit.
     """
-    response = McanMsgArray(self.frame)
-    response.setByte('cmdAndResp', response.getByte('cmdAndResp')|0x01)
-    return bytearray(response.array)
+    response = bytearray(self.array)
+    response[CMDANDRESP] |= 0x01
+    return response
+
+  def writeInto(self, buf, offset=0, response=False):
+    """ Schreibt den can-Datenrahmen ohne Kopie in buf an die Stelle offset,
+        mit response=True mit aktiviertem Antwortbit.
+        Die Laenge von buf wird nicht veraendert.
+    """
+    if offset < 0 or len(buf) - offset < MSGLEN:
+      raise ValueError('buffer too small for a frame at offset {}'.format(offset))
+    memoryview(buf)[offset:offset+MSGLEN] = self.array
+    if response:
+      buf[offset+CMDANDRESP] |= 0x01
 
   def setPrio(self, prio):
     """ Setzt das prio-Byte im can-Datenrahmen
     """
-    self.setByName(prio, 'prio')
+    self.setByte('prio', prio)
 
   def setCommand(self, cmd, response=False, dlc=8 ):
     """ Setzt das Befehls-Byte im can-Datenrahmen
@@ -49,12 +75,6 @@ class McanCommand(McanMsgArray):
     self.setByte('cmdAndResp', cmd)
     self.setDlc(dlc)
 
-  def setHash(self, mcanHash):
-    """ Setzt die beiden Hash-Bytes im can-Datenrahmen
-    """
-    self.setByte('hashH', mcanHash >> 8)
-    self.setByte('hashL', mcanHash & 0xff)
-
   def setDlc(self, dlc):
     """ Setzt das dlc-Byte im can-Datenrahmen
         data len count
@@ -71,7 +91,8 @@ class McanCommand(McanMsgArray):
 
   def toggleTrackState(self, devId=None, subId=None, newState=None):
     """ deprecated: recentState wird nicht pro subId gespeichert 
-                    Es ist sicherer setTrackState zu nutzen.
+                    Es ist sicherer setTrackState zu nutzen, die
+                    Zustaende je Kontakt verwaltet states.ContactHistory.
         Setzt das Status-Byte (Rueckmelder)
         Der letzte(recent) Status wird entsprechend gesetzt.
     """
@@ -91,3 +112,120 @@ class McanCommand(McanMsgArray):
     self.setByte('d4', recentState)
     self.setByte('d5', state)
 
+
+# -----------------------------------------------------------------------------
+# Klasse fuer vorbelegte can-Datenrahmen
+# -----------------------------------------------------------------------------
+class McanTemplate():
+  """ Vorlage fuer can-Datenrahmen mit festem Hash und Befehl.
+      Mit writeInto() werden nur noch die Datenbytes ergaenzt und der
+      Datenrahmen direkt in einen Sendepuffer geschrieben.
+      Vorlagen werden mit McanTemplate.get() wiederverwendet.
+  """
+  __templates = {}
+
+  def __init__(self, mcanHash, cmd, response=False, dlc=8, prio=0):
+    self.__prio = prio
+    self.__cmdAndResp = cmd | 0x01 if response else cmd
+    self.__hash = mcanHash
+    self.__dlc = dlc
+
+  @classmethod
+  def get(cls, mcanHash, cmd, response=False, dlc=8, prio=0):
+    """ Liefert die (gemerkte) Vorlage fuer Hash und Befehl
+    """
+    key = (mcanHash, cmd, response, dlc, prio)
+    template = cls.__templates.get(key)
+    if template is None:
+      template = cls(mcanHash, cmd, response, dlc, prio)
+      cls.__templates[key] = template
+    return template
+
+  def writeInto(self, buf, offset=0, dataH=0, dataL=0):
+    """ Schreibt den Datenrahmen mit den Datenbytes d0-d3 (dataH) und
+        d4-d7 (dataL) in buf an die Stelle offset.
+    """
+    _FRAME.pack_into(buf, offset, self.__prio, self.__cmdAndResp
+                    , self.__hash, self.__dlc, dataH, dataL)
+
+  def writeTrackState(self, buf, offset, devId, subId, state, recentState):
+    """ Schreibt einen Rueckmelder-Datenrahmen (vgl. setTrackState)
+    """
+    _FRAME.pack_into(buf, offset, self.__prio, self.__cmdAndResp
+                    , self.__hash, self.__dlc
+                    , (devId << 16) | subId, (recentState << 24) | (state << 16))
+
+# -----------------------------------------------------------------------------
+# Rueckmelder-Datenrahmen aus geaenderten Zustaenden
+# -----------------------------------------------------------------------------
+TRACKSTATE = 0x22
+
+def _changedContacts(states):
+  """ Liefert [contact, state, recentState] aller Aenderungen eines
+      States- bzw. StateBank-Objekts oder einer Folge von States-Objekten.
+      Bei einer Folge werden die Kontakte fortlaufend nummeriert.
+  """
+  if hasattr(states, 'changedStates'):
+    return states.changedStates
+  changes = []
+  base = 0
+  for moduleStates in states:
+    for contact, state, recentState in moduleStates.changedStates:
+      changes.append([base + contact, state, recentState])
+    base += moduleStates.maxStateBits
+  return changes
+
+def _writeTrackStates(buf, offset, changes, devId, mcanHash, response):
+  template = McanTemplate.get(mcanHash, TRACKSTATE, response)
+  for contact, state, recentState in changes:
+    template.writeTrackState(buf, offset, devId, contact, state, recentState)
+    offset += MSGLEN
+
+def _commit(states, changes):
+  """ Setzt den letzten Zustand nur fuer die geschriebenen Kontakte auf den
+      geschriebenen Wert. Spaetere Aenderungen bleiben so erhalten.
+  """
+  if hasattr(states, 'setRecentState'):
+    for contact, state, _ in changes:
+      states.setRecentState(contact, state)
+  elif hasattr(states, 'setRecentStateBit'):
+    for contact, state, _ in changes:
+      states.setRecentStateBit(contact, state)
+  else:
+    modules = list(states)
+    bases = []
+    base = 0
+    for moduleStates in modules:
+      bases.append(base)
+      base += moduleStates.maxStateBits
+    for contact, state, _ in changes:
+      module = bisect_right(bases, contact - 1) - 1
+      modules[module].setRecentStateBit(contact - bases[module], state)
+
+def packTrackStates(buf, offset, states, devId, mcanHash, response=False, commit=False):
+  """ Schreibt fuer alle geaenderten Kontakte einen Rueckmelder-Datenrahmen
+      (0x22) lueckenlos in buf ab der Stelle offset.
+      states ist ein States- oder StateBank-Objekt oder eine Folge von
+      States-Objekten. Mit commit=True wird danach fuer die geschriebenen
+      Kontakte der letzte Zustand gesetzt. Passen nicht alle Datenrahmen in buf, wird nichts
+      geschrieben und ein ValueError ausgeloest.
+      Liefert die Anzahl der geschriebenen Datenrahmen.
+  """
+  changes = _changedContacts(states)
+  if offset + len(changes) * MSGLEN > len(buf):
+    raise ValueError('buffer too small for {} frames'.format(len(changes)))
+  _writeTrackStates(buf, offset, changes, devId, mcanHash, response)
+  if commit:
+    _commit(states, changes)
+  return len(changes)
+
+def trackStateFrames(states, devId, mcanHash, response=False, commit=False):
+  """ Liefert die Rueckmelder-Datenrahmen aller geaenderten Kontakte
+      in einem bytearray (vgl. packTrackStates).
+  """
+  changes = _changedContacts(states)
+  buf = bytearray(len(changes) * MSGLEN)
+  _writeTrackStates(buf, 0, changes, devId, mcanHash, response)
+  if commit:
+    _commit(states, changes)
+  return buf
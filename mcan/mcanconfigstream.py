@@ -0,0 +1,202 @@
+""" mcanconfigstream.py
+    Zusammensetzen von Konfigurationsdaten-Streams (0x42), z.B. der
+    zlib-komprimierten Lokliste des CS2.
+
+    Ablauf eines Streams (je Absender-Hash):
+      Startrahmen  dlc 6 oder 7: d0-d3 Laenge, d4-d5 CRC (CCITT, Start 0xffff)
+      Datenrahmen  dlc 8: je 8 Datenbytes, der letzte mit Fuellbytes
+    Komprimierte Daten beginnen mit der Laenge der entpackten Daten (4 Byte,
+    big endian), danach folgt der zlib-Datenstrom.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import zlib
+from binascii import crc_hqx
+
+from .mcanmsgarray import McanMsgArray, DLC, D0, D4
+
+CONFIGQUERY  = 0x40
+CONFIGSTREAM = 0x42
+
+# groesste angenommene Laenge eines Streams (Bytes), laengere werden abgewiesen
+MAXLENGTH    = 0x10000
+
+# -----------------------------------------------------------------------------
+# Klasse fuer einen einzelnen Stream
+# -----------------------------------------------------------------------------
+class McanConfigStream():
+  """ Ein Stream mit vorab angelegtem Puffer fuer die empfangenen Daten.
+      Die CRC wird mit jedem Datenrahmen weitergerechnet, komprimierte
+      Daten werden schrittweise entpackt und an sink(chunk) uebergeben;
+      gesammelt wird nichts.
+      Ist length groesser als maxLength, wird ValueError ausgeloest.
+      Passt die Anzahl der entpackten Bytes nicht zur Laenge am Anfang der
+      komprimierten Daten, loest feed() ValueError aus.
+      Ein Stream der Laenge 0 ist bereits mit dem Startrahmen fertig
+      (komprimiert ungueltig, da die Laenge der entpackten Daten fehlt).
+  """
+  def __init__(self, length, crc, sink, compressed=True, maxLength=MAXLENGTH):
+    if length > maxLength:
+      raise ValueError('config stream too long: {} > {} bytes'.format(length, maxLength))
+    self.length = length
+    self.crc = crc
+    self.compressed = compressed
+    self.size = None
+    self.unpacked = 0
+    self.valid = None
+    self.error = None
+    self.__sink = sink
+    self.__buf = bytearray((length + 7) & ~7)
+    self.__pos = 0
+    self.__crc = 0xffff
+    self.__decompressor = zlib.decompressobj() if compressed else None
+    if length == 0:
+      # ohne Datenrahmen: mit dem Startrahmen fertig
+      self.__finish()
+
+  @property
+  def received(self):
+    return self.__pos
+
+  @property
+  def isComplete(self):
+    return self.__pos >= len(self.__buf)
+
+  @property
+  def data(self):
+    """ Liefert die empfangenen (ggf. komprimierten) Daten ohne Kopie
+    """
+    return memoryview(self.__buf)[:self.length]
+
+  def feed(self, chunk):
+    """ Uebernimmt die 8 Datenbytes eines Datenrahmens.
+        Liefert True, wenn der Stream vollstaendig ist.
+    """
+    if self.isComplete:
+      return True
+    start = self.__pos
+    end = start + 8
+    self.__buf[start:end] = chunk
+    self.__crc = crc_hqx(self.__buf[start:end], self.__crc)
+    self.__pos = end
+    if self.__decompressor is not None and self.error is None:
+      self.__decompress(start, min(end, self.length))
+    elif self.__decompressor is None:
+      self.__sink(bytes(self.__buf[start:min(end, self.length)]))
+    if self.isComplete:
+      self.__finish()
+    return self.isComplete
+
+  def __decompress(self, start, end):
+    if start < 4:
+      if end >= 4:
+        self.size = int.from_bytes(self.__buf[0:4], 'big')
+      start = 4
+    if start >= end:
+      return
+    try:
+      out = self.__decompressor.decompress(memoryview(self.__buf)[start:end])
+    except zlib.error as exc:
+      self.error = 'zlib: {}'.format(exc)
+      return
+    self.__output(out)
+
+  def __output(self, out):
+    if not out:
+      return
+    self.unpacked += len(out)
+    if self.unpacked > self.size:
+      self.__sizeMismatch()
+    self.__sink(out)
+
+  def __sizeMismatch(self):
+    self.error = 'size {} != {}'.format(self.unpacked, self.size)
+    self.valid = False
+    raise ValueError('config stream: unpacked {}'.format(self.error))
+
+  def __finish(self):
+    if self.__crc != self.crc:
+      self.error = 'crc {:04x} != {:04x}'.format(self.__crc, self.crc)
+    elif self.__decompressor is not None and self.error is None:
+      if self.size is None:
+        self.error = 'too short for the size prefix'
+      else:
+        self.__output(self.__decompressor.flush())
+        if self.unpacked != self.size:
+          self.__sizeMismatch()
+    self.valid = self.error is None
+
+# -----------------------------------------------------------------------------
+# Klasse zum Zusammensetzen der Streams aller Absender
+# -----------------------------------------------------------------------------
+class McanConfigReassembler():
+  """ Nimmt Datenrahmen entgegen und setzt die Streams je Absender-Hash
+      zusammen. Ist ein Stream fertig, wird onComplete(hash, stream)
+      aufgerufen. sinkFactory(hash) liefert fuer jeden Stream eine Funktion,
+      die die entpackten Teile aufnimmt (z.B. file.write).
+      Startrahmen mit einer Laenge ueber maxLength werden abgewiesen (rejected)
+      und ein laufender Stream des Absenders verworfen.
+  """
+  def __init__(self, sinkFactory, onComplete=None, compressed=True, maxLength=MAXLENGTH):
+    self.__streams = {}
+    self.__onComplete = onComplete
+    self.__sinkFactory = sinkFactory
+    self.__compressed = compressed
+    self.__maxLength = maxLength
+    self.rejected = 0
+
+  def __len__(self):
+    return len(self.__streams)
+
+  def feed(self, msg):
+    """ Wertet einen Datenrahmen aus (McanMsgArray oder 13 Bytes).
+        Liefert den fertigen McanConfigStream oder None (ein Stream der
+        Laenge 0 ist schon mit dem Startrahmen fertig).
+        Der ValueError eines Streams mit falscher entpackter Laenge wird
+        weitergegeben, der Stream ist dann bereits entfernt.
+    """
+    if not isinstance(msg, McanMsgArray):
+      msg = McanMsgArray(msg)
+    if msg.getCommand() != CONFIGSTREAM:
+      return None
+    arr = msg.array
+    mcanHash = msg.getHash()
+    dlc = arr[DLC]
+    if dlc == 6 or dlc == 7:
+      length = msg.getDeviceId()
+      if length > self.__maxLength:
+        self.__streams.pop(mcanHash, None)
+        self.rejected += 1
+        return None
+      stream = McanConfigStream( length, (arr[D4] << 8) | arr[D4+1]
+                               , self.__sinkFactory(mcanHash)
+                               , self.__compressed, self.__maxLength)
+      if not stream.isComplete:
+        self.__streams[mcanHash] = stream
+        return None
+      self.__streams.pop(mcanHash, None)
+      return self.__complete(mcanHash, stream)
+    stream = self.__streams.get(mcanHash)
+    if dlc != 8 or stream is None:
+      return None
+    try:
+      complete = stream.feed(arr[D0:D0+8])
+    except ValueError:
+      del self.__streams[mcanHash]
+      raise
+    if not complete:
+      return None
+    del self.__streams[mcanHash]
+    return self.__complete(mcanHash, stream)
+
+  def __complete(self, mcanHash, stream):
+    if self.__onComplete is not None:
+      self.__onComplete(mcanHash, stream)
+    return stream
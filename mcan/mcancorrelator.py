@@ -0,0 +1,222 @@
+""" mcancorrelator.py
+    Zuordnung von Antworten (Antwortbit gesetzt) zu den gesendeten
+    Anfragen, z.B. fuer Loc read config (0x0e), MFX Bind/Verify oder
+    Member ping.
+
+    Offene Anfragen stehen in einem dict mit dem Schluessel
+    (command, uid). uid ist die Device-ID (d0-d3) des Datenrahmens oder
+    None fuer Anfragen an alle (z.B. Member ping ohne Daten); diese werden
+    von jeder Antwort mit dem Befehl erfuellt.
+    Abgelaufene Anfragen werden ueber ein Zeitrad gefunden, es wird also
+    nie ueber alle offenen Anfragen gesucht.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import asyncio
+try:
+  from time import monotonic
+except ImportError:
+  # MicroPython
+  from time import ticks_ms
+  def monotonic():
+    return ticks_ms() / 1000
+
+from .mcanmsgarray import McanMsgArray, CMDANDRESP, DLC, D0, D1, D2, D3
+
+# -----------------------------------------------------------------------------
+# Klasse fuer eine offene Anfrage
+# -----------------------------------------------------------------------------
+class McanPending():
+  """ Eine offene Anfrage. Ergebnis ist die Antwort (McanMsgArray), bei
+      collect die Liste aller Antworten bis zum Ablauf, sonst bei Ablauf
+      None (Rueckruf) bzw. asyncio.TimeoutError (future).
+  """
+  __slots__ = ('key', 'future', 'callback', 'responses', 'done')
+
+  def __init__(self, key, future, callback, collect):
+    self.key = key
+    self.future = future
+    self.callback = callback
+    self.responses = [] if collect else None
+    self.done = False
+
+  def resolve(self, result):
+    self.done = True
+    if self.callback is not None:
+      self.callback(result)
+    elif not self.future.done():
+      self.future.set_result(result)
+
+  def expire(self):
+    self.done = True
+    if self.responses is not None:
+      self.resolve(self.responses)
+    elif self.callback is not None:
+      self.callback(None)
+    elif not self.future.done():
+      self.future.set_exception(asyncio.TimeoutError())
+
+# -----------------------------------------------------------------------------
+# Klasse fuer die Zuordnung
+# -----------------------------------------------------------------------------
+class McanCorrelator():
+  """ Ordnet Antworten den offenen Anfragen zu.
+      expect() meldet eine Anfrage an und liefert ein asyncio-Future bzw.
+      ruft callback(antwort) auf; request() sendet zusaetzlich den
+      Datenrahmen. Empfangene Datenrahmen werden mit feed() uebergeben.
+      Das Zeitrad hat slots Faecher mit der Aufloesung resolution
+      (Sekunden), es wird mit advance() nach der Uhr oder mit tick()
+      (z.B. in Tests) weitergedreht.
+  """
+  def __init__(self, timeout=1.0, resolution=0.05, slots=64, clock=monotonic):
+    self.__pending = {}
+    self.__timeout = timeout
+    self.__resolution = resolution
+    self.__wheel = [[] for _ in range(slots)]
+    self.__pos = 0
+    self.__clock = clock
+    self.__startTime = clock()
+    self.__ticks = 0
+
+  def __len__(self):
+    return sum(len(pendings) for pendings in self.__pending.values())
+
+  @staticmethod
+  def frameKey(arr):
+    """ Liefert (command, uid) eines Datenrahmens, uid ist None bei dlc < 4
+    """
+    uid = None
+    if arr[DLC] >= 4:
+      uid = (arr[D0] << 24) | (arr[D1] << 16) | (arr[D2] << 8) | arr[D3]
+    return (arr[CMDANDRESP] & 0xfe, uid)
+
+  def expect(self, command, uid=None, callback=None, timeout=None, collect=False):
+    """ Meldet eine erwartete Antwort an. Ohne callback wird ein Future der
+        laufenden Eventloop geliefert, sonst das McanPending-Objekt.
+        Mit collect werden alle Antworten bis zum Ablauf gesammelt.
+    """
+    future = None
+    if callback is None:
+      future = asyncio.get_running_loop().create_future()
+    pending = McanPending((command, uid), future, callback, collect)
+    self.__pending.setdefault(pending.key, []).append(pending)
+    if timeout is None:
+      timeout = self.__timeout
+    self.__schedule(pending, max(int(timeout / self.__resolution + 0.5), 1))
+    return future if future is not None else pending
+
+  def request(self, send, frame, callback=None, timeout=None, collect=False):
+    """ Meldet die Antwort auf frame an und sendet frame mit send(frame)
+    """
+    arr = frame.array if isinstance(frame, McanMsgArray) else frame
+    command, uid = self.frameKey(arr)
+    result = self.expect(command, uid, callback, timeout, collect)
+    send(frame)
+    return result
+
+  def feed(self, msg):
+    """ Wertet einen empfangenen Datenrahmen aus. Liefert True, wenn er
+        eine offene Anfrage erfuellt hat.
+    """
+    if not isinstance(msg, McanMsgArray):
+      msg = McanMsgArray(msg)
+    arr = msg.array
+    if not arr[CMDANDRESP] & 0x01:
+      return False
+    command, uid = self.frameKey(arr)
+    if uid is not None and self.__match((command, uid), msg):
+      return True
+    return self.__match((command, None), msg)
+
+  def feedFrames(self, frames):
+    """ Wertet mehrere Datenrahmen aus (passt als McanGateway-handler)
+    """
+    for msg in frames:
+      self.feed(msg)
+
+  def __match(self, key, msg):
+    """ Uebergibt die Antwort allen sammelnden Anfragen und erfuellt die
+        erste nicht sammelnde Anfrage zu key
+    """
+    pendings = self.__pending.get(key)
+    if not pendings:
+      return False
+    # die Daten koennen zu einem wiederverwendeten Puffer gehoeren
+    response = McanMsgArray(bytearray(msg.array))
+    for index, pending in enumerate(pendings):
+      if pending.responses is not None:
+        pending.responses.append(response)
+        continue
+      del pendings[index]
+      if not pendings:
+        del self.__pending[key]
+      pending.resolve(response)
+      break
+    return True
+
+  # ---------------------------------------------------------------------------
+  # Zeitrad
+  # ---------------------------------------------------------------------------
+  def __schedule(self, pending, ticks):
+    slots = len(self.__wheel)
+    rounds, offset = divmod(ticks, slots)
+    if offset == 0:
+      rounds -= 1
+    self.__wheel[(self.__pos + ticks) % slots].append([rounds, pending])
+
+  def tick(self, count=1):
+    """ Dreht das Zeitrad um count Faecher weiter, liefert die Anzahl der
+        abgelaufenen Anfragen
+    """
+    expired = 0
+    for _ in range(count):
+      self.__pos = (self.__pos + 1) % len(self.__wheel)
+      bucket = self.__wheel[self.__pos]
+      if not bucket:
+        continue
+      keep = []
+      for entry in bucket:
+        pending = entry[1]
+        if pending.done:
+          continue
+        if entry[0] > 0:
+          entry[0] -= 1
+          keep.append(entry)
+          continue
+        self.__remove(pending)
+        pending.expire()
+        expired += 1
+      self.__wheel[self.__pos] = keep
+    return expired
+
+  def __remove(self, pending):
+    pendings = self.__pending.get(pending.key)
+    if pendings is not None and pending in pendings:
+      pendings.remove(pending)
+      if not pendings:
+        del self.__pending[pending.key]
+
+  def advance(self, now=None):
+    """ Dreht das Zeitrad bis zur aktuellen Zeit weiter
+    """
+    if now is None:
+      now = self.__clock()
+    ticks = int((now - self.__startTime) / self.__resolution) - self.__ticks
+    if ticks <= 0:
+      return 0
+    self.__ticks += ticks
+    return self.tick(ticks)
+
+  async def run(self):
+    """ Dreht das Zeitrad in der Eventloop weiter (als Task starten)
+    """
+    while True:
+      await asyncio.sleep(self.__resolution)
+      self.advance()
@@ -12,49 +12,93 @@
     ---------------------------------------------------------------------------
     (c) 2020
 """
-from struct import unpack
 from os import linesep
 
-from .mcanmsgarray import McanMsgArray
+from .mcanmsgarray import McanMsgArray, CMDANDRESP, DLC, D0, D1, D2, D3, D4, D5, D6, D7
+
+# -----------------------------------------------------------------------------
+# Klasse fuer das strukturierte Ergebnis einer Dekodierung
+# -----------------------------------------------------------------------------
+class McanRecord():
+  """ Strukturiertes Ergebnis von McanDecode.decode(record=True).
+      Es werden nur die Zahlenwerte abgelegt, nicht benoetigte Felder
+      bleiben None. Der Text wird erst bei str() erzeugt.
+      frame ist eine Kopie des Datenrahmens (McanMsgArray auf bytes),
+      unabhaengig vom Puffer, aus dem dekodiert wurde.
+  """
+  __slots__ = ( 'frame', 'command', 'response', 'dlc'
+              , 'subcommand', 'deviceId', 'device', 'contact'
+              , 'state', 'recentState', 'protocol', 'signalQuality'
+              , 'position', 'current', 'switchTime'
+              , 'counter', 'channel', 'value'
+              , 'swVersion', 'dbVersion', 'length', 'crc'
+              , 'speed', 'direction', 'function', 'key'
+              )
+
+  def __init__(self, frame, command, response, dlc):
+    self.frame = frame
+    self.command = command
+    self.response = response
+    self.dlc = dlc
+    self.subcommand = None
+    self.deviceId = None
+    self.device = None
+    self.contact = None
+    self.state = None
+    self.recentState = None
+    self.protocol = None
+    self.signalQuality = None
+    self.position = None
+    self.current = None
+    self.switchTime = None
+    self.counter = None
+    self.channel = None
+    self.value = None
+    self.swVersion = None
+    self.dbVersion = None
+    self.length = None
+    self.crc = None
+    self.speed = None
+    self.direction = None
+    self.function = None
+    self.key = None
+
+  def __str__(self):
+    return McanDecode.render(self)
+
+  def text(self):
+    """ Liefert die Textausgabe wie McanDecode.decode()
+    """
+    return McanDecode.render(self)
 
 # -----------------------------------------------------------------------------
 # Klasse zur Analyse eines Maerklin CANbus Datenframes
 # -----------------------------------------------------------------------------
 class McanDecode(McanMsgArray):
-  __commands = {  0 : 'System command'
-               ,  2 : 'MFX Discovery'
-               ,  4 : 'MFX Bind'
-               ,  6 : 'MFX Verify'
-               ,  8 : 'Loc speed'
-               , 10 : 'Loc direction'
-               , 12 : 'Loc function'
-               , 14 : 'Loc read config'
-               , 16 : 'Loc write config'
-               , 22 : 'Equipment switch'
-               , 34 : 'Track state'
-               , 48 : 'Member ping'
-               , 58 : 'Statusdata config'
-               }
-  __subcmds =  {  0 : 'STOPP'
-               ,  1 : 'GO'
-               ,  2 : 'HALT'
-               ,  3 : 'Loc emergency stop'
-               ,  4 : 'Loc end cycle'
-               ,  9 : 'MFX new notifying counter'
-               , 10 : 'SYSTEM OVERLOAD'
-               , 11 : 'System status'
-               , 48 : 'System ???'
-               }
-  
-  __cmdType =  {  0: 'command'
-               ,  1: 'response'
-               }
-
-  __directions={  0 : 'remain'
-               ,  1 : 'forward'
-               ,  2 : 'backward'
-               ,  3 : 'switch'
-               }
+  """ Klasse zur Analyse eines Maerklin CANbus Datenframes
+      Die Funktionen zur Dekodierung und Textausgabe stehen in einer
+      Tabelle der Klasse, Schluessel ist (command, key). key ist None oder
+      der Wert des Bytes, das mit registerCommand(selector=...) fuer den
+      Befehl festgelegt wurde (z.B. Subcommand oder dlc).
+      Eine Dekodierfunktion hat die Form func(msg, rec) und fuellt das
+      McanRecord rec aus dem Datenrahmen msg, eine Ausgabefunktion hat die
+      Form func(rec) und liefert den Text (Zeilen mit formatLine()).
+      Die Namen der bekannten Befehle stehen in mcannames und werden erst
+      beim ersten Zugriff auf einen Namen geladen.
+  """
+  __slots__ = ('__command', '__response')
+
+  __commands = {}
+  __subcmds  = {}
+  __directions = ()
+  __namesLoaded = False
+  __handlers = {}
+  __selectors= {}
+  __metrics  = None
+
+  __cmdType =  ( 'command'
+               , 'response'
+               )
 
   __outFormat = '   {:15} {}'
 
@@ -65,189 +109,421 @@ class McanDecode(McanMsgArray):
 
   def __init__(self, message):
 
-    super().__init__(unpack('13B', message))
-    self.__command = self.getByte('cmdAndResp') & 0xfe
-    self.__response = self.getByte('cmdAndResp') & 0x01
+    super().__init__(message)
+    cmdAndResp = self.array[CMDANDRESP]
+    self.__command = cmdAndResp & 0xfe
+    self.__response = cmdAndResp & 0x01
+
+  def decode(self, record=False):
+    """ Dekodiert den Datenrahmen.
+        Liefert den Text oder mit record=True ein McanRecord, dessen Text
+        erst bei Bedarf erzeugt wird.
+    """
+    metrics = McanDecode.__metrics
+    if metrics is not None:
+      start = metrics.start()
+    arr = self.array
+    # Kopie der 13 Bytes: der Puffer des Decoders kann wiederverwendet werden
+    rec = McanRecord(McanMsgArray(bytes(arr)), self.__command, self.__response, arr[DLC])
+    rec.key = self.__selectKey(arr, self.__command)
+    handler = self.__getHandler(self.__command, rec.key)
+    if handler is not None:
+      handler[0](self, rec)
+    if metrics is not None:
+      self.__count(metrics, rec, handler)
+      metrics.stop(start)
+    if record:
+      return rec
+    return self.render(rec)
+
+  def __count(self, metrics, rec, handler):
+    metrics.countFrame(self.array)
+    if handler is None:
+      metrics.countUnknownCommand(rec.command)
+    elif rec.command == 0 and self.subcommandName(rec.subcommand) is None:
+      metrics.countUnknownSubcommand(rec.subcommand)
+
+  @classmethod
+  def setMetrics(cls, metrics):
+    """ Schaltet die Zaehler ein (McanMetrics-Objekt) bzw. mit None aus
+    """
+    McanDecode.__metrics = metrics
+
+  @classmethod
+  def getMetrics(cls):
+    return McanDecode.__metrics
+
+  @classmethod
+  def __selectKey(cls, arr, command):
+    selector = cls.__selectors.get(command)
+    if selector is None:
+      return None
+    return arr[selector]
+
+  @classmethod
+  def __getHandler(cls, command, key):
+    if key is not None:
+      handler = cls.__handlers.get((command, key))
+      if handler is not None:
+        return handler
+    return cls.__handlers.get((command, None))
+
+  # ---------------------------------------------------------------------------
+  # Erweiterung der Tabellen
+  # ---------------------------------------------------------------------------
+  @classmethod
+  def __loadNames(cls):
+    """ Laedt die Namen aus mcannames, angemeldete Namen haben Vorrang
+    """
+    if McanDecode.__namesLoaded:
+      return
+    from .mcannames import COMMANDS, SUBCOMMANDS, DIRECTIONS
+    for command, name in COMMANDS.items():
+      cls.__commands.setdefault(command, name)
+    for subcmd, name in SUBCOMMANDS.items():
+      cls.__subcmds.setdefault(subcmd, name)
+    McanDecode.__directions = DIRECTIONS
+    McanDecode.__namesLoaded = True
+
+  @classmethod
+  def registerCommand(cls, command, name, decodeFunc=None, renderFunc=None
+                     , selector=None):
+    """ Meldet einen Befehl mit Namen und Funktionen an.
+        Ohne Funktionen wird nur die Device-ID (d0-d3) ausgewertet.
+        selector ist die Position des Bytes (z.B. DLC oder D4), mit dessen
+        Wert zusaetzlich mit registerHandler() angemeldete Funktionen
+        ausgewaehlt werden. Mit name None gilt der Name aus mcannames.
+    """
+    if name is not None:
+      cls.__commands[command] = name
+    if selector is not None:
+      cls.__selectors[command] = selector
+    cls.registerHandler(command, None, decodeFunc, renderFunc)
+
+  @classmethod
+  def registerHandler(cls, command, key, decodeFunc=None, renderFunc=None):
+    """ Meldet die Funktionen fuer (command, key) an.
+    """
+    if decodeFunc is None:
+      decodeFunc = decodeDevice
+    if renderFunc is None:
+      renderFunc = renderDevice
+    cls.__handlers[(command, key)] = (decodeFunc, renderFunc)
+
+  @classmethod
+  def unregisterCommand(cls, command):
+    """ Entfernt einen Befehl mit allen Funktionen aus den Tabellen
+    """
+    cls.__loadNames()
+    cls.__commands.pop(command, None)
+    cls.__selectors.pop(command, None)
+    for key in [key for key in cls.__handlers if key[0] == command]:
+      del cls.__handlers[key]
+
+  @classmethod
+  def registerSubcommand(cls, subcmd, name, decodeFunc=None, renderFunc=None):
+    """ Meldet ein Subcommand des System-Befehls (0x00) an.
+        Mit name None gilt der Name aus mcannames.
+    """
+    if name is not None:
+      cls.__subcmds[subcmd] = name
+    if decodeFunc is not None or renderFunc is not None:
+      cls.registerHandler(0, subcmd, decodeFunc, renderFunc)
 
-  def decode(self):
-    out = str(self)
+  @classmethod
+  def commandName(cls, command):
+    """ Liefert den Namen des Befehls oder None
+    """
+    cls.__loadNames()
+    return cls.__commands.get(command)
+
+  @classmethod
+  def commandNumber(cls, name):
+    """ Liefert die Nummer eines Befehls zu seinem Namen oder None
+    """
+    cls.__loadNames()
+    for command, commandName in cls.__commands.items():
+      if commandName == name:
+        return command
+    return None
+
+  @classmethod
+  def directionName(cls, direction):
+    """ Liefert den Namen der Fahrtrichtung (0-3) oder None
+    """
+    cls.__loadNames()
+    if 0 <= direction < len(cls.__directions):
+      return cls.__directions[direction]
+    return None
+
+  @classmethod
+  def subcommandName(cls, subcmd):
+    """ Liefert den Namen des System-Subcommands oder None
+    """
+    cls.__loadNames()
+    return cls.__subcmds.get(subcmd)
+
+  # ---------------------------------------------------------------------------
+  # Textausgabe
+  # ---------------------------------------------------------------------------
+  @classmethod
+  def render(cls, rec):
+    """ Erzeugt die Textausgabe aus einem McanRecord
+    """
+    out = str(rec.frame)
     out += linesep
-    out += self.__getFormatedOut('Msg-Type:', self.__cmdType[self.__response])
-    out += self.__getFormatedOut('Command:', self.__decodeCmd())
-    out += self.__getFormatedOut('DataLenCount:', self.getByte('dlc'))
-    if self.__isValidCmd():
-      decodeFuncs = {  0 : self.__decodeCmd00
-                    ,  2 : self.__decodeCmd02
-                    ,  4 : self.__decodeCmd04
-                    ,  6 : self.__decodeCmd06
-                    ,  8 : self.__decodeCmd08
-                    , 10 : self.__decodeCmd10
-                    , 12 : self.__decodeCmd12
-                    , 14 : self.__decodeCmd14
-                    , 16 : self.__decodeCmd16
-                    , 22 : self.__decodeCmd22
-                    , 34 : self.__decodeCmd34
-                    , 48 : self.__decodeCmd48
-                    , 58 : self.__decodeCmd58
-                    }
-      out += decodeFuncs[self.__command]()
+    out += cls.formatLine('Msg-Type:', cls.__cmdType[rec.response])
+    out += cls.formatLine('Command:', cls.__getCmdName(rec.command))
+    out += cls.formatLine('DataLenCount:', rec.dlc)
+    handler = cls.__getHandler(rec.command, rec.key)
+    if handler is not None:
+      out += handler[1](rec)
     return out
 
-  def __isValidCmd(self):
-    return self.__command in self.__commands.keys()
-
-  def __isValidSubCmd(self):
-    return self.getByte('d4') in self.__subcmds.keys()
-
-  def __getFormatedOut(self, msg, val):
-    return self.__outFormat.format(msg, val) + linesep
-
-  def __getFormatedIdOut(self):
-    deviceId = '{:02x}'.format(self.getByte('d0'))
-    deviceId += ' {:02x}'.format(self.getByte('d1'))
-    deviceId += ' {:02x}'.format(self.getByte('d2'))
-    deviceId += ' {:02x}'.format(self.getByte('d3'))
-    return self.__getFormatedOut('Device-ID:', deviceId)
-
-  def __decodeCmd00(self):
-    out = self.__getFormatedIdOut()
-    if self.__isValidSubCmd():
-      subCmd = self.getByte('d4')
-      subCmdB = self.getByte('d4').to_bytes(1, 'little')
-      subCmdName = '{} ({}) {}'.format(subCmd, subCmdB.hex(), self.__subcmds[subCmd])
-      out += self.__getFormatedOut('Subcommand:',subCmdName)
-      decodeFuncs = {  0 : self.__decodeCmd00Sub00
-                    ,  1 : self.__decodeCmd00Sub01
-                    ,  2 : self.__decodeCmd00Sub02
-                    ,  3 : self.__decodeCmd00Sub03
-                    ,  4 : self.__decodeCmd00Sub04
-                    ,  9 : self.__decodeCmd00Sub09
-                    , 10 : self.__decodeCmd00Sub0a
-                    , 11 : self.__decodeCmd00Sub0b
-                    , 48 : self.__decodeCmd00Sub30
-                    }
-      out += decodeFuncs[subCmd]()
-    else:
-      out += self.__getFormatedOut('Subcommand:','{} ({}) unknown subcommand'.format(subCmd, subCmdB.hex()))
-    return out
-  def __decodeCmd00Sub00(self):
-    return ''
-  def __decodeCmd00Sub01(self):
-    return ''
-  def __decodeCmd00Sub02(self):
-    return ''
-  def __decodeCmd00Sub03(self):
-    return ''
-  def __decodeCmd00Sub04(self):
+  @classmethod
+  def formatLine(cls, msg, val):
+    """ Liefert eine formatierte Ausgabezeile
+    """
+    return cls.__outFormat.format(msg, val) + linesep
+
+  @classmethod
+  def __getCmdName(cls, command):
+    name = cls.commandName(command)
+    if name is None:
+      name = 'unknown command'
+    return '{0} ({0:02x}) - {1}'.format(command, name)
+
+# -----------------------------------------------------------------------------
+# Funktionen zur Dekodierung und Textausgabe der bekannten Befehle
+# -----------------------------------------------------------------------------
+def decodeDevice(msg, rec):
+  """ Device-ID (d0-d3)
+  """
+  rec.deviceId = msg.getDeviceId()
+
+def renderDevice(rec):
+  if rec.deviceId is None:
     return ''
-  def __decodeCmd00Sub09(self):
-    return self.__getFormatedOut('NN-counter:','{} {}'.format(self.getByte('d5')
-                                                             ,self.getByte('d6')))
-  def __decodeCmd00Sub0a(self):
-    return self.__getFormatedOut('Chanel:',self.getByte('d5'))
-  def __decodeCmd00Sub0b(self):
-    return self.__getFormatedOut('Chanel:',self.getByte('d5'))
-  def __decodeCmd00Sub30(self):
-    return self.__getFormatedOut('Value:',self.getByte('d5'))
-
-  def __decodeCmd02(self):
-    out = ''
-    if self.__dlc in [1,5,6]:
-      decodeFuncs = {  1 : self.__decodeCmd02Dlc01
-                    ,  5 : self.__decodeCmd02Dlc05
-                    ,  6 : self.__decodeCmd02Dlc06
-                    }
-      out += decodeFuncs[self.__dlc]()
-    else:
-      out += self.__getFormatedOut('Subcommand:','unknown datalength for this subcommand')
-    return out
-  def __decodeCmd02Dlc01(self):
-    out = ''
-    if self.__d0 == 33:
-      out  += self.__getFormatedOut('Protocol:','MM2')
-    else:
-      if self.__d0 < 33:
-        out += self.__getFormatedOut('Protocol:','MFX-ProgRail - {:02x}'.format(self.getByte('d0')))
-      else:
-        out += self.__getFormatedOut('Protocol:','MFX-MainRail - {:02x}'.format(self.getByte('d0')))
-    return out
-  def __decodeCmd02Dlc05(self):
-    out = self.__getFormatedIdOut()
-    if self.__d4 == 33:
-      out  += self.__getFormatedOut('Protocol:','MM2')
-    else:
-      if self.__d4 < 33:
-        out += self.__getFormatedOut('Protocol:','MFX-ProgRail - {:02x}'.format(self.getByte('d4')))
-      else:
-        out += self.__getFormatedOut('Protocol:','MFX-MainRail - {:02x}'.format(self.getByte('d4')))
-    return out
-  def __decodeCmd02Dlc06(self):
-    out = self.__decodeCmd02Dlc05()
-    out += self.__getFormatedOut('Signal-Quality:',self.__bToHex(self.__d5))
-    return out
+  deviceId = '{:02x} {:02x} {:02x} {:02x}'.format( rec.deviceId >> 24
+                                                 , (rec.deviceId >> 16) & 0xff
+                                                 , (rec.deviceId >> 8) & 0xff
+                                                 , rec.deviceId & 0xff)
+  return McanDecode.formatLine('Device-ID:', deviceId)
 
-  def __decodeCmd04(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _decodeDeviceIfSent(msg, rec):
+  if rec.dlc >= 4:
+    rec.deviceId = msg.getDeviceId()
 
-  def __decodeCmd06(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _decodeSystem(msg, rec):
+  rec.deviceId = msg.getDeviceId()
+  rec.subcommand = msg.array[D4]
 
-  def __decodeCmd08(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _renderSystem(rec):
+  out = renderDevice(rec)
+  subCmdName = McanDecode.subcommandName(rec.subcommand)
+  if subCmdName is None:
+    subCmdName = 'unknown subcommand'
+  return out + McanDecode.formatLine('Subcommand:'
+                                    ,'{0} ({0:02x}) {1}'.format(rec.subcommand, subCmdName))
 
-  def __decodeCmd10(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _decodeSystemCounter(msg, rec):
+  _decodeSystem(msg, rec)
+  rec.counter = (msg.array[D5], msg.array[D6])
 
-  def __decodeCmd12(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _renderSystemCounter(rec):
+  return _renderSystem(rec) + McanDecode.formatLine('NN-counter:', '{} {}'.format(*rec.counter))
 
-  def __decodeCmd14(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _decodeSystemChannel(msg, rec):
+  _decodeSystem(msg, rec)
+  rec.channel = msg.array[D5]
 
-  def __decodeCmd16(self):
-    out = self.__getFormatedIdOut()
-    return out
+def _renderSystemChannel(rec):
+  return _renderSystem(rec) + McanDecode.formatLine('Chanel:', rec.channel)
 
-  def __decodeCmd22(self):
-    out = self.__getFormatedIdOut()
-    out += self.__getFormatedOut('Position:', self.getByte('d4'))
-    out += self.__getFormatedOut('Strom:', self.getByte('d5'))
-    if self.getByte('dlc') == 8:
-      out += self.__getFormatedOut('Schaltzeit:', '{} {}'.format(self.getByte('d6'), self.getByte('d7')))
-    return out
+def _decodeSystemValue(msg, rec):
+  _decodeSystem(msg, rec)
+  rec.value = msg.array[D5]
 
-  def __decodeCmd34(self):
-    out  = self.__getFormatedIdOut()
-    out += self.__getFormatedOut('device:', self.getByte('d0')*256 + self.getByte('d1'))
-    out += self.__getFormatedOut('contact:', self.getByte('d2')*256 + self.getByte('d3'))
-    out += self.__getFormatedOut('state(recent):', self.getByte('d4'))
-    out += self.__getFormatedOut('state:', self.getByte('d5'))
-    return out
+def _renderSystemValue(rec):
+  return _renderSystem(rec) + McanDecode.formatLine('Value:', rec.value)
 
-  def __decodeCmd48(self):
-    out = self.__getFormatedIdOut()
-    if self.__response != 1:
-      pass
-    else:
-      out += self.__getFormatedOut('SW-Version:', '{}.{}'.format(self.getByte('d4'), self.getByte('d5')))
-      out += self.__getFormatedOut('DB-Version:', '{}.{}'.format(self.getByte('d6'), self.getByte('d7')))
-    return out
+def _decodeDiscoveryNoDevice(msg, rec):
+  rec.protocol = msg.array[D0]
 
-  def __decodeCmd58(self):
-    dlc = self.getByte('dlc')
-    if dlc == 5 or dlc == 6:
-      return self.__getFormatedIdOut()
-
-  def __decodeCmd(self):
-    out = '{0} ({0:02x}) - '.format(self.__command)
-    if self.__isValidCmd():
-      out += self.__commands[self.__command]
-    else:
-      out += 'unknown command'
-    return out
+def _decodeDiscovery(msg, rec):
+  arr = msg.array
+  rec.deviceId = msg.getDeviceId()
+  rec.protocol = arr[D4]
+  if rec.dlc == 6:
+    rec.signalQuality = arr[D5]
+
+def _getProtocolName(protocol):
+  if protocol == 33:
+    return 'MM2'
+  if protocol < 33:
+    return 'MFX-ProgRail - {:02x}'.format(protocol)
+  return 'MFX-MainRail - {:02x}'.format(protocol)
+
+def _renderDiscovery(rec):
+  out = renderDevice(rec)
+  out += McanDecode.formatLine('Protocol:', _getProtocolName(rec.protocol))
+  if rec.signalQuality is not None:
+    out += McanDecode.formatLine('Signal-Quality:', '{:02x}'.format(rec.signalQuality))
+  return out
+
+def _decodeNothing(msg, rec):
+  pass
+
+def _renderUnknownDlc(rec):
+  return McanDecode.formatLine('Subcommand:','unknown datalength for this subcommand')
+
+def _decodeLocSpeed(msg, rec):
+  rec.deviceId = msg.getDeviceId()
+  if rec.dlc == 6:
+    rec.speed = (msg.array[D4] << 8) | msg.array[D5]
+
+def _renderLocSpeed(rec):
+  out = renderDevice(rec)
+  if rec.speed is not None:
+    out += McanDecode.formatLine('Speed:', rec.speed)
+  return out
+
+def _decodeLocDirection(msg, rec):
+  rec.deviceId = msg.getDeviceId()
+  if rec.dlc == 5:
+    rec.direction = msg.array[D4]
+
+def _renderLocDirection(rec):
+  out = renderDevice(rec)
+  if rec.direction is not None:
+    name = McanDecode.directionName(rec.direction)
+    out += McanDecode.formatLine('Direction:', '{} {}'.format(rec.direction, name))
+  return out
+
+def _decodeLocFunction(msg, rec):
+  rec.deviceId = msg.getDeviceId()
+  if rec.dlc >= 5:
+    rec.function = msg.array[D4]
+  if rec.dlc >= 6:
+    rec.value = msg.array[D5]
+
+def _renderLocFunction(rec):
+  out = renderDevice(rec)
+  if rec.function is not None:
+    out += McanDecode.formatLine('Function:', rec.function)
+  if rec.value is not None:
+    out += McanDecode.formatLine('Value:', rec.value)
+  return out
+
+def _decodeSwitch(msg, rec):
+  arr = msg.array
+  rec.deviceId = msg.getDeviceId()
+  rec.position = arr[D4]
+  rec.current = arr[D5]
+  if rec.dlc == 8:
+    rec.switchTime = (arr[D6], arr[D7])
+
+def _renderSwitch(rec):
+  out = renderDevice(rec)
+  out += McanDecode.formatLine('Position:', rec.position)
+  out += McanDecode.formatLine('Strom:', rec.current)
+  if rec.switchTime is not None:
+    out += McanDecode.formatLine('Schaltzeit:', '{} {}'.format(*rec.switchTime))
+  return out
+
+def _decodeTrackState(msg, rec):
+  arr = msg.array
+  rec.deviceId = msg.getDeviceId()
+  rec.device = (arr[D0] << 8) | arr[D1]
+  rec.contact = (arr[D2] << 8) | arr[D3]
+  rec.recentState = arr[D4]
+  rec.state = arr[D5]
+
+def _renderTrackState(rec):
+  out  = renderDevice(rec)
+  out += McanDecode.formatLine('device:', rec.device)
+  out += McanDecode.formatLine('contact:', rec.contact)
+  out += McanDecode.formatLine('state(recent):', rec.recentState)
+  out += McanDecode.formatLine('state:', rec.state)
+  return out
+
+def _decodeS88Polling(msg, rec):
+  arr = msg.array
+  if rec.dlc >= 4:
+    rec.deviceId = msg.getDeviceId()
+  if rec.dlc >= 5:
+    rec.value = arr[D4]
+  if rec.dlc == 7:
+    rec.state = (arr[D5] << 8) | arr[D6]
+
+def _renderS88Polling(rec):
+  out = renderDevice(rec)
+  if rec.value is not None:
+    out += McanDecode.formatLine('Module:', rec.value)
+  if rec.state is not None:
+    out += McanDecode.formatLine('state:', '{:016b}'.format(rec.state))
+  return out
+
+def _decodePing(msg, rec):
+  arr = msg.array
+  rec.deviceId = msg.getDeviceId()
+  if rec.response == 1:
+    rec.swVersion = (arr[D4], arr[D5])
+    rec.dbVersion = (arr[D6], arr[D7])
+
+def _renderPing(rec):
+  out = renderDevice(rec)
+  if rec.swVersion is not None:
+    out += McanDecode.formatLine('SW-Version:', '{}.{}'.format(*rec.swVersion))
+    out += McanDecode.formatLine('DB-Version:', '{}.{}'.format(*rec.dbVersion))
+  return out
+
+def _decodeStatusConfig(msg, rec):
+  if rec.dlc == 5 or rec.dlc == 6:
+    rec.deviceId = msg.getDeviceId()
+
+def _decodeConfigQuery(msg, rec):
+  rec.value = bytes(msg.array[D0:D0+rec.dlc]).split(b'\x00', 1)[0].decode('ascii', 'replace')
+
+def _renderConfigQuery(rec):
+  return McanDecode.formatLine('Filename:', rec.value)
+
+def _decodeConfigStream(msg, rec):
+  arr = msg.array
+  if rec.dlc == 6 or rec.dlc == 7:
+    rec.length = msg.getDeviceId()
+    rec.crc = (arr[D4] << 8) | arr[D5]
+
+def _renderConfigStream(rec):
+  if rec.length is None:
+    return ''
+  out  = McanDecode.formatLine('Length:', rec.length)
+  out += McanDecode.formatLine('CRC:', '{:04x}'.format(rec.crc))
+  return out
+
+McanDecode.registerCommand(0x00, None, _decodeSystem, _renderSystem, D4)
+McanDecode.registerCommand(0x02, None, _decodeNothing, _renderUnknownDlc, DLC)
+McanDecode.registerCommand(0x04, None)
+McanDecode.registerCommand(0x06, None)
+McanDecode.registerCommand(0x08, None, _decodeLocSpeed, _renderLocSpeed)
+McanDecode.registerCommand(0x0a, None, _decodeLocDirection, _renderLocDirection)
+McanDecode.registerCommand(0x0c, None, _decodeLocFunction, _renderLocFunction)
+McanDecode.registerCommand(0x0e, None)
+McanDecode.registerCommand(0x10, None)
+McanDecode.registerCommand(0x16, None, _decodeSwitch, _renderSwitch)
+McanDecode.registerCommand(0x20, None, _decodeS88Polling, _renderS88Polling)
+McanDecode.registerCommand(0x22, None, _decodeTrackState, _renderTrackState)
+McanDecode.registerCommand(0x30, None, _decodePing, _renderPing)
+McanDecode.registerCommand(0x36, None, _decodeDeviceIfSent)
+McanDecode.registerCommand(0x3a, None, _decodeStatusConfig)
+McanDecode.registerCommand(0x40, None, _decodeConfigQuery, _renderConfigQuery)
+McanDecode.registerCommand(0x42, None, _decodeConfigStream, _renderConfigStream)
+
+McanDecode.registerHandler(0x02, 1, _decodeDiscoveryNoDevice, _renderDiscovery)
+McanDecode.registerHandler(0x02, 5, _decodeDiscovery, _renderDiscovery)
+McanDecode.registerHandler(0x02, 6, _decodeDiscovery, _renderDiscovery)
+
+McanDecode.registerSubcommand(0x09, None, _decodeSystemCounter, _renderSystemCounter)
+McanDecode.registerSubcommand(0x0a, None, _decodeSystemChannel, _renderSystemChannel)
+McanDecode.registerSubcommand(0x0b, None, _decodeSystemChannel, _renderSystemChannel)
+McanDecode.registerSubcommand(0x30, None, _decodeSystemValue, _renderSystemValue)
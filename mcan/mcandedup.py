@@ -0,0 +1,117 @@
+""" mcandedup.py
+    Unterdrueckung gleicher Datenrahmen innerhalb eines Zeitfensters, z.B.
+    bei Wiederholungen von MFX Verify (0x06), Member ping (0x30) oder
+    Track state (0x22).
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from collections import OrderedDict
+try:
+  from time import monotonic
+except ImportError:
+  # MicroPython
+  from time import ticks_ms
+  def monotonic():
+    return ticks_ms() / 1000
+
+from .mcanmsgarray import McanMsgArray, MSGLEN, CMDANDRESP, HASHH, DLC, D0, byteOffset
+
+# -----------------------------------------------------------------------------
+# Klasse fuer den Filter
+# -----------------------------------------------------------------------------
+class McanDedup():
+  """ Filter fuer gleiche Datenrahmen.
+      Ein Datenrahmen ist ein Duplikat, wenn er gleich dem letzten fuer
+      seinen Schluessel durchgelassenen Datenrahmen ist und dieser vor
+      weniger als window Sekunden durchgelassen wurde. Eine Aenderung
+      (z.B. Track state EIN -> AUS -> EIN) wird also immer weitergegeben.
+      Schluessel sind cmdAndResp, Hash und bei dlc >= 4 d0-d3 (Device-ID
+      bzw. Geraet und Kontakt) oder nur die Bytes in fields (Namen wie in
+      McanMsgArray, z.B. ('cmdAndResp', 'd2', 'd3')).
+      Die Schluessel stehen in einem LRU-Speicher mit hoechstens
+      maxEntries Eintraegen. commands begrenzt den Filter auf bestimmte
+      Befehle (ohne Antwortbit), alle anderen werden immer durchgelassen.
+      Unterdrueckte Datenrahmen werden gezaehlt (suppressed, je Befehl in
+      suppressedCommands).
+  """
+  def __init__(self, window=0.5, maxEntries=1024, fields=None, commands=None
+              , clock=monotonic):
+    self.__window = window
+    self.__maxEntries = maxEntries
+    self.__positions = None
+    if fields is not None:
+      self.__positions = tuple(byteOffset(name) for name in fields)
+    self.__commands = None if commands is None else frozenset(commands)
+    self.__clock = clock
+    self.__seen = OrderedDict()
+    self.passed = 0
+    self.suppressed = 0
+    self.suppressedCommands = {}
+
+  def __len__(self):
+    return len(self.__seen)
+
+  def reset(self):
+    self.__seen.clear()
+    self.passed = 0
+    self.suppressed = 0
+    self.suppressedCommands = {}
+
+  def __key(self, arr):
+    if self.__positions is None:
+      if arr[DLC] >= 4:
+        return (arr[CMDANDRESP], arr[HASHH], arr[HASHH+1], arr[D0], arr[D0+1], arr[D0+2], arr[D0+3])
+      return (arr[CMDANDRESP], arr[HASHH], arr[HASHH+1])
+    return bytes(arr[pos] for pos in self.__positions)
+
+  def isDuplicate(self, msg, now=None):
+    """ Prueft einen Datenrahmen (McanMsgArray oder 13 Bytes) und merkt ihn
+        sich. now ist die Zeit in Sekunden (Vorgabe: clock()), z.B. der
+        Zeitstempel aus einem Mitschnitt.
+    """
+    arr = msg.array if isinstance(msg, McanMsgArray) else msg
+    command = arr[CMDANDRESP] & 0xfe
+    if self.__commands is not None and command not in self.__commands:
+      self.passed += 1
+      return False
+    if now is None:
+      now = self.__clock()
+    key = self.__key(arr)
+    frame = bytes(arr[:MSGLEN])
+    seen = self.__seen
+    last = seen.get(key)
+    if last is not None and last[0] == frame and now - last[1] < self.__window:
+      seen.move_to_end(key)
+      self.suppressed += 1
+      self.suppressedCommands[command] = self.suppressedCommands.get(command, 0) + 1
+      return True
+    seen[key] = (frame, now)
+    seen.move_to_end(key)
+    if len(seen) > self.__maxEntries:
+      seen.popitem(last=False)
+    self.passed += 1
+    return False
+
+  def filter(self, frames, now=None):
+    """ Liefert die Liste der Datenrahmen ohne Duplikate
+    """
+    if now is None:
+      now = self.__clock()
+    return [msg for msg in frames if not self.isDuplicate(msg, now)]
+
+  def wrap(self, handler):
+    """ Liefert einen Handler fuer McanGateway, der nur die Datenrahmen
+        ohne Duplikate an handler(frames) weitergibt
+    """
+    def dedupHandler(frames):
+      frames = self.filter(frames)
+      if frames:
+        handler(frames)
+    return dedupHandler
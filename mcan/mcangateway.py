@@ -0,0 +1,215 @@
+""" mcangateway.py
+    asyncio-Anbindung an ein CS2 bzw. einen CAN-Gateway.
+    Die Datenrahmen werden roh (je 13 Bytes) per UDP (Empfang auf 15730,
+    Senden an 15731) oder TCP (15731) uebertragen.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import asyncio
+
+from .mcanmsgarray import McanMsgArray, MSGLEN
+
+UDP_RECV_PORT = 15730
+UDP_SEND_PORT = 15731
+TCP_PORT      = 15731
+
+# -----------------------------------------------------------------------------
+# Protokolle fuer asyncio
+# -----------------------------------------------------------------------------
+class _McanProtocol(asyncio.BaseProtocol):
+  def __init__(self, gateway):
+    self._gateway = gateway
+
+  def pause_writing(self):
+    self._gateway._pauseWriting()
+
+  def resume_writing(self):
+    self._gateway._resumeWriting()
+
+  def connection_lost(self, exc):
+    self._gateway._connectionLost(exc)
+
+class _McanUdpProtocol(_McanProtocol, asyncio.DatagramProtocol):
+  def datagram_received(self, data, addr):
+    self._gateway._received(data)
+
+  def error_received(self, exc):
+    self._gateway._errorReceived(exc)
+
+class _McanTcpProtocol(_McanProtocol, asyncio.Protocol):
+  def data_received(self, data):
+    self._gateway._streamReceived(data)
+
+# -----------------------------------------------------------------------------
+# Klasse fuer die Verbindung zum Gateway
+# -----------------------------------------------------------------------------
+class McanGateway():
+  """ Verbindung zu einem CS2/CAN-Gateway.
+      Empfangene Datenrahmen werden als McanMsgArray auf den empfangenen
+      Daten (ohne Kopie) gesammelt und einmal je Durchlauf der Eventloop
+      als Liste an handler(frames) uebergeben.
+      Gesendet wird mit send()/sendFrames() ohne Warten oder mit
+      write()/writeFrames(), die vorher warten, solange der Transport
+      das Senden angehalten hat (Sendepuffer voll, vgl. drain()).
+      Datagramme kuerzer als ein Datenrahmen und unvollstaendige
+      Datenrahmen am Ende eines Datagramms werden verworfen und in dropped
+      gezaehlt, Fehler des Sockets (UDP) in errors, der letzte steht in
+      lastError.
+      Mit metrics (McanMetrics) werden empfangene, gesendete und verworfene
+      Datenrahmen und die Fehler zusaetzlich dort gezaehlt.
+  """
+  def __init__(self, handler, metrics=None):
+    self.__handler = handler
+    self.__metrics = metrics
+    self.__transport = None
+    self.__remote = None
+    self.__pending = []
+    self.__rest = b''
+    self.__canWrite = asyncio.Event()
+    self.__canWrite.set()
+    self.__closed = None
+    self.dropped = 0
+    self.errors = 0
+    self.lastError = None
+
+  async def openUdp(self, host, sendPort=UDP_SEND_PORT, recvPort=UDP_RECV_PORT
+                   , localHost='0.0.0.0'):
+    """ Oeffnet die UDP-Verbindung. Empfangen wird auf (localHost, recvPort),
+        gesendet an (host, sendPort).
+    """
+    loop = asyncio.get_running_loop()
+    self.__closed = loop.create_future()
+    self.__remote = (host, sendPort)
+    self.__transport, _ = await loop.create_datagram_endpoint(
+                              lambda: _McanUdpProtocol(self)
+                            , local_addr=(localHost, recvPort))
+
+  async def openTcp(self, host, port=TCP_PORT):
+    """ Oeffnet die TCP-Verbindung zu (host, port)
+    """
+    loop = asyncio.get_running_loop()
+    self.__closed = loop.create_future()
+    self.__remote = None
+    self.__transport, _ = await loop.create_connection(
+                              lambda: _McanTcpProtocol(self), host, port)
+
+  @property
+  def localAddress(self):
+    return self.__transport.get_extra_info('sockname')
+
+  @property
+  def isWritable(self):
+    """ Nimmt der Transport Daten an (kein Gegendruck)?
+    """
+    return self.__canWrite.is_set()
+
+  def send(self, frame):
+    """ Sendet einen Datenrahmen (McanMsgArray/McanCommand oder 13 Bytes)
+    """
+    if isinstance(frame, McanMsgArray):
+      frame = frame.array
+    if self.__metrics is not None:
+      self.__metrics.countSent(1)
+    if self.__remote is None:
+      self.__transport.write(frame)
+    else:
+      self.__transport.sendto(frame, self.__remote)
+
+  def sendFrames(self, buf):
+    """ Sendet mehrere hintereinander liegende Datenrahmen aus buf
+    """
+    if self.__metrics is not None:
+      self.__metrics.countSent(len(buf) // MSGLEN)
+    if self.__remote is None:
+      self.__transport.write(buf)
+      return
+    view = memoryview(buf)
+    for offset in range(0, len(view) - MSGLEN + 1, MSGLEN):
+      self.__transport.sendto(view[offset:offset+MSGLEN], self.__remote)
+
+  async def drain(self):
+    """ Wartet, bis der Transport wieder Daten annimmt
+    """
+    await self.__canWrite.wait()
+
+  async def write(self, frame):
+    """ Wie send(), wartet aber vorher, bis der Transport Daten annimmt
+    """
+    await self.__canWrite.wait()
+    self.send(frame)
+
+  async def writeFrames(self, buf):
+    """ Wie sendFrames(), wartet aber vorher, bis der Transport Daten annimmt
+    """
+    await self.__canWrite.wait()
+    self.sendFrames(buf)
+
+  def close(self):
+    if self.__transport is not None:
+      self.__transport.close()
+
+  async def waitClosed(self):
+    if self.__closed is not None:
+      await self.__closed
+
+  # ---------------------------------------------------------------------------
+  # Aufrufe aus den Protokollen
+  # ---------------------------------------------------------------------------
+  def _received(self, data):
+    if len(data) % MSGLEN:
+      # zu kurzes Datagramm bzw. unvollstaendiger Datenrahmen am Ende
+      self.dropped += 1
+      if self.__metrics is not None:
+        self.__metrics.countDropped()
+      if len(data) < MSGLEN:
+        return
+    if self.__metrics is not None:
+      self.__metrics.countReceived(len(data) // MSGLEN)
+    if not self.__pending:
+      asyncio.get_running_loop().call_soon(self.__flush)
+    for offset in range(0, len(data) - MSGLEN + 1, MSGLEN):
+      self.__pending.append(McanMsgArray(data, offset))
+
+  def _streamReceived(self, data):
+    data = memoryview(data)
+    if self.__rest:
+      # nur der auf zwei Pakete verteilte Datenrahmen wird kopiert
+      need = MSGLEN - len(self.__rest)
+      if len(data) < need:
+        self.__rest += data
+        return
+      self._received(self.__rest + data[:need])
+      data = data[need:]
+    usable = len(data) - len(data) % MSGLEN
+    if usable:
+      self._received(data[:usable])
+    self.__rest = bytes(data[usable:])
+
+  def __flush(self):
+    frames = self.__pending
+    self.__pending = []
+    self.__handler(frames)
+
+  def _errorReceived(self, exc):
+    self.errors += 1
+    self.lastError = exc
+    if self.__metrics is not None:
+      self.__metrics.countError()
+
+  def _pauseWriting(self):
+    self.__canWrite.clear()
+
+  def _resumeWriting(self):
+    self.__canWrite.set()
+
+  def _connectionLost(self, exc):
+    self.__canWrite.set()
+    if self.__closed is not None and not self.__closed.done():
+      self.__closed.set_result(exc)
@@ -9,6 +9,33 @@
     ---------------------------------------------------------------------------
     (c) 2020
 """
+from array import array
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from .mcanmsgarray import CMDANDRESP
+
+def mcanHash(val):
+  """ Liefert den 2 Byte langen MCAN-Hash eines Wertes als int.
+  """
+  val4Bytes = val & 0xffffffff
+  hash = (val4Bytes >> 16) ^ (val4Bytes & 0xffff)
+  return (((hash << 3) & 0xFF00) | 0x0300) | (hash & 0x7F)
+
+def hashArray(uids):
+  """ Berechnet die MCAN-Hashes fuer viele UIDs auf einmal.
+      Liefert ein numpy-Array (uint16), falls numpy vorhanden ist,
+      sonst ein array.array('H').
+  """
+  if numpy is not None:
+    vals = numpy.asarray(uids, dtype=numpy.uint64) & 0xffffffff
+    hash = ((vals >> 16) ^ (vals & 0xffff)).astype(numpy.uint16)
+    return ((hash << 3) & 0xFF00) | 0x0300 | (hash & 0x7F)
+  return array('H', [mcanHash(uid) for uid in uids])
+
 # -----------------------------------------------------------------------------
 # Klasse zur Erstellung bzw. Verwaltung eines MCAN-Hashes
 # -----------------------------------------------------------------------------
@@ -17,33 +44,116 @@ class McanHash():
       Ausgewertet werden die letzten 4 Bytes des angegebenen Wertes.
       z.B.: MAC-Adresse: F0-B0-14-9F-AD-E0 -> 0x149fde0
   """
+  __slots__ = ('__val', '__hash')
+
   def __init__(self, val):
     self.__val = val
-    self.__val4Bytes = val & 0xffffffff
-    self.__msb = self.__val4Bytes >> 16;
-    self.__lsb = self.__val4Bytes & 0xffff
-    hash = self.__msb ^ self.__lsb
-    self.__mcanhash = (((hash << 3) & 0xFF00) | 0x0300) | (hash & 0x7F)
+    self.__hash = mcanHash(val)
 
   def __str__(self):
-    return '{:04x}'.format(self.__mcanhash)
+    return '{:04x}'.format(self.__hash)
 
   def __int__(self):
-    return self.__mcanhash
+    return self.__hash
 
   def __repr__(self):
     """ f-String in MicroPython nicht implentiert.
     """
+    val4Bytes = self.__val & 0xffffffff
+    msb = val4Bytes >> 16
+    lsb = val4Bytes & 0xffff
     out  = 'value:     {:>12x}\n'.format(self.__val)
-    out += '  last 4B: {:>12x}\n'.format(self.__val4Bytes)
-    out += '  msb:     {:>12x}\n'.format(self.__msb)
-    out += '  lsb:     {:>12x}\n'.format(self.__lsb)
-    out += '  msb^lsb: {:>12x}\n'.format(self.__msb^self.__lsb)
-    out += 'mcanhash:  {:>12x}'.format(self.__mcanhash)
+    out += '  last 4B: {:>12x}\n'.format(val4Bytes)
+    out += '  msb:     {:>12x}\n'.format(msb)
+    out += '  lsb:     {:>12x}\n'.format(lsb)
+    out += '  msb^lsb: {:>12x}\n'.format(msb^lsb)
+    out += 'mcanhash:  {:>12x}'.format(self.__hash)
     return out
 
   @property
   def __call__(self):
     """ Liefert einen 2Byte langen Hash als int.
     """
-    return self.__mcanhash
+    return self.__hash
+
+# -----------------------------------------------------------------------------
+# Klasse zur Zuordnung von Hashes zu Teilnehmern
+# -----------------------------------------------------------------------------
+class McanHashRegistry():
+  """ Verzeichnis der bekannten Teilnehmer (UIDs) und ihrer Hashes.
+      Zu jedem Hash werden die bekannten UIDs gemerkt, so dass der
+      Absender eines Datenrahmens direkt nachgeschlagen werden kann.
+      Bilden mehrere UIDs denselben Hash, ist das eine Kollision.
+      Der Hash jeder UID wird einmal berechnet und gemerkt (hashOf()).
+  """
+  def __init__(self):
+    self.__uids = {}
+    self.__hashes = {}
+    self.__collisions = set()
+
+  def __len__(self):
+    return len(self.__uids)
+
+  def __contains__(self, mcanHash):
+    return mcanHash in self.__uids
+
+  def hashOf(self, uid):
+    """ Liefert den Hash einer UID: den beobachteten einer angemeldeten
+        UID, sonst den einmal berechneten
+    """
+    mcanhash = self.__hashes.get(uid)
+    if mcanhash is None:
+      mcanhash = mcanHash(uid)
+      self.__hashes[uid] = mcanhash
+    return mcanhash
+
+  def register(self, uid, mcanhash=None):
+    """ Meldet eine UID an und liefert ihren Hash. Ohne mcanhash wird der
+        Hash aus der UID berechnet (hashOf()), sonst der beobachtete Hash
+        genutzt.
+    """
+    if mcanhash is None:
+      mcanhash = self.hashOf(uid)
+    else:
+      self.__hashes[uid] = mcanhash
+    uids = self.__uids.get(mcanhash)
+    if uids is None:
+      self.__uids[mcanhash] = [uid]
+    elif uid not in uids:
+      uids.append(uid)
+      self.__collisions.add(mcanhash)
+    return mcanhash
+
+  def learn(self, msg):
+    """ Wertet einen Datenrahmen (McanMsgArray) aus. Antworten auf den
+        Member ping (0x30) melden den Absender an.
+        Liefert die UID oder None.
+    """
+    if msg.array[CMDANDRESP] != 0x31:
+      return None
+    uid = msg.getDeviceId()
+    self.register(uid, msg.getHash())
+    return uid
+
+  def uids(self, mcanHash):
+    """ Liefert die Liste der UIDs zu einem Hash (leer, wenn unbekannt)
+    """
+    return self.__uids.get(mcanHash, [])
+
+  def sender(self, mcanHash):
+    """ Liefert die UID zu einem Hash oder None, wenn der Hash unbekannt
+        oder nicht eindeutig ist.
+    """
+    uids = self.__uids.get(mcanHash)
+    if uids is None or len(uids) != 1:
+      return None
+    return uids[0]
+
+  def isCollision(self, mcanHash):
+    return mcanHash in self.__collisions
+
+  @property
+  def collisions(self):
+    """ Liefert ein dict Hash -> UIDs fuer alle Kollisionen
+    """
+    return {mcanhash: list(self.__uids[mcanhash]) for mcanhash in self.__collisions}
@@ -0,0 +1,193 @@
+""" mcanloco.py
+    Zwischenspeicher fuer den Zustand der Loks (Geschwindigkeit,
+    Fahrtrichtung, Funktionen), der aus dem mitgelesenen Verkehr auf dem
+    Bus fortgeschrieben wird:
+      0x08 Loc speed      dlc 6: d4-d5 Geschwindigkeit (0-1000)
+      0x0a Loc direction  dlc 5: d4 Fahrtrichtung (vgl. McanDecode.directionName)
+      0x0c Loc function   dlc 6: d4 Funktion, d5 Wert
+    Abfragen (kuerzerer dlc) aendern den Zustand nicht.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from array import array
+
+from .mcanmsgarray import McanMsgArray, CMDANDRESP, DLC, D0, D1, D2, D3, D4, D5
+from .mcandecode import McanRecord
+
+LOCSPEED     = 0x08
+LOCDIRECTION = 0x0a
+LOCFUNCTION  = 0x0c
+
+# Fahrtrichtungen wie im Datenrahmen
+REMAIN   = 0
+FORWARD  = 1
+BACKWARD = 2
+SWITCH   = 3
+
+# typecode fuer vorzeichenlose 32-bit Werte im array-Modul
+_U32 = 'I' if array('I').itemsize == 4 else 'L'
+
+# -----------------------------------------------------------------------------
+# Klasse fuer den Zustand aller bekannten Loks
+# -----------------------------------------------------------------------------
+class McanLocoCache():
+  """ Zustand der Loks je UID.
+      Jede UID erhaelt beim ersten Auftreten einen Platz, die Werte liegen
+      in arrays (speed, direction, functions als Bitmaske der Funktionen
+      0-31, sequence). Jede Aenderung erhoeht die laufende Nummer sequence,
+      changedSince() liefert die seitdem geaenderten Loks.
+  """
+  def __init__(self):
+    self.__slots = {}
+    self.__uids = array(_U32)
+    self.__speed = array('H')
+    self.__direction = array('B')
+    self.__functions = array(_U32)
+    self.__changed = array('q')
+    self.__sequence = 0
+
+  def __len__(self):
+    return len(self.__uids)
+
+  def __contains__(self, uid):
+    return uid in self.__slots
+
+  @property
+  def sequence(self):
+    """ Laufende Nummer der letzten Aenderung
+    """
+    return self.__sequence
+
+  def uids(self):
+    return list(self.__uids)
+
+  def __slot(self, uid):
+    slot = self.__slots.get(uid)
+    if slot is None:
+      slot = len(self.__uids)
+      self.__slots[uid] = slot
+      self.__uids.append(uid)
+      self.__speed.append(0)
+      self.__direction.append(FORWARD)
+      self.__functions.append(0)
+      self.__changed.append(0)
+    return slot
+
+  def __touch(self, slot):
+    self.__sequence += 1
+    self.__changed[slot] = self.__sequence
+
+  # ---------------------------------------------------------------------------
+  # Fortschreiben
+  # ---------------------------------------------------------------------------
+  def update(self, msg):
+    """ Wertet einen Datenrahmen aus (McanMsgArray, McanRecord oder
+        13 Bytes). Liefert True, wenn sich der Zustand geaendert hat.
+    """
+    if isinstance(msg, McanRecord):
+      msg = msg.frame
+    arr = msg.array if isinstance(msg, McanMsgArray) else msg
+    command = arr[CMDANDRESP] & 0xfe
+    dlc = arr[DLC]
+    if command == LOCSPEED and dlc == 6:
+      return self.setSpeed(self.__uid(arr), (arr[D4] << 8) | arr[D5])
+    if command == LOCDIRECTION and dlc == 5:
+      return self.setDirection(self.__uid(arr), arr[D4])
+    if command == LOCFUNCTION and dlc >= 6:
+      return self.setFunction(self.__uid(arr), arr[D4], arr[D5])
+    return False
+
+  def updateFrames(self, frames):
+    """ Wertet mehrere Datenrahmen aus, liefert die Anzahl der Aenderungen
+    """
+    count = 0
+    for msg in frames:
+      if self.update(msg):
+        count += 1
+    return count
+
+  @staticmethod
+  def __uid(arr):
+    return (arr[D0] << 24) | (arr[D1] << 16) | (arr[D2] << 8) | arr[D3]
+
+  def setSpeed(self, uid, speed):
+    slot = self.__slot(uid)
+    if self.__speed[slot] == speed:
+      return False
+    self.__speed[slot] = speed
+    self.__touch(slot)
+    return True
+
+  def setDirection(self, uid, direction):
+    """ Setzt die Fahrtrichtung. SWITCH wechselt sie, REMAIN aendert nichts.
+        Bei einem Wechsel haelt die Lok an (Geschwindigkeit 0).
+    """
+    slot = self.__slot(uid)
+    current = self.__direction[slot]
+    if direction == SWITCH:
+      direction = BACKWARD if current == FORWARD else FORWARD
+    if direction == REMAIN or direction == current:
+      return False
+    self.__direction[slot] = direction
+    self.__speed[slot] = 0
+    self.__touch(slot)
+    return True
+
+  def setFunction(self, uid, function, value):
+    if function > 31:
+      return False
+    slot = self.__slot(uid)
+    bit = 1 << function
+    functions = self.__functions[slot]
+    functions = functions | bit if value else functions & ~bit
+    if functions == self.__functions[slot]:
+      return False
+    self.__functions[slot] = functions
+    self.__touch(slot)
+    return True
+
+  # ---------------------------------------------------------------------------
+  # Abfragen
+  # ---------------------------------------------------------------------------
+  def speed(self, uid):
+    slot = self.__slots.get(uid)
+    return None if slot is None else self.__speed[slot]
+
+  def direction(self, uid):
+    slot = self.__slots.get(uid)
+    return None if slot is None else self.__direction[slot]
+
+  def functions(self, uid):
+    """ Liefert die Funktionen 0-31 als Bitmaske
+    """
+    slot = self.__slots.get(uid)
+    return None if slot is None else self.__functions[slot]
+
+  def function(self, uid, function):
+    functions = self.functions(uid)
+    if functions is None:
+      return None
+    return (functions >> function) & 1 == 1
+
+  def state(self, uid):
+    """ Liefert (speed, direction, functions, sequence) oder None
+    """
+    slot = self.__slots.get(uid)
+    if slot is None:
+      return None
+    return ( self.__speed[slot], self.__direction[slot]
+           , self.__functions[slot], self.__changed[slot])
+
+  def changedSince(self, sequence):
+    """ Liefert die UIDs, deren Zustand nach sequence geaendert wurde
+    """
+    changed = self.__changed
+    uids = self.__uids
+    return [uids[slot] for slot in range(len(uids)) if changed[slot] > sequence]
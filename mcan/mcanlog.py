@@ -0,0 +1,232 @@
+""" mcanlog.py
+    Lesen von Mitschnitten im Textformat, z.B.:
+    16.12.2020 11:34:19 Prio: 00  Command: 30  Response: 01  Hash: b7 13  Dlc: 08  Data: 4d 54 9b c7 03 70 00 32
+
+    Die Datei wird per mmap eingeblendet und zeilenweise gelesen, sie wird
+    also nie vollstaendig in den Speicher geladen.
+    Zeitstempel sind Sekunden seit 1970 (Zeit wie im Log, ohne Zeitzone).
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import mmap
+from array import array
+from calendar import timegm
+from time import gmtime
+
+from .mcanmsgarray import MSGLEN
+from .mcandecode import McanDecode
+
+_TIMEFORMAT = '{:02d}.{:02d}.{:04d} {:02d}:{:02d}:{:02d}'
+_LINEFORMAT = ( _TIMEFORMAT +
+                ' Prio: {:02x}  Command: {:02x}  Response: {:02x}'
+                '  Hash: {:02x} {:02x}  Dlc: {:02x}'
+                '  Data: {:02x} {:02x} {:02x} {:02x} {:02x} {:02x} {:02x} {:02x}'
+              )
+
+# -----------------------------------------------------------------------------
+# Funktionen fuer einzelne Zeilen
+# -----------------------------------------------------------------------------
+def parseTimestamp(text):
+  """ Wandelt 'dd.mm.yyyy hh:mm:ss' (str oder bytes) in Sekunden um
+  """
+  return timegm(( int(text[6:10]), int(text[3:5]), int(text[0:2])
+                , int(text[11:13]), int(text[14:16]), int(text[17:19])
+                , 0, 0, 0))
+
+def formatTimestamp(timestamp):
+  """ Wandelt Sekunden in 'dd.mm.yyyy hh:mm:ss' um
+  """
+  t = gmtime(int(timestamp))
+  return _TIMEFORMAT.format(t[2], t[1], t[0], t[3], t[4], t[5])
+
+def parseLineInto(line, buf, offset=0):
+  """ Schreibt den Datenrahmen einer Logzeile in buf an die Stelle offset.
+      Liefert den Zeitstempel oder None, wenn die Zeile keinen
+      Datenrahmen enthaelt.
+  """
+  fields = line.split()
+  if len(fields) < 22 or fields[2] not in (b'Prio:', 'Prio:'):
+    return None
+  try:
+    timestamp = parseTimestamp(line)
+    buf[offset] = int(fields[3], 16)
+    buf[offset+1] = int(fields[5], 16) | int(fields[7], 16)
+    buf[offset+2] = int(fields[9], 16)
+    buf[offset+3] = int(fields[10], 16)
+    buf[offset+4] = int(fields[12], 16)
+    for i in range(8):
+      buf[offset+5+i] = int(fields[14+i], 16)
+  except ValueError:
+    return None
+  return timestamp
+
+def parseLine(line):
+  """ Liefert (timestamp, bytearray) einer Logzeile oder None
+  """
+  frame = bytearray(MSGLEN)
+  timestamp = parseLineInto(line, frame)
+  if timestamp is None:
+    return None
+  return (timestamp, frame)
+
+def parseLines(lines, start=None, end=None):
+  """ Generator ueber (timestamp, frame) fuer beliebige Zeilen,
+      z.B. eine geoeffnete Datei oder sys.stdin.
+      start und end begrenzen den Zeitraum (end ist exklusiv).
+  """
+  for line in lines:
+    item = parseLine(line)
+    if item is None:
+      continue
+    if start is not None and item[0] < start:
+      continue
+    if end is not None and item[0] >= end:
+      break
+    yield item
+
+def formatLine(timestamp, frame):
+  """ Erzeugt eine Logzeile (ohne Zeilenende) aus Zeitstempel und Datenrahmen
+  """
+  t = gmtime(int(timestamp))
+  return _LINEFORMAT.format( t[2], t[1], t[0], t[3], t[4], t[5]
+                           , frame[0], frame[1] & 0xfe, frame[1] & 0x01
+                           , frame[2], frame[3], frame[4]
+                           , frame[5], frame[6], frame[7], frame[8]
+                           , frame[9], frame[10], frame[11], frame[12])
+
+# -----------------------------------------------------------------------------
+# Klasse zum Lesen einer Logdatei
+# -----------------------------------------------------------------------------
+class McanLogReader():
+  """ Liest eine Logdatei im Textformat per mmap.
+      Die Zeilen muessen zeitlich sortiert sein, damit seek() funktioniert.
+  """
+  def __init__(self, path):
+    self.__file = open(path, 'rb')
+    try:
+      self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+      # leere Datei kann nicht eingeblendet werden
+      self.__map = b''
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def __iter__(self):
+    return self.frames()
+
+  def close(self):
+    if isinstance(self.__map, mmap.mmap):
+      self.__map.close()
+    self.__file.close()
+
+  def seek(self, timestamp):
+    """ Liefert die Position der ersten Zeile mit einem Zeitstempel
+        >= timestamp (binaere Suche).
+    """
+    data = self.__map
+    lo = 0
+    hi = len(data)
+    while lo < hi:
+      mid = (lo + hi) // 2
+      lineStart = data.rfind(b'\n', 0, mid) + 1
+      lineEnd = data.find(b'\n', lineStart)
+      if lineEnd < 0:
+        lineEnd = len(data)
+      try:
+        lineTime = parseTimestamp(data[lineStart:lineStart+19])
+      except ValueError:
+        lineTime = None
+      if lineTime is None or lineTime < timestamp:
+        lo = lineEnd + 1
+      else:
+        hi = lineStart
+    return min(lo, len(data))
+
+  def __len__(self):
+    return len(self.__map)
+
+  def splitPoints(self, chunkSize):
+    """ Liefert Dateipositionen von Zeilenanfaengen im Abstand von etwa
+        chunkSize Bytes, beginnend mit 0 und endend mit der Dateilaenge.
+    """
+    data = self.__map
+    points = [0]
+    pos = chunkSize
+    while pos < len(data):
+      lineEnd = data.find(b'\n', pos - 1)
+      if lineEnd < 0:
+        break
+      if lineEnd + 1 > points[-1]:
+        points.append(lineEnd + 1)
+      pos = lineEnd + 1 + chunkSize
+    if points[-1] < len(data):
+      points.append(len(data))
+    return points
+
+  def lines(self, start=None, pos=0, stop=None):
+    """ Generator ueber die Zeilen ab dem Zeitpunkt start bzw. zwischen
+        den Dateipositionen pos und stop
+    """
+    data = self.__map
+    if start is not None:
+      pos = max(pos, self.seek(start))
+    size = len(data) if stop is None else min(stop, len(data))
+    while pos < size:
+      lineEnd = data.find(b'\n', pos)
+      if lineEnd < 0:
+        lineEnd = size
+      yield data[pos:lineEnd]
+      pos = lineEnd + 1
+
+  def frames(self, start=None, end=None):
+    """ Generator ueber (timestamp, bytearray) im Zeitraum [start, end)
+    """
+    for line in self.lines(start):
+      item = parseLine(line)
+      if item is None:
+        continue
+      if end is not None and item[0] >= end:
+        break
+      yield item
+
+  def decoded(self, start=None, end=None):
+    """ Generator ueber (timestamp, McanDecode) im Zeitraum [start, end)
+    """
+    for timestamp, frame in self.frames(start, end):
+      yield (timestamp, McanDecode(frame))
+
+  def batches(self, size=4096, start=None, end=None, pos=0, stop=None):
+    """ Generator ueber (timestamps, buffer) mit jeweils bis zu size
+        Datenrahmen. timestamps sind ms als array, buffer kann direkt an
+        mcanbatch.decodeFrames() uebergeben werden.
+        pos und stop begrenzen den Bereich der Datei (vgl. splitPoints()).
+    """
+    timestamps = array('q')
+    buf = bytearray(size * MSGLEN)
+    count = 0
+    for line in self.lines(start, pos, stop):
+      timestamp = parseLineInto(line, buf, count * MSGLEN)
+      if timestamp is None:
+        continue
+      if end is not None and timestamp >= end:
+        break
+      timestamps.append(timestamp * 1000)
+      count += 1
+      if count == size:
+        yield (timestamps, buf)
+        timestamps = array('q')
+        buf = bytearray(size * MSGLEN)
+        count = 0
+    if count:
+      yield (timestamps, buf[:count * MSGLEN])
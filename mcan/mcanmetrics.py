@@ -0,0 +1,166 @@
+""" mcanmetrics.py
+    Zaehler und Laufzeit-Histogramme fuer die Dekodierung, den Empfang und
+    das Senden (McanGateway) und die Verteilung (McanRouter)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+try:
+  from time import perf_counter_ns as ticks
+  _TICKS_PER_US = 1000
+
+  def ticks_diff(end, start):
+    return end - start
+except ImportError:
+  # MicroPython: ticks_us() laeuft ueber, Differenzen nur mit ticks_diff()
+  from time import ticks_us as ticks, ticks_diff
+  _TICKS_PER_US = 1
+
+from .mcanmsgarray import CMDANDRESP, HASHH, HASHL
+
+# obere Grenzen der Histogramm-Klassen in Mikrosekunden, die letzte Klasse
+# nimmt alle groesseren Werte auf
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+# -----------------------------------------------------------------------------
+# Klasse fuer die Zaehler
+# -----------------------------------------------------------------------------
+class McanMetrics():
+  """ Zaehlt Datenrahmen je Befehl, Antwortbit und Absender-Hash,
+      unbekannte Befehle und Subcommands und die Laufzeit der Dekodierung
+      in festen Histogramm-Klassen.
+      Einschalten mit McanDecode.setMetrics(McanMetrics()).
+      Dasselbe Objekt kann an McanGateway(handler, metrics=...) (empfangene,
+      gesendete und verworfene Datenrahmen) und McanRouter(metrics=...)
+      (verteilte Datenrahmen, Handler-Aufrufe und Laufzeit der Verteilung)
+      uebergeben werden.
+  """
+  def __init__(self, buckets=LATENCY_BUCKETS):
+    self.__buckets = tuple(bucket * _TICKS_PER_US for bucket in buckets)
+    self.__bucketNames = tuple(buckets) + ('inf',)
+    self.reset()
+
+  def reset(self):
+    """ Setzt alle Zaehler zurueck
+    """
+    self.__frames = 0
+    self.__commands = {}
+    self.__responses = [0, 0]
+    self.__hashes = {}
+    self.__unknownCommands = {}
+    self.__unknownSubcommands = {}
+    self.__latency = [0] * (len(self.__buckets) + 1)
+    self.__latencyTotal = 0
+    self.__received = 0
+    self.__sent = 0
+    self.__dropped = 0
+    self.__errors = 0
+    self.__routed = 0
+    self.__unrouted = 0
+    self.__handlerCalls = 0
+    self.__routeLatency = [0] * (len(self.__buckets) + 1)
+    self.__routeLatencyTotal = 0
+
+  def start(self):
+    """ Liefert den Zeitpunkt fuer den Beginn einer Messung
+    """
+    return ticks()
+
+  def countFrame(self, arr):
+    """ Zaehlt einen Datenrahmen (13 Bytes, z.B. McanMsgArray.array)
+    """
+    cmdAndResp = arr[CMDANDRESP]
+    command = cmdAndResp & 0xfe
+    mcanHash = (arr[HASHH] << 8) | arr[HASHL]
+    self.__frames += 1
+    self.__commands[command] = self.__commands.get(command, 0) + 1
+    self.__responses[cmdAndResp & 0x01] += 1
+    self.__hashes[mcanHash] = self.__hashes.get(mcanHash, 0) + 1
+
+  def countUnknownCommand(self, command):
+    self.__unknownCommands[command] = self.__unknownCommands.get(command, 0) + 1
+
+  def countUnknownSubcommand(self, subcmd):
+    self.__unknownSubcommands[subcmd] = self.__unknownSubcommands.get(subcmd, 0) + 1
+
+  def countReceived(self, frames):
+    """ Zaehlt empfangene Datenrahmen (McanGateway)
+    """
+    self.__received += frames
+
+  def countSent(self, frames):
+    """ Zaehlt gesendete Datenrahmen (McanGateway)
+    """
+    self.__sent += frames
+
+  def countDropped(self):
+    """ Zaehlt ein verworfenes Datagramm bzw. einen unvollstaendigen
+        Datenrahmen am Ende eines Datagramms (McanGateway)
+    """
+    self.__dropped += 1
+
+  def countError(self):
+    """ Zaehlt einen Fehler des Sockets (McanGateway)
+    """
+    self.__errors += 1
+
+  def countRouted(self, handlers):
+    """ Zaehlt einen verteilten Datenrahmen mit der Anzahl der aufgerufenen
+        Handler (McanRouter)
+    """
+    self.__routed += 1
+    self.__handlerCalls += handlers
+    if not handlers:
+      self.__unrouted += 1
+
+  def stop(self, start):
+    """ Beendet eine mit start() begonnene Messung der Dekodierung
+    """
+    elapsed = ticks_diff(ticks(), start)
+    self.__latencyTotal += elapsed
+    self.__latency[self.__bucket(elapsed)] += 1
+
+  def stopRoute(self, start):
+    """ Beendet eine mit start() begonnene Messung der Verteilung
+    """
+    elapsed = ticks_diff(ticks(), start)
+    self.__routeLatencyTotal += elapsed
+    self.__routeLatency[self.__bucket(elapsed)] += 1
+
+  def __bucket(self, elapsed):
+    bucket = 0
+    for limit in self.__buckets:
+      if elapsed <= limit:
+        break
+      bucket += 1
+    return bucket
+
+  def snapshot(self):
+    """ Liefert den Stand aller Zaehler als dict
+    """
+    measured = sum(self.__latency)
+    routeMeasured = sum(self.__routeLatency)
+    return { 'frames'            : self.__frames
+           , 'commands'          : dict(self.__commands)
+           , 'responses'         : {'command': self.__responses[0], 'response': self.__responses[1]}
+           , 'hashes'            : dict(self.__hashes)
+           , 'unknownCommands'   : dict(self.__unknownCommands)
+           , 'unknownSubcommands': dict(self.__unknownSubcommands)
+           , 'latencyUs'         : dict(zip(self.__bucketNames, self.__latency))
+           , 'latencyMeanUs'     : self.__latencyTotal / _TICKS_PER_US / measured if measured else 0
+           , 'received'          : self.__received
+           , 'sent'              : self.__sent
+           , 'dropped'           : self.__dropped
+           , 'errors'            : self.__errors
+           , 'routed'            : self.__routed
+           , 'unrouted'          : self.__unrouted
+           , 'handlerCalls'      : self.__handlerCalls
+           , 'routeLatencyUs'    : dict(zip(self.__bucketNames, self.__routeLatency))
+           , 'routeLatencyMeanUs': self.__routeLatencyTotal / _TICKS_PER_US / routeMeasured if routeMeasured else 0
+           }
@@ -9,21 +9,82 @@
     ---------------------------------------------------------------------------
     (c) 2020
 """
+try:
+  from micropython import const
+except ImportError:
+  def const(val):
+    return val
+
+# Laenge eines can-Datenrahmens in Bytes
+MSGLEN = const(13)
+
+# feste Positionen der einzelnen Bytes im can-Datenrahmen
+PRIO       = const(0)
+CMDANDRESP = const(1)
+HASHH      = const(2)
+HASHL      = const(3)
+DLC        = const(4)
+D0         = const(5)
+D1         = const(6)
+D2         = const(7)
+D3         = const(8)
+D4         = const(9)
+D5         = const(10)
+D6         = const(11)
+D7         = const(12)
+
+# Namen der Bytes und ihre Positionen (einmal je Modul, nicht je Objekt)
+_BYTENAMES = ( 'prio', 'cmdAndResp'
+             , 'hashH', 'hashL'
+             , 'dlc'
+             , 'd0', 'd1', 'd2', 'd3'
+             , 'd4', 'd5', 'd6', 'd7'
+             )
+
+_OFFSETS = { 'prio'       : PRIO
+           , 'cmdAndResp' : CMDANDRESP
+           , 'hashH'      : HASHH
+           , 'hashL'      : HASHL
+           , 'dlc'        : DLC
+           , 'd0'         : D0
+           , 'd1'         : D1
+           , 'd2'         : D2
+           , 'd3'         : D3
+           , 'd4'         : D4
+           , 'd5'         : D5
+           , 'd6'         : D6
+           , 'd7'         : D7
+           }
+
+def byteOffset(byteName):
+  """ Liefert die Position eines Bytes im Datenrahmen zu seinem Namen
+      (vgl. McanMsgArray.bytenames)
+  """
+  try:
+    return _OFFSETS[byteName]
+  except KeyError:
+    raise ValueError('unknown byte name: {}'.format(byteName))
 
 # -----------------------------------------------------------------------------
 # Klasse zur Verwaltung eines Maerklin CANbus Datenframes
 # -----------------------------------------------------------------------------
 class McanMsgArray():
-  __bytenames = [ 'prio', 'cmdAndResp'
-                , 'hashH', 'hashL'
-                , 'dlc'
-                , 'd0', 'd1', 'd2', 'd3'
-                , 'd4', 'd5', 'd6', 'd7'
-                ]
-
-  def __init__(self, canMsgArr=None):
+  """ Klasse zur Verwaltung eines Maerklin CANbus Datenframes
+      Ein uebergebenes bytearray bzw. ein memoryview wird ohne Kopie
+      genutzt. Mit offset kann ein Datenrahmen innerhalb eines groesseren
+      Puffers angesprochen werden.
+      Die Objekte haben keine __dict__ (__slots__), abgeleitete Klassen
+      legen ihre Attribute ebenfalls in __slots__ fest.
+  """
+  __slots__ = ('__canMsgArr',)
+
+  def __init__(self, canMsgArr=None, offset=0):
     if canMsgArr is None:
-      self.__canMsgArr = [0,0,0,0,0,0,0,0,0,0,0,0,0]
+      self.__canMsgArr = bytearray(MSGLEN)
+    elif offset or len(canMsgArr) != MSGLEN:
+      self.__canMsgArr = memoryview(canMsgArr)[offset:offset+MSGLEN]
+      if len(self.__canMsgArr) != MSGLEN:
+        raise ValueError('can frame must be 13 bytes long')
     else:
       self.__canMsgArr = canMsgArr
 
@@ -36,7 +97,7 @@ class McanMsgArray():
   def __repr__(self):
     out =''
     for i in range (0,5,1):
-     out += '{}={:02x} '.format(self.__bytenames[i]
+     out += '{}={:02x} '.format(_BYTENAMES[i]
                                , self.__canMsgArr[i])
     out += 'data='
     for i in range (5,13,1):
@@ -45,14 +106,65 @@ class McanMsgArray():
 
   @property
   def bytenames(self):
-    return self.__bytenames
+    return list(_BYTENAMES)
 
   @property
   def array(self):
     return self.__canMsgArr
 
   def getByte(self, byteName):
-    return self.__canMsgArr[self.__bytenames.index(byteName)]
+    return self.__canMsgArr[_OFFSETS[byteName]]
 
   def setByte(self, byteName, val):
-    self.__canMsgArr[self.__bytenames.index(byteName)] = val
+    self.__canMsgArr[_OFFSETS[byteName]] = val
+
+  def getCommand(self):
+    """ Liefert das Befehls-Byte ohne Antwortbit
+    """
+    return self.__canMsgArr[CMDANDRESP] & 0xfe
+
+  def isResponse(self):
+    """ Ist das Antwortbit gesetzt?
+    """
+    return self.__canMsgArr[CMDANDRESP] & 0x01 == 1
+
+  def getHash(self):
+    """ Liefert den 2 Byte langen Hash als int
+    """
+    arr = self.__canMsgArr
+    return (arr[HASHH] << 8) | arr[HASHL]
+
+  def setHash(self, mcanHash):
+    """ Setzt die beiden Hash-Bytes im can-Datenrahmen
+    """
+    arr = self.__canMsgArr
+    arr[HASHH] = (mcanHash >> 8) & 0xff
+    arr[HASHL] = mcanHash & 0xff
+
+  def getDeviceId(self):
+    """ Liefert die Datenbytes d0-d3 als 32-bit int (UID bzw. Device-ID)
+    """
+    arr = self.__canMsgArr
+    return (arr[D0] << 24) | (arr[D1] << 16) | (arr[D2] << 8) | arr[D3]
+
+  def setDeviceId(self, devId):
+    """ Setzt die Datenbytes d0-d3 aus einem 32-bit int
+    """
+    arr = self.__canMsgArr
+    arr[D0] = (devId >> 24) & 0xff
+    arr[D1] = (devId >> 16) & 0xff
+    arr[D2] = (devId >> 8) & 0xff
+    arr[D3] = devId & 0xff
+
+  def getContact(self):
+    """ Liefert die Datenbytes d2-d3 als 16-bit int (Kontakt)
+    """
+    arr = self.__canMsgArr
+    return (arr[D2] << 8) | arr[D3]
+
+  def setContact(self, contact):
+    """ Setzt die Datenbytes d2-d3 aus einem 16-bit int
+    """
+    arr = self.__canMsgArr
+    arr[D2] = (contact >> 8) & 0xff
+    arr[D3] = contact & 0xff
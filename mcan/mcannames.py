@@ -0,0 +1,49 @@
+""" mcannames.py
+    Namen der Befehle, System-Subcommands und Fahrtrichtungen fuer die
+    Textausgabe von McanDecode. Das Modul wird erst beim ersten Zugriff auf
+    einen Namen geladen, die Dekodierung allein legt die Texte nicht an.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+COMMANDS = { 0x00: 'System command'
+           , 0x02: 'MFX Discovery'
+           , 0x04: 'MFX Bind'
+           , 0x06: 'MFX Verify'
+           , 0x08: 'Loc speed'
+           , 0x0a: 'Loc direction'
+           , 0x0c: 'Loc function'
+           , 0x0e: 'Loc read config'
+           , 0x10: 'Loc write config'
+           , 0x16: 'Equipment switch'
+           , 0x20: 'S88 polling'
+           , 0x22: 'Track state'
+           , 0x30: 'Member ping'
+           , 0x36: 'Bootloader'
+           , 0x3a: 'Statusdata config'
+           , 0x40: 'Config data query'
+           , 0x42: 'Config data stream'
+           }
+
+SUBCOMMANDS = { 0x00: 'STOPP'
+              , 0x01: 'GO'
+              , 0x02: 'HALT'
+              , 0x03: 'Loc emergency stop'
+              , 0x04: 'Loc end cycle'
+              , 0x09: 'MFX new notifying counter'
+              , 0x0a: 'SYSTEM OVERLOAD'
+              , 0x0b: 'System status'
+              , 0x30: 'System ???'
+              }
+
+DIRECTIONS = ( 'remain'
+             , 'forward'
+             , 'backward'
+             , 'switch'
+             )
@@ -0,0 +1,80 @@
+""" mcanparallel.py
+    Dekodierung grosser Mitschnitte (Text- oder Binaerformat) mit
+    mehreren Prozessen. Die Eingabe wird an Grenzen von Datenrahmen
+    aufgeteilt, jeder Prozess liefert seine Spalten als bytes zurueck,
+    die in der Reihenfolge der Eingabe zusammengefuegt werden.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .mcanbatch import McanColumns, decodeFrames
+from .mcancapture import McanCaptureReader, MAGIC, RECORDLEN
+from .mcanlog import McanLogReader
+
+def _decodeLogRange(args):
+  path, pos, stop, batchSize = args
+  parts = []
+  with McanLogReader(path) as reader:
+    for timestamps, buf in reader.batches(batchSize, pos=pos, stop=stop):
+      columns = decodeFrames(buf)
+      columns.timestamps = timestamps
+      parts.append(columns.toBytes())
+  return parts
+
+def _decodeCaptureRange(args):
+  path, first, last, batchSize = args
+  parts = []
+  with McanCaptureReader(path) as reader:
+    for batchFirst in range(first, last, batchSize):
+      timestamps, buf = reader.batch(batchFirst, min(batchFirst + batchSize, last))
+      columns = decodeFrames(buf)
+      columns.timestamps = timestamps
+      parts.append(columns.toBytes())
+  return parts
+
+def isCapture(path):
+  """ Ist die Datei ein binaerer Mitschnitt (mcancapture)?
+  """
+  with open(path, 'rb') as captureFile:
+    return captureFile.read(len(MAGIC)) == MAGIC
+
+def decodeParallel(path, workers=None, chunkSize=1 << 22, batchSize=65536
+                  , useNumpy=True):
+  """ Dekodiert einen Mitschnitt mit workers Prozessen und liefert ein
+      McanColumns-Objekt mit allen Datenrahmen (timestamps in ms).
+      chunkSize ist die ungefaehre Groesse eines Teils der Datei in Bytes;
+      im Binaerformat umfasst ein Teil chunkSize // RECORDLEN Datenrahmen
+      (RECORDLEN Bytes je Datensatz aus Zeitstempel und Datenrahmen).
+  """
+  if isCapture(path):
+    with McanCaptureReader(path) as reader:
+      count = len(reader)
+    step = max(chunkSize // RECORDLEN, 1)
+    tasks = [(path, first, min(first + step, count), batchSize)
+             for first in range(0, count, step)]
+    worker = _decodeCaptureRange
+  else:
+    with McanLogReader(path) as reader:
+      points = reader.splitPoints(chunkSize)
+    tasks = [(path, points[i], points[i+1], batchSize)
+             for i in range(len(points) - 1)]
+    worker = _decodeLogRange
+  parts = []
+  if tasks:
+    with ProcessPoolExecutor(workers) as executor:
+      for taskParts in executor.map(worker, tasks):
+        parts.extend(taskParts)
+  if not parts:
+    empty = decodeFrames(b'', useNumpy=False)
+    empty.timestamps = array('q')
+    parts.append(empty.toBytes())
+  return McanColumns.fromBytes(parts, useNumpy)
@@ -0,0 +1,172 @@
+""" mcanreplay.py
+    Wiedergabe von Mitschnitten (Text- oder Binaerformat) an eine Senke:
+    im originalen Zeitablauf, um einen Faktor beschleunigt bzw. verlangsamt
+    oder so schnell wie moeglich.
+
+    Die Datenrahmen werden blockweise gelesen (McanLogReader.batches()
+    bzw. McanCaptureReader.batch()) und als McanMsgArray auf den Puffer
+    des Blocks uebergeben. Die Sendezeitpunkte werden aus einer
+    monotonen Uhr berechnet, die Abweichung der tatsaechlichen Zeitpunkte
+    steht im McanReplayReport.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import asyncio
+from time import monotonic, sleep
+
+from .mcanmsgarray import McanMsgArray, MSGLEN
+from .mcancapture import McanCaptureReader
+from .mcanlog import McanLogReader
+from .mcanparallel import isCapture
+
+# Geschwindigkeit fuer die Wiedergabe ohne Wartezeiten
+MAXSPEED = None
+
+def _sinkFunction(sink):
+  """ Liefert die Funktion zum Uebergeben eines Datenrahmens an die
+      Senke: Funktion, Warteschlange (put_nowait) oder McanGateway (send)
+  """
+  if hasattr(sink, 'put_nowait'):
+    return sink.put_nowait
+  if hasattr(sink, 'send'):
+    return sink.send
+  return sink
+
+def captureBatches(path, batchSize=1024):
+  """ Generator ueber (timestamps, buffer) eines Mitschnitts,
+      timestamps in ms
+  """
+  if isCapture(path):
+    with McanCaptureReader(path) as reader:
+      for first in range(0, len(reader), batchSize):
+        yield reader.batch(first, first + batchSize)
+  else:
+    with McanLogReader(path) as reader:
+      yield from reader.batches(batchSize)
+
+# -----------------------------------------------------------------------------
+# Klasse fuer das Ergebnis einer Wiedergabe
+# -----------------------------------------------------------------------------
+class McanReplayReport():
+  """ Ergebnis einer Wiedergabe: Anzahl der Datenrahmen, Dauer und
+      Abweichung (Sekunden) der Sendezeitpunkte vom Plan.
+      late zaehlt die Datenrahmen, die mehr als tolerance zu spaet waren.
+  """
+  def __init__(self, tolerance=0.001):
+    self.tolerance = tolerance
+    self.frames = 0
+    self.duration = 0.0
+    self.maxDrift = 0.0
+    self.totalDrift = 0.0
+    self.late = 0
+
+  def add(self, drift):
+    self.frames += 1
+    self.totalDrift += drift
+    if drift > self.maxDrift:
+      self.maxDrift = drift
+    if drift > self.tolerance:
+      self.late += 1
+
+  @property
+  def meanDrift(self):
+    return self.totalDrift / self.frames if self.frames else 0.0
+
+  def __str__(self):
+    return ( 'frames: {}  duration: {:.3f} s  drift mean: {:.3f} ms'
+             '  max: {:.3f} ms  late: {}'
+           ).format( self.frames, self.duration, self.meanDrift * 1000
+                   , self.maxDrift * 1000, self.late)
+
+# -----------------------------------------------------------------------------
+# Klasse fuer die Wiedergabe
+# -----------------------------------------------------------------------------
+class McanReplay():
+  """ Gibt einen Mitschnitt (Pfad) oder beliebige (timestamps, buffer)-
+      Bloecke an sink wieder. speed=1.0 ist der originale Zeitablauf,
+      2.0 doppelt so schnell, MAXSPEED (None) ohne Wartezeiten.
+      run() wartet mit time.sleep, runAsync() mit asyncio.sleep (z.B. fuer
+      ein McanGateway als Senke). runAsync() gibt spaetestens nach
+      batchSize Datenrahmen die Eventloop frei und wartet dabei auf
+      sink.drain(), falls die Senke das hat.
+  """
+  def __init__(self, source, sink, speed=1.0, batchSize=1024, tolerance=0.001
+              , clock=monotonic):
+    self.__source = source
+    self.__send = _sinkFunction(sink)
+    self.__drain = getattr(sink, 'drain', None)
+    self.__speed = speed
+    self.__batchSize = batchSize
+    self.__tolerance = tolerance
+    self.__clock = clock
+
+  def __batches(self):
+    if isinstance(self.__source, str):
+      return captureBatches(self.__source, self.__batchSize)
+    return iter(self.__source)
+
+  def __frames(self):
+    """ Generator ueber (Sekunden seit Beginn nach Plan, McanMsgArray)
+    """
+    firstTime = None
+    speed = self.__speed
+    for timestamps, buf in self.__batches():
+      if firstTime is None and len(timestamps):
+        firstTime = timestamps[0]
+      for i in range(len(timestamps)):
+        offset = 0.0
+        if speed is not None:
+          offset = (timestamps[i] - firstTime) / 1000 / speed
+        yield (offset, McanMsgArray(buf, i * MSGLEN))
+
+  def run(self, sleep=sleep):
+    """ Gibt den Mitschnitt wieder und liefert den McanReplayReport
+    """
+    report = McanReplayReport(self.__tolerance)
+    clock = self.__clock
+    send = self.__send
+    start = clock()
+    for offset, msg in self.__frames():
+      deadline = start + offset
+      wait = deadline - clock()
+      if wait > 0:
+        sleep(wait)
+      send(msg)
+      report.add(max(clock() - deadline, 0.0))
+    report.duration = clock() - start
+    return report
+
+  async def runAsync(self):
+    """ Wie run(), wartet aber in der Eventloop
+    """
+    report = McanReplayReport(self.__tolerance)
+    clock = self.__clock
+    send = self.__send
+    drain = self.__drain
+    batchSize = self.__batchSize
+    unyielded = 0
+    start = clock()
+    for offset, msg in self.__frames():
+      deadline = start + offset
+      wait = deadline - clock()
+      if wait > 0:
+        await asyncio.sleep(wait)
+        unyielded = 0
+      elif unyielded >= batchSize:
+        # ohne Wartezeit (MAXSPEED oder im Rueckstand) die Eventloop freigeben
+        if drain is not None:
+          await drain()
+        await asyncio.sleep(0)
+        unyielded = 0
+      send(msg)
+      unyielded += 1
+      report.add(max(clock() - deadline, 0.0))
+    report.duration = clock() - start
+    return report
@@ -0,0 +1,143 @@
+""" mcanrouter.py
+    Verteilung empfangener Datenrahmen an angemeldete Handler
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from .mcanmsgarray import McanMsgArray, CMDANDRESP
+from .mcandecode import McanDecode
+
+# -----------------------------------------------------------------------------
+# Klasse zur Verteilung von Datenrahmen
+# -----------------------------------------------------------------------------
+class McanRouter():
+  """ Handler werden mit Filtern auf Befehl, Antwortbit, Hash, Device-ID
+      (d0-d3) oder einen Kontaktbereich (d2-d3) angemeldet.
+      Fuer jeden Wert des cmdAndResp-Bytes wird beim ersten Datenrahmen
+      eine Tabelle der passenden Handler erstellt, aufgeteilt in Handler
+      ohne weiteren Filter, Handler je Hash, je Device-ID und solche mit
+      Kontaktbereich. Ein Datenrahmen prueft so nur die Handler, die
+      ueberhaupt passen koennen.
+      Mit metrics (McanMetrics) werden verteilte Datenrahmen, Handler-Aufrufe
+      und die Laufzeit der Verteilung gezaehlt.
+  """
+  def __init__(self, metrics=None):
+    self.__metrics = metrics
+    self.__subscriptions = []
+    self.__nextId = 1
+    self.__index = [None] * 256
+
+  def __len__(self):
+    return len(self.__subscriptions)
+
+  def subscribe(self, handler, command=None, response=None, hash=None
+               , deviceId=None, contacts=None):
+    """ Meldet handler(msg) an und liefert eine Nummer fuer unsubscribe().
+        command ist die Befehlsnummer (ohne Antwortbit) oder der Name aus
+        der Befehlstabelle von McanDecode, response True/False,
+        contacts ein Bereich (first, last) einschliesslich.
+    """
+    if isinstance(command, str):
+      name = command
+      command = McanDecode.commandNumber(name)
+      if command is None:
+        raise ValueError('unknown command: {}'.format(name))
+    first = last = None
+    if contacts is not None:
+      first, last = contacts
+    subscriptionId = self.__nextId
+    self.__nextId += 1
+    self.__subscriptions.append(( subscriptionId, handler, command, response
+                                , hash, deviceId, first, last))
+    self.__index = [None] * 256
+    return subscriptionId
+
+  def unsubscribe(self, subscriptionId):
+    self.__subscriptions = [sub for sub in self.__subscriptions if sub[0] != subscriptionId]
+    self.__index = [None] * 256
+
+  def __compile(self, cmdAndResp):
+    """ Erstellt die Tabelle der Handler fuer einen Wert des cmdAndResp-Bytes:
+        (handlers, byHash, byDevice, contactRanges)
+    """
+    command = cmdAndResp & 0xfe
+    response = cmdAndResp & 0x01 == 1
+    handlers = []
+    byHash = {}
+    byDevice = {}
+    contactRanges = []
+    for _, handler, subCommand, subResponse, hash, deviceId, first, last in self.__subscriptions:
+      if subCommand is not None and subCommand != command:
+        continue
+      if subResponse is not None and subResponse != response:
+        continue
+      if hash is not None:
+        byHash.setdefault(hash, []).append((handler, deviceId, first, last))
+      elif deviceId is not None:
+        byDevice.setdefault(deviceId, []).append((handler, first, last))
+      elif first is not None:
+        contactRanges.append((handler, first, last))
+      else:
+        handlers.append(handler)
+    entry = (handlers, byHash, byDevice, contactRanges)
+    self.__index[cmdAndResp] = entry
+    return entry
+
+  def route(self, msg):
+    """ Uebergibt den Datenrahmen (McanMsgArray oder 13 Bytes) an alle
+        passenden Handler und liefert deren Anzahl.
+    """
+    metrics = self.__metrics
+    if metrics is None:
+      return self.__route(msg)
+    start = metrics.start()
+    count = self.__route(msg)
+    metrics.countRouted(count)
+    metrics.stopRoute(start)
+    return count
+
+  def __route(self, msg):
+    if not isinstance(msg, McanMsgArray):
+      msg = McanMsgArray(msg)
+    cmdAndResp = msg.array[CMDANDRESP]
+    entry = self.__index[cmdAndResp]
+    if entry is None:
+      entry = self.__compile(cmdAndResp)
+    handlers, byHash, byDevice, contactRanges = entry
+    count = 0
+    for handler in handlers:
+      handler(msg)
+      count += 1
+    if byHash:
+      for handler, deviceId, first, last in byHash.get(msg.getHash(), ()):
+        if deviceId is not None and deviceId != msg.getDeviceId():
+          continue
+        if first is not None and not first <= msg.getContact() <= last:
+          continue
+        handler(msg)
+        count += 1
+    if byDevice:
+      for handler, first, last in byDevice.get(msg.getDeviceId(), ()):
+        if first is not None and not first <= msg.getContact() <= last:
+          continue
+        handler(msg)
+        count += 1
+    if contactRanges:
+      contact = msg.getContact()
+      for handler, first, last in contactRanges:
+        if first <= contact <= last:
+          handler(msg)
+          count += 1
+    return count
+
+  def routeFrames(self, frames):
+    """ Verteilt eine Liste von Datenrahmen (z.B. von McanGateway)
+    """
+    for msg in frames:
+      self.route(msg)
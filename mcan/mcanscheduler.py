@@ -0,0 +1,185 @@
+""" mcanscheduler.py
+    Warteschlange fuer zu sendende Datenrahmen mit Vorrang und
+    Zusammenfassung ueberholter Befehle.
+
+    Reihenfolge: zuerst STOPP, HALT und Lok-Nothalt (System-Befehl 0x00),
+    danach alle anderen; innerhalb einer Klasse nach dem prio-Byte
+    (kleiner zuerst) und der Reihenfolge des Einstellens.
+    Ein neuer Befehl ersetzt die Daten eines noch nicht gesendeten gleichen
+    Befehls, der seinen Platz in der Warteschlange behaelt:
+      Loc speed / Loc direction   je UID
+      Loc function                je UID und Funktion
+      Track state                 je Geraet und Kontakt
+    Mit fps wird die Anzahl der Datenrahmen je Sekunde begrenzt
+    (Token-Bucket), Nothalt-Befehle sind davon ausgenommen.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+from heapq import heappush, heappop
+try:
+  from time import monotonic
+except ImportError:
+  # MicroPython
+  from time import ticks_ms
+  def monotonic():
+    return ticks_ms() / 1000
+
+from .mcanmsgarray import McanMsgArray, PRIO, CMDANDRESP, DLC, D0, D1, D2, D3, D4
+
+# Klassen fuer die Reihenfolge
+EMERGENCY = 0
+NORMAL    = 1
+
+# Subcommands des System-Befehls, die immer zuerst gesendet werden
+_EMERGENCY_SUBCMDS = (0x00, 0x02, 0x03)
+
+# Position der Felder in einem Eintrag der Warteschlange
+_FRAME = 3
+_KEY   = 4
+
+# -----------------------------------------------------------------------------
+# Funktionen fuer Klasse und Schluessel eines Datenrahmens
+# -----------------------------------------------------------------------------
+def frameClass(arr):
+  """ Liefert EMERGENCY fuer STOPP, HALT und Lok-Nothalt, sonst NORMAL
+  """
+  if arr[CMDANDRESP] & 0xfe == 0x00 and arr[DLC] >= 5 and arr[D4] in _EMERGENCY_SUBCMDS:
+    return EMERGENCY
+  return NORMAL
+
+def coalesceKey(arr):
+  """ Liefert den Schluessel, unter dem ein Datenrahmen einen frueheren
+      ersetzt, oder None
+  """
+  cmdAndResp = arr[CMDANDRESP]
+  command = cmdAndResp & 0xfe
+  dlc = arr[DLC]
+  if command == 0x08 and dlc == 6 or command == 0x0a and dlc == 5:
+    return (cmdAndResp, (arr[D0] << 24) | (arr[D1] << 16) | (arr[D2] << 8) | arr[D3])
+  if command == 0x0c and dlc >= 6:
+    return (cmdAndResp, (arr[D0] << 24) | (arr[D1] << 16) | (arr[D2] << 8) | arr[D3], arr[D4])
+  if command == 0x22 and dlc >= 6:
+    return (cmdAndResp, (arr[D0] << 8) | arr[D1], (arr[D2] << 8) | arr[D3])
+  return None
+
+# -----------------------------------------------------------------------------
+# Klasse fuer die Warteschlange
+# -----------------------------------------------------------------------------
+class McanScheduler():
+  """ Warteschlange fuer zu sendende Datenrahmen.
+      put() nimmt eine Kopie des Datenrahmens auf (McanCommand kann also
+      sofort wiederverwendet werden), get() bzw. due() liefern die
+      Datenrahmen in der Sendereihenfolge, sendDue() uebergibt sie an eine
+      Funktion (z.B. McanGateway.send).
+      fps begrenzt die Datenrahmen je Sekunde, burst die Anzahl, die nach
+      einer Pause auf einmal gesendet werden darf (Vorgabe: fps).
+  """
+  def __init__(self, fps=None, burst=None, clock=monotonic):
+    self.__queue = []
+    self.__pending = {}
+    self.__count = 0
+    self.__sequence = 0
+    self.__fps = fps
+    self.__burst = burst if burst is not None else fps
+    self.__clock = clock
+    self.__tokens = self.__burst
+    self.__lastTime = None
+    self.sent = 0
+    self.coalesced = 0
+
+  def __len__(self):
+    return self.__count
+
+  def put(self, frame):
+    """ Stellt einen Datenrahmen (McanMsgArray/McanCommand oder 13 Bytes)
+        ein. Liefert True, wenn dabei ein frueherer ersetzt wurde.
+    """
+    if isinstance(frame, McanMsgArray):
+      frame = frame.array
+    frame = bytes(frame)
+    key = coalesceKey(frame)
+    if key is not None:
+      old = self.__pending.get(key)
+      if old is not None:
+        # Platz (Klasse, prio, Reihenfolge) bleibt, nur die Daten werden ersetzt
+        old[_FRAME] = frame
+        self.coalesced += 1
+        return True
+    self.__sequence += 1
+    entry = [frameClass(frame), frame[PRIO], self.__sequence, frame, key]
+    heappush(self.__queue, entry)
+    if key is not None:
+      self.__pending[key] = entry
+    self.__count += 1
+    return False
+
+  def __peek(self):
+    queue = self.__queue
+    return queue[0] if queue else None
+
+  def __refill(self, now):
+    if self.__lastTime is not None:
+      self.__tokens = min( self.__burst
+                         , self.__tokens + (now - self.__lastTime) * self.__fps)
+    self.__lastTime = now
+
+  def get(self, now=None):
+    """ Liefert den naechsten Datenrahmen (bytes) oder None, wenn die
+        Warteschlange leer ist oder das Budget erschoepft ist.
+    """
+    entry = self.__peek()
+    if entry is None:
+      return None
+    if self.__fps is not None and entry[0] != EMERGENCY:
+      self.__refill(self.__clock() if now is None else now)
+      if self.__tokens < 1:
+        return None
+      self.__tokens -= 1
+    heappop(self.__queue)
+    if entry[_KEY] is not None:
+      del self.__pending[entry[_KEY]]
+    self.__count -= 1
+    self.sent += 1
+    return entry[_FRAME]
+
+  def due(self, now=None):
+    """ Liefert alle jetzt sendbaren Datenrahmen als Liste
+    """
+    if now is None:
+      now = self.__clock()
+    frames = []
+    frame = self.get(now)
+    while frame is not None:
+      frames.append(frame)
+      frame = self.get(now)
+    return frames
+
+  def sendDue(self, send, now=None):
+    """ Uebergibt alle jetzt sendbaren Datenrahmen an send(frame),
+        liefert die Anzahl
+    """
+    frames = self.due(now)
+    for frame in frames:
+      send(frame)
+    return len(frames)
+
+  def delay(self, now=None):
+    """ Liefert die Wartezeit in Sekunden bis zum naechsten sendbaren
+        Datenrahmen oder None bei leerer Warteschlange
+    """
+    entry = self.__peek()
+    if entry is None:
+      return None
+    if self.__fps is None or entry[0] == EMERGENCY:
+      return 0
+    self.__refill(self.__clock() if now is None else now)
+    if self.__tokens >= 1:
+      return 0
+    return (1 - self.__tokens) / self.__fps
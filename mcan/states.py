@@ -9,12 +9,39 @@
     ---------------------------------------------------------------------------
     (C) 2021
 """
+from array import array
+
+def _lowBit(val):
+  bit = 0
+  while not val & 1:
+    val >>= 1
+    bit += 1
+  return bit
+
+# position of the lowest set bit for every byte value
+_LOWBIT = bytes([0] + [_lowBit(i) for i in range(1, 256)])
+
+def _setBits(val):
+  """ yields the positions of the set bits in ascending order
+      without testing every single bit
+  """
+  base = 0
+  while val:
+    low = val & 0xff
+    while low:
+      yield base + _LOWBIT[low]
+      low &= low - 1
+    val >>= 8
+    base += 8
 
 class States():
   """ class for management of state-bits
   """
+  __slots__ = ('__maxStateBits', '__mask', '__recentStates', '__states', '__changed')
+
   def __init__(self, maxStateBits = 16):
     self.__maxStateBits = maxStateBits
+    self.__mask = ((1 << maxStateBits) - 1) << 1
     self.__recentStates = 0
     self.__states = 0
     self.__changed = False
@@ -46,9 +73,9 @@ class States():
     """ set the state of the given stateBit
     """
     if value != 0:
-      self.__states |= 2**stateBit
+      self.__states |= 1 << stateBit
     else:
-      self.__states &= 0x1FFFF - 2**stateBit
+      self.__states &= ~(1 << stateBit)
     if self.__recentStates != self.__states:
       self.__changed = True
 
@@ -65,8 +92,9 @@ class States():
   def setStateBits(self, states):
     """ set all state bits
     """
-    for stateBit in range(1, self.__maxStateBits+1, 1):
-      self.setStateBit(stateBit, (states>>(stateBit-1))&1)
+    self.__states = (self.__states & ~self.__mask) | ((states << 1) & self.__mask)
+    if self.__recentStates != self.__states:
+      self.__changed = True
 
   def setRecentToCurrent(self):
     """ set recentStates to current states
@@ -74,25 +102,35 @@ class States():
     self.__recentStates = self.__states
     self.__changed = False
 
+  def setRecentStateBit(self, stateBit, value):
+    """ set the recent state of the given stateBit (f.e. after sending it)
+    """
+    if value != 0:
+      self.__recentStates |= 1 << stateBit
+    else:
+      self.__recentStates &= ~(1 << stateBit)
+    self.__changed = self.__recentStates != self.__states
+
   @property
   def isChanged(self):
     """ Is one or more bit changed?
     """
     return self.__changed
 
+  @property
+  def maxStateBits(self):
+    """ number of state-bits
+    """
+    return self.__maxStateBits
+
   @property
   def changedStates(self):
     """ returns a list of changed stateBits
     """
     states = list()
-    #if self.__isNotSend:
-    for stateBit in range(1, self.__maxStateBits+1, 1):
-      stateBitState, stateBitRecentState = self.getStateBit(stateBit)
-      #currstateNoRecentState = (self.__recentStates>>stateNo)&1
-      if stateBitState != stateBitRecentState:
-        states.append([stateBit, stateBitState, stateBitRecentState] )
-    #self.__recentStates = self.__states
-    #self.__isNotSend = False
+    diff = (self.__states ^ self.__recentStates) & self.__mask
+    for stateBit in _setBits(diff):
+      states.append([stateBit, (self.__states>>stateBit)&1, (self.__recentStates>>stateBit)&1])
     return states
 
   @property
@@ -100,7 +138,282 @@ class States():
     """ returns a string with all states
         f.e.: 0101100000000001 - states 2,4,5 and 16 are on
     """
-    shortStr = ''
-    for stateBit in range(1, self.__maxStateBits+1, 1):
-      shortStr += '{}'.format((self.__states>>stateBit)&1)
-    return shortStr
+    states = (self.__states & self.__mask) | (1 << (self.__maxStateBits+1))
+    return '{:b}'.format(states)[-2:0:-1]
+
+class StateBank():
+  """ state-bits of many modules (f.e. S88) in packed 16-bit words
+      Modules and contacts are counted from 1, contact 1 is bit 0 of the
+      word of module 1, contact 17 is bit 0 of module 2 and so on.
+      Only words with changes are visited by changedStates.
+  """
+  __slots__ = ( '__modules', '__bitsPerModule', '__mask'
+              , '__states', '__recentStates', '__changedWords')
+
+  def __init__(self, modules, bitsPerModule = 16):
+    self.__modules = modules
+    self.__bitsPerModule = bitsPerModule
+    self.__mask = (1 << bitsPerModule) - 1
+    self.__states = array('H', bytes(2 * modules))
+    self.__recentStates = array('H', bytes(2 * modules))
+    self.__changedWords = set()
+
+  def __len__(self):
+    return self.__modules * self.__bitsPerModule
+
+  def __checkWord(self, word):
+    if self.__states[word] != self.__recentStates[word]:
+      self.__changedWords.add(word)
+    else:
+      self.__changedWords.discard(word)
+
+  def getState(self, contact):
+    """ returns a tupple with state and recentState of the contact
+    """
+    word, bit = divmod(contact - 1, self.__bitsPerModule)
+    return ((self.__states[word] >> bit) & 1, (self.__recentStates[word] >> bit) & 1)
+
+  def setState(self, contact, value):
+    """ set the state of the given contact
+    """
+    word, bit = divmod(contact - 1, self.__bitsPerModule)
+    if value != 0:
+      self.__states[word] |= 1 << bit
+    else:
+      self.__states[word] &= ~(1 << bit) & 0xffff
+    self.__checkWord(word)
+
+  def setRecentState(self, contact, value):
+    """ set the recent state of the given contact (f.e. after sending it)
+    """
+    word, bit = divmod(contact - 1, self.__bitsPerModule)
+    if value != 0:
+      self.__recentStates[word] |= 1 << bit
+    else:
+      self.__recentStates[word] &= ~(1 << bit) & 0xffff
+    self.__checkWord(word)
+
+  def getWord(self, module):
+    """ returns the state-bits of a module
+    """
+    return self.__states[module - 1]
+
+  def setWord(self, module, states):
+    """ set all state-bits of a module
+    """
+    self.__states[module - 1] = states & self.__mask
+    self.__checkWord(module - 1)
+
+  def setWords(self, firstModule, words):
+    """ set the state-bits of consecutive modules
+    """
+    word = firstModule - 1
+    for states in words:
+      self.__states[word] = states & self.__mask
+      self.__checkWord(word)
+      word += 1
+
+  def reset(self):
+    """ reset all state-bits to off
+    """
+    for word in range(self.__modules):
+      self.__states[word] = 0
+      self.__recentStates[word] = 0
+    self.__changedWords.clear()
+
+  def setRecentToCurrent(self):
+    """ set recentStates to current states
+    """
+    for word in self.__changedWords:
+      self.__recentStates[word] = self.__states[word]
+    self.__changedWords.clear()
+
+  @property
+  def isChanged(self):
+    """ Is one or more bit changed?
+    """
+    return len(self.__changedWords) > 0
+
+  @property
+  def changedStates(self):
+    """ returns a list of [contact, state, recentState] of changed contacts
+    """
+    states = list()
+    for word in sorted(self.__changedWords):
+      current = self.__states[word]
+      recent = self.__recentStates[word]
+      base = word * self.__bitsPerModule + 1
+      for bit in _setBits(current ^ recent):
+        states.append([base + bit, (current >> bit) & 1, (recent >> bit) & 1])
+    return states
+
+def _ms(seconds):
+  """ seconds as int ms, the resolution of ContactHistory
+  """
+  return int(round(seconds * 1000))
+
+# longest debounce time (seconds), stored as ms in 16 bits
+MAXDEBOUNCE = 65.535
+
+def _debounceMs(seconds):
+  if not 0 <= seconds <= MAXDEBOUNCE:
+    raise ValueError('debounce time must be 0 to {} s: {}'.format(MAXDEBOUNCE, seconds))
+  return _ms(seconds)
+
+class ContactHistory():
+  """ debounced history of contacts (f.e. S88) in preallocated ring-buffers
+      Contacts are counted from 1, timestamps and times are seconds like in
+      McanDedup and McanReplay, they are stored as int ms.
+      A raw change is taken over after it was stable for the debounce time
+      (debounceOn for 0->1, debounceOff for 1->0), the entry in the history
+      gets the time of the first raw change. Changes are also written to
+      the optional StateBank bank, so contact chatter shorter than the
+      debounce time does not produce track-state frames.
+      Each contact keeps its last depth changes as (timestamp, state).
+      Contacts with a pending raw change are marked in packed 16-bit words
+      like in StateBank.
+  """
+  __slots__ = ( '__contacts', '__depth', '__bank'
+              , '__times', '__states', '__heads', '__counts'
+              , '__stable', '__recent', '__pendingTimes', '__pending'
+              , '__debounceOn', '__debounceOff')
+
+  def __init__(self, contacts, depth = 16, debounceOn = 0, debounceOff = 0, bank = None):
+    self.__contacts = contacts
+    self.__depth = depth
+    self.__bank = bank
+    self.__times = array('q', bytes(8 * contacts * depth))
+    self.__states = array('B', bytes(contacts * depth))
+    self.__heads = array('H', bytes(2 * contacts))
+    self.__counts = array('H', bytes(2 * contacts))
+    self.__stable = array('B', bytes(contacts))
+    self.__recent = array('B', bytes(contacts))
+    self.__pendingTimes = array('q', bytes(8 * contacts))
+    self.__pending = array('H', bytes(2 * ((contacts + 15) // 16)))
+    self.__debounceOn = array('H', [_debounceMs(debounceOn)] * contacts)
+    self.__debounceOff = array('H', [_debounceMs(debounceOff)] * contacts)
+
+  def __len__(self):
+    return self.__contacts
+
+  def setDebounce(self, contact, debounceOn, debounceOff):
+    """ set the debounce times (seconds, up to MAXDEBOUNCE) of one contact
+    """
+    debounceOn = _debounceMs(debounceOn)
+    debounceOff = _debounceMs(debounceOff)
+    self.__debounceOn[contact - 1] = debounceOn
+    self.__debounceOff[contact - 1] = debounceOff
+
+  def getState(self, contact):
+    """ returns a tupple with the debounced state and recentState of the contact
+    """
+    return (self.__stable[contact - 1], self.__recent[contact - 1])
+
+  def __isPending(self, index):
+    return (self.__pending[index >> 4] >> (index & 15)) & 1
+
+  def __setPending(self, index):
+    self.__pending[index >> 4] |= 1 << (index & 15)
+
+  def __clearPending(self, index):
+    self.__pending[index >> 4] &= ~(1 << (index & 15)) & 0xffff
+
+  def update(self, contact, state, timestamp):
+    """ raw state of a contact at timestamp (seconds)
+        returns True, if the debounced state changed
+    """
+    index = contact - 1
+    state = 1 if state else 0
+    if state == self.__stable[index]:
+      self.__clearPending(index)
+      return False
+    now = _ms(timestamp)
+    if not self.__isPending(index):
+      self.__setPending(index)
+      self.__pendingTimes[index] = now
+    return self.__commitIfStable(index, now)
+
+  def poll(self, timestamp):
+    """ takes over the pending changes, which are stable at timestamp (seconds)
+        returns a list of [contact, state, recentState] of changed contacts
+    """
+    changed = list()
+    now = _ms(timestamp)
+    for word in range(len(self.__pending)):
+      pending = self.__pending[word]
+      if not pending:
+        continue
+      for bit in _setBits(pending):
+        index = (word << 4) + bit
+        if self.__commitIfStable(index, now):
+          changed.append([index + 1, self.__stable[index], self.__recent[index]])
+    return changed
+
+  def __commitIfStable(self, index, now):
+    state = self.__stable[index] ^ 1
+    debounce = self.__debounceOn[index] if state else self.__debounceOff[index]
+    changeTime = self.__pendingTimes[index]
+    if now - changeTime < debounce:
+      return False
+    self.__clearPending(index)
+    self.__recent[index] = self.__stable[index]
+    self.__stable[index] = state
+    pos = index * self.__depth + self.__heads[index]
+    self.__times[pos] = changeTime
+    self.__states[pos] = state
+    self.__heads[index] = (self.__heads[index] + 1) % self.__depth
+    if self.__counts[index] < self.__depth:
+      self.__counts[index] += 1
+    if self.__bank is not None:
+      self.__bank.setState(index + 1, state)
+    return True
+
+  def history(self, contact):
+    """ returns the list of (timestamp, state) of a contact, oldest first
+    """
+    return [(changeTime / 1000, state) for changeTime, state in self.__history(contact - 1)]
+
+  def __history(self, index):
+    count = self.__counts[index]
+    base = index * self.__depth
+    first = (self.__heads[index] - count) % self.__depth
+    entries = list()
+    for i in range(count):
+      pos = base + (first + i) % self.__depth
+      entries.append((self.__times[pos], self.__states[pos]))
+    return entries
+
+  def occupiedSince(self, contact, timestamp):
+    """ returns the time (seconds) the contact is occupied at timestamp
+        or 0, if it is free
+    """
+    index = contact - 1
+    if not self.__stable[index] or not self.__counts[index]:
+      return 0
+    pos = index * self.__depth + (self.__heads[index] - 1) % self.__depth
+    return max(_ms(timestamp) - self.__times[pos], 0) / 1000
+
+  def occupiedTime(self, contact, start, end):
+    """ returns the time (seconds) the contact was occupied within [start, end)
+        Before the oldest entry of the history the contact had the
+        opposite state of this entry.
+    """
+    entries = self.__history(contact - 1)
+    if not entries:
+      return 0
+    start = _ms(start)
+    end = _ms(end)
+    total = 0
+    state = entries[0][1] ^ 1
+    since = start
+    for changeTime, newState in entries:
+      if changeTime >= end:
+        break
+      if changeTime > since:
+        if state:
+          total += changeTime - since
+        since = changeTime
+      state = newState
+    if state and end > since:
+      total += end - since
+    return total / 1000
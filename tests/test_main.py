@@ -0,0 +1,85 @@
+""" Tests fuer die Kommandozeile (python -m mcan)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import csv
+import json
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+sys.path.insert(0, "../")
+
+from mcan import __main__ as cli, mcancapture
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+LOGFILE = os.path.join(TESTDIR, 'testdata', 'mcan-20201216113413.log')
+
+class McanMainTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.TemporaryDirectory()
+    self.output = os.path.join(self.tmpDir.name, 'out')
+
+  def tearDown(self):
+    self.tmpDir.cleanup()
+
+  def decode(self, *args):
+    self.assertEqual(cli.main(['decode', '-o', self.output] + list(args)), 0)
+    with open(self.output, newline='') as out:
+      return out.read()
+
+  def test_formats(self):
+    text = self.decode(LOGFILE, '--command', 'Member ping', '--hash', 'b713')
+    self.assertEqual(text.count('Member ping'), 3)
+    self.assertIn('SW-Version:     3.112', text)
+    self.assertTrue(text.startswith('16.12.2020 11:34:19\n'))
+
+    lines = self.decode(LOGFILE, '-f', 'jsonl', '-c', '22', '--start', '16.12.2020 11:34:28').splitlines()
+    items = [json.loads(line) for line in lines]
+    self.assertEqual(len(items), 7)
+    self.assertEqual(items[0]['name'], 'Track state')
+    self.assertEqual((items[1]['contact'], items[1]['state']), (0x1e, 1))
+    self.assertEqual(items[0]['time'], 1608118468.0)
+    self.assertIsInstance(items[0]['time'], float)
+
+    capture = os.path.join(self.tmpDir.name, 'capture.mcap')
+    mcancapture.convertLog(LOGFILE, capture)
+    rows = list(csv.reader(self.decode(capture, '-f', 'csv', '--end', '16.12.2020 11:34:18').splitlines()))
+    self.assertEqual(rows[0], list(cli._CSVHEADER))
+    self.assertEqual(rows[1], ['1608118454.0', '0', '6', 'MFX Verify', '0', '1f71', '6', '0000000000010000'])
+    self.assertEqual(len(rows), 7)
+
+  def test_stdin(self):
+    with open(LOGFILE, 'rb') as log:
+      result = subprocess.run( [sys.executable, '-m', 'mcan', 'decode', '-f', 'csv', '-c', '36']
+                             , stdin=log, stdout=subprocess.PIPE, cwd=os.path.dirname(TESTDIR)
+                             , check=True)
+    self.assertEqual(len(result.stdout.splitlines()), 4)
+    self.assertEqual(result.stdout.splitlines()[1].split(b',')[0], b'1608118458.0')
+
+  def test_brokenPipe(self):
+    # Ausgabe groesser als der Puffer der Pipe, der Leser schliesst nach
+    # der ersten Zeile
+    log = os.path.join(self.tmpDir.name, 'long.log')
+    with open(LOGFILE, 'rb') as src, open(log, 'wb') as dst:
+      dst.write(src.read() * 200)
+    decode = subprocess.Popen( [sys.executable, '-m', 'mcan', 'decode', log]
+                             , stdout=subprocess.PIPE, stderr=subprocess.PIPE
+                             , cwd=os.path.dirname(TESTDIR))
+    decode.stdout.readline()
+    decode.stdout.close()
+    _, stderr = decode.communicate()
+    self.assertEqual(decode.returncode, 1)
+    self.assertEqual(stderr, b'')
+
+if __name__ == '__main__':
+  unittest.main()
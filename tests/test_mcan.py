@@ -13,7 +13,7 @@ import unittest
 import sys
 sys.path.insert(0, "../")
 
-from mcan import mcanhash, mcancommand, mcandecode
+from mcan import mcanhash, mcancommand, mcandecode, mcanmsgarray
 
 class McanTest(unittest.TestCase):
 
@@ -24,6 +24,43 @@ class McanTest(unittest.TestCase):
     uidHash = mcanhash.McanHash(0x43539A40)
     self.assertEqual(int(uidHash), 0xcb13 )
 
+  def test_McanHashRegistry(self):
+    self.assertEqual(mcanhash.mcanHash(0x43539A40), 0xcb13)
+    self.assertEqual(list(mcanhash.hashArray([0xF0B0149FADE0, 0x43539A40])), [0xcb7f, 0xcb13])
+
+    registry = mcanhash.McanHashRegistry()
+    ping = mcanmsgarray.McanMsgArray(bytearray.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32'))
+    self.assertEqual(registry.learn(ping), 0x4d549bc7)
+    self.assertEqual(registry.sender(0xb713), 0x4d549bc7)
+    self.assertIsNone(registry.sender(0xcb13))
+    self.assertEqual(registry.register(0x43539A40), 0xcb13)
+    self.assertEqual(registry.collisions, {})
+    # gleicher Hash fuer eine andere UID (msb und lsb vertauscht)
+    self.assertEqual(registry.register(0x9A404353), 0xcb13)
+    self.assertTrue(registry.isCollision(0xcb13))
+    self.assertEqual(registry.collisions, {0xcb13: [0x43539A40, 0x9A404353]})
+    self.assertIsNone(registry.sender(0xcb13))
+    self.assertEqual(registry.hashOf(0x4d549bc7), 0xb713)
+    self.assertEqual(registry.hashOf(0xF0B0149FADE0), 0xcb7f)
+
+  def test_McanMsgArray(self):
+    buf = bytearray(b'\xff' + b'\x00\x30\xb7\x13\x08\x4d\x54\x9b\xc7\x03\x70\x00\x32')
+    msg = mcanmsgarray.McanMsgArray(buf, 1)
+    self.assertEqual(msg.getByte('cmdAndResp'), 0x30)
+    self.assertEqual(msg.getHash(), 0xb713)
+    self.assertEqual(msg.getDeviceId(), 0x4d549bc7)
+    self.assertEqual(msg.getContact(), 0x9bc7)
+    self.assertEqual(msg.getCommand(), 0x30)
+    self.assertFalse(msg.isResponse())
+    # kein Kopieren: Aenderungen landen direkt im Puffer
+    msg.setByte('cmdAndResp', 0x31)
+    msg.setContact(0x1e)
+    self.assertTrue(msg.isResponse())
+    self.assertEqual(buf[2], 0x31)
+    self.assertEqual(buf[8:10], b'\x00\x1e')
+    with self.assertRaises(ValueError):
+      mcanmsgarray.McanMsgArray(bytearray(20), 10)
+
   def test_McanCommand(self):
     macHash = mcanhash.McanHash(0xF0B0149FADE0)
     mcanCmd = mcancommand.McanCommand(int(macHash))
@@ -53,6 +90,27 @@ class McanTest(unittest.TestCase):
     expected = b'\x00#\xcb\x7f\x08\x03\x82\x01\xe6\x00\x00\x00\x00'
     self.assertEqual(mcanCmd.response, expected)
 
+  def test_McanCommandWriteInto(self):
+    mcanCmd = mcancommand.McanCommand(0xcb7f)
+    mcanCmd.setCommand(0x22)
+    mcanCmd.setTrackState(0, 30, 1, 0)
+    buf = bytearray(2 * 13 + 1)
+    mcanCmd.writeInto(buf, 1)
+    mcanCmd.writeInto(buf, 14, response=True)
+    self.assertEqual(buf[1:14], mcanCmd.frame)
+    self.assertEqual(buf[14:], mcanCmd.response)
+    self.assertEqual(mcanCmd.frame[1], 0x22)
+    with self.assertRaises(ValueError):
+      mcanCmd.writeInto(buf, 15)
+    self.assertEqual(len(buf), 2 * 13 + 1)
+
+    template = mcancommand.McanTemplate.get(0xcb7f, 0x22)
+    self.assertIs(template, mcancommand.McanTemplate.get(0xcb7f, 0x22))
+    template.writeTrackState(buf, 0, 0, 30, 1, 0)
+    self.assertEqual(buf[0:13], mcanCmd.frame)
+    mcancommand.packFrame(buf, 13, 0, 0x31, 0xb713, 8, 0x4d549bc7, 0x03700032)
+    self.assertEqual(buf[13:26], bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32'))
+
   def test_McanDecode(self):
     macHash = mcanhash.McanHash(0xF0B0149FADE0)
     mcanCmd = mcancommand.McanCommand(int(macHash))
@@ -83,5 +141,70 @@ class McanTest(unittest.TestCase):
     actual = mcandecode.McanDecode(mcanCmd.response).decode()
     self.assertEqual(actual, expected)
 
+  def test_McanDecodeRecord(self):
+    frame = bytes.fromhex('00 23 0b 06 08 00 00 00 2d 00 01 00 00')
+    decoder = mcandecode.McanDecode(frame)
+    rec = decoder.decode(record=True)
+    self.assertEqual(rec.command, 0x22)
+    self.assertEqual(rec.response, 1)
+    self.assertEqual(rec.device, 0)
+    self.assertEqual(rec.contact, 45)
+    self.assertEqual(rec.recentState, 0)
+    self.assertEqual(rec.state, 1)
+    self.assertIsNone(rec.swVersion)
+    self.assertEqual(str(rec), decoder.decode())
+
+    frame = bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32')
+    rec = mcandecode.McanDecode(frame).decode(record=True)
+    self.assertEqual(rec.deviceId, 0x4d549bc7)
+    self.assertEqual(rec.swVersion, (3, 112))
+    self.assertEqual(rec.dbVersion, (0, 50))
+    self.assertIn('SW-Version:     3.112', rec.text())
+
+    frame = bytes.fromhex('00 02 cb 7f 06 00 00 40 01 25 80 00 00')
+    rec = mcandecode.McanDecode(frame).decode(record=True)
+    self.assertEqual(rec.protocol, 0x25)
+    self.assertEqual(rec.signalQuality, 0x80)
+    self.assertIn('MFX-MainRail - 25', str(rec))
+
+    # kurzer S88-Polling-Datenrahmen ohne Device-ID
+    frame = bytes.fromhex('00 20 cb 7f 00 ff ff ff ff 00 00 00 00')
+    rec = mcandecode.McanDecode(frame).decode(record=True)
+    self.assertIsNone(rec.deviceId)
+    self.assertNotIn('Device-ID', str(rec))
+
+  def test_McanDecodeRecordCopy(self):
+    buf = bytearray.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32')
+    rec = mcandecode.McanDecode(buf).decode(record=True)
+    text = str(rec)
+    buf[:] = bytes.fromhex('00 23 0b 06 08 00 00 00 2d 00 01 00 00')
+    self.assertEqual(str(rec), text)
+    self.assertEqual(rec.frame.getHash(), 0xb713)
+
+  def test_McanDecodeRegister(self):
+    frame = bytes.fromhex('00 6c cb 7f 05 00 00 00 1e 07 00 00 00')
+    self.assertIn('unknown command', mcandecode.McanDecode(frame).decode())
+
+    def decodeTest(msg, rec):
+      mcandecode.decodeDevice(msg, rec)
+      rec.value = msg.getByte('d4')
+    def renderTest(rec):
+      return mcandecode.renderDevice(rec) + mcandecode.McanDecode.formatLine('Test:', rec.value)
+    mcandecode.McanDecode.registerCommand(0x6c, 'Test command', decodeTest, renderTest)
+    try:
+      rec = mcandecode.McanDecode(frame).decode(record=True)
+      self.assertEqual(rec.value, 7)
+      self.assertIn('108 (6c) - Test command', str(rec))
+      self.assertIn('Test:           7', str(rec))
+    finally:
+      mcandecode.McanDecode.unregisterCommand(0x6c)
+    self.assertIsNone(mcandecode.McanDecode.commandName(0x6c))
+    self.assertIn('unknown command', mcandecode.McanDecode(frame).decode())
+
+    frame = bytes.fromhex('00 00 cb 7f 07 00 00 00 00 09 02 03 00')
+    rec = mcandecode.McanDecode(frame).decode(record=True)
+    self.assertEqual(rec.subcommand, 9)
+    self.assertEqual(rec.counter, (2, 3))
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,88 @@
+""" Tests fuer die Auswertungen ueber Mitschnitte (mcananalytics)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import os
+import random
+import sys
+from array import array
+sys.path.insert(0, "../")
+
+from mcan import mcananalytics, mcanbatch, mcanlog
+
+LOGFILE = os.path.join(os.path.dirname(__file__), 'testdata', 'mcan-20201216113413.log')
+
+def loadColumns(useNumpy):
+  with mcanlog.McanLogReader(LOGFILE) as reader:
+    timestamps, buf = next(reader.batches(size=100))
+  columns = mcanbatch.decodeFrames(buf, useNumpy)
+  if useNumpy:
+    columns.timestamps = mcanbatch.numpy.frombuffer(timestamps, dtype='i8')
+  else:
+    columns.timestamps = timestamps
+  return columns
+
+class McanAnalyticsTest(unittest.TestCase):
+
+  def checkColumns(self, columns):
+    starts, counts, loads = mcananalytics.busLoad(columns, window=5000)
+    self.assertEqual(list(counts), [7, 3, 14, 8, 3, 3])
+    self.assertEqual(int(starts[1]) - int(starts[0]), 5000)
+    self.assertAlmostEqual(float(loads[0]), (6*115 + 67) / 1250000)
+    _, counts, _ = mcananalytics.busLoad(columns, window=2000, step=1000)
+    self.assertEqual(sum(counts), 2 * 38 - 2)
+
+    self.assertEqual(mcananalytics.commandCounts(columns)
+                    , { 'System command': 8, 'MFX Verify': 2, 'Track state': 16
+                      , 'Member ping': 9, 'Bootloader': 3})
+    self.assertEqual(mcananalytics.commandCounts(columns, response=1)['Member ping'], 6)
+    self.assertEqual(mcananalytics.topTalkers(columns, 2), [(0x0b06, 12), (0xef1d, 12)])
+    self.assertEqual(mcananalytics.hashCounts(columns)[0x1f71], 7)
+
+    latencies = mcananalytics.responseLatencies(columns)
+    self.assertEqual(list(latencies), [1000, 0, 0, 0, 0, 0, 0])
+    self.assertEqual(mcananalytics.latencyHistogram(latencies, (0, 500)), [6, 0, 1])
+    summary = mcananalytics.summary(columns)
+    self.assertEqual(summary['frames'], 38)
+    self.assertEqual(summary['maxFrames'], 6)
+
+  def test_array(self):
+    self.checkColumns(loadColumns(False))
+
+  @unittest.skipIf(mcanbatch.numpy is None, 'numpy not available')
+  def test_numpy(self):
+    self.checkColumns(loadColumns(True))
+
+  @unittest.skipIf(mcanbatch.numpy is None, 'numpy not available')
+  def test_latenciesNumpyMatchesLoop(self):
+    numpy = mcanbatch.numpy
+    rnd = random.Random(4711)
+    size = 2000
+    values = { 'prio'     : [0] * size
+             , 'command'  : [rnd.choice((0x30, 0x0e, 0x36)) for _ in range(size)]
+             , 'response' : [rnd.randint(0, 1) for _ in range(size)]
+             , 'hash'     : [0] * size
+             , 'dlc'      : [rnd.choice((0, 5, 8)) for _ in range(size)]
+             , 'dataH'    : [rnd.randint(1, 3) for _ in range(size)]
+             , 'dataL'    : [0] * size
+             }
+    timestamps = sorted(rnd.randint(0, 100000) for _ in range(size))
+    arrays = mcanbatch.McanColumns( *(array('q', values[name]) for name in values)
+                                  , timestamps=array('q', timestamps))
+    ndarrays = mcanbatch.McanColumns( *(numpy.array(values[name], 'i8') for name in values)
+                                    , timestamps=numpy.array(timestamps, 'i8'))
+    for commands in (None, (0x30, 0x36)):
+      expected = mcananalytics.responseLatencies(arrays, commands)
+      self.assertGreater(len(expected), 100)
+      self.assertEqual(mcananalytics.responseLatencies(ndarrays, commands).tolist(), expected.tolist())
+
+if __name__ == '__main__':
+  unittest.main()
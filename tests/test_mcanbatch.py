@@ -0,0 +1,48 @@
+""" Tests fuer die spaltenweise Dekodierung (mcanbatch)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanbatch
+
+FRAMES = bytes.fromhex('00 30 1f 71 00 00 00 00 00 00 00 00 00'
+                       '00 31 b7 13 08 4d 54 9b c7 03 70 00 32'
+                       '00 23 0b 06 08 00 00 00 2d 00 01 00 00')
+
+class McanBatchTest(unittest.TestCase):
+
+  def checkColumns(self, cols):
+    self.assertEqual(len(cols), 3)
+    self.assertEqual(list(cols.command), [0x30, 0x30, 0x22])
+    self.assertEqual(list(cols.response), [0, 1, 1])
+    self.assertEqual(list(cols.hash), [0x1f71, 0xb713, 0x0b06])
+    self.assertEqual(list(cols.dlc), [0, 8, 8])
+    self.assertEqual(list(cols.dataH), [0, 0x4d549bc7, 0x2d])
+    self.assertEqual(list(cols.dataL), [0, 0x03700032, 0x00010000])
+    self.assertEqual(cols.row(1), (0, 0x30, 1, 0xb713, 8, 0x4d549bc7, 0x03700032))
+
+  def test_decodeFramesArray(self):
+    self.checkColumns(mcanbatch.decodeFrames(FRAMES, useNumpy=False))
+    self.checkColumns(mcanbatch.decodeFrames(bytearray(FRAMES), useNumpy=False))
+    self.checkColumns(mcanbatch.decodeFrames(memoryview(FRAMES), useNumpy=False))
+
+  @unittest.skipIf(mcanbatch.numpy is None, 'numpy not available')
+  def test_decodeFramesNumpy(self):
+    self.checkColumns(mcanbatch.decodeFrames(memoryview(FRAMES)))
+
+  def test_invalidLength(self):
+    with self.assertRaises(ValueError):
+      mcanbatch.decodeFrames(FRAMES[:-1])
+
+if __name__ == '__main__':
+  unittest.main()
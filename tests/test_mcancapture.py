@@ -0,0 +1,59 @@
+""" Tests fuer das binaere Mitschnittformat (mcancapture)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import os
+import sys
+import tempfile
+sys.path.insert(0, "../")
+
+from mcan import mcancapture, mcanlog, mcandecode, mcanbatch
+
+LOGFILE = os.path.join(os.path.dirname(__file__), 'testdata', 'mcan-20201216113413.log')
+
+class McanCaptureTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.tmpDir.name, 'capture.mcap')
+    self.count = mcancapture.convertLog(LOGFILE, self.path, blockSize=4)
+
+  def tearDown(self):
+    self.tmpDir.cleanup()
+
+  def test_convert(self):
+    self.assertEqual(self.count, 38)
+    with mcanlog.McanLogReader(LOGFILE) as logReader:
+      expected = [(timestamp, bytes(frame)) for timestamp, frame in logReader.frames()]
+    with mcancapture.McanCaptureReader(self.path) as reader:
+      self.assertEqual(len(reader), 38)
+      actual = [(timestamp, bytes(frame)) for timestamp, frame in reader.frames()]
+      timestamps, buf = reader.batch(8, 11)
+    self.assertEqual(actual, expected)
+    self.assertEqual(list(timestamps), [expected[i][0] * 1000 for i in range(8, 11)])
+    self.assertEqual(bytes(buf), b''.join(frame for _, frame in expected[8:11]))
+    self.assertEqual(list(mcanbatch.decodeFrames(buf).hash), [0xb713, 0xef1d, 0x0b06])
+
+  def test_query(self):
+    start = mcanlog.parseTimestamp('16.12.2020 11:34:28')
+    end = mcanlog.parseTimestamp('16.12.2020 11:34:31')
+    with mcancapture.McanCaptureReader(self.path) as reader:
+      contacts = []
+      for timestamp, frame in reader.frames(start, end, command=0x22):
+        self.assertTrue(start <= timestamp < end)
+        contacts.append(mcandecode.McanDecode(frame).decode(record=True).contact)
+      self.assertEqual(contacts, [45, 30, 30, 30])
+      self.assertEqual(list(reader.frames(command=0x42)), [])
+    # der letzte Datenrahmen ist nach close() noch gueltig
+    self.assertEqual(frame[1], 0x23)
+
+if __name__ == '__main__':
+  unittest.main()
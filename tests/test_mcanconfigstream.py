@@ -0,0 +1,115 @@
+""" Tests fuer das Zusammensetzen von Konfigurationsdaten (mcanconfigstream)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import sys
+import zlib
+from binascii import crc_hqx
+sys.path.insert(0, "../")
+
+from mcan import mcanconfigstream, mcancommand, mcandecode
+
+LOKLISTE = b''.join(b'lok\n .name=BR %d\n .uid=0x%x\n' % (i, 0x4000 + i) for i in range(300))
+
+def streamFrames(content, mcanHash=0xef1d, crc=None, size=None):
+  if size is None:
+    size = len(content)
+  data = size.to_bytes(4, 'big') + zlib.compress(content)
+  padded = data + bytes(-len(data) % 8)
+  if crc is None:
+    crc = crc_hqx(padded, 0xffff)
+  frames = []
+  cmd = mcancommand.McanCommand(mcanHash)
+  cmd.setCommand(0x42, dlc=6)
+  cmd.setDeviceId(len(data))
+  cmd.setByte('d4', crc >> 8)
+  cmd.setByte('d5', crc & 0xff)
+  frames.append(cmd.frame)
+  for offset in range(0, len(padded), 8):
+    frame = bytearray(13)
+    mcancommand.packFrame( frame, 0, 0, 0x42, mcanHash, 8
+                         , int.from_bytes(padded[offset:offset+4], 'big')
+                         , int.from_bytes(padded[offset+4:offset+8], 'big'))
+    frames.append(frame)
+  return frames
+
+class McanConfigStreamTest(unittest.TestCase):
+
+  def test_reassemble(self):
+    completed = []
+    chunks = []
+    reassembler = mcanconfigstream.McanConfigReassembler(
+                    lambda mcanHash: chunks.append
+                  , onComplete=lambda mcanHash, stream: completed.append((mcanHash, stream)))
+    frames = streamFrames(LOKLISTE)
+    results = [reassembler.feed(frame) for frame in frames]
+    self.assertEqual(results[:-1], [None] * (len(frames) - 1))
+    stream = results[-1]
+    self.assertTrue(stream.valid)
+    self.assertEqual(stream.size, len(LOKLISTE))
+    self.assertEqual(stream.unpacked, len(LOKLISTE))
+    self.assertEqual(b''.join(chunks), LOKLISTE)
+    self.assertGreater(len(chunks), 1)
+    self.assertEqual(completed, [(0xef1d, stream)])
+    self.assertEqual(len(reassembler), 0)
+    self.assertIn('Config data stream', mcandecode.McanDecode(frames[0]).decode())
+
+  def test_crcError(self):
+    reassembler = mcanconfigstream.McanConfigReassembler(lambda mcanHash: lambda chunk: None)
+    for frame in streamFrames(b'[lokomotive]\n', crc=0x1234):
+      stream = reassembler.feed(frame)
+    self.assertFalse(stream.valid)
+    self.assertTrue(stream.error.startswith('crc'))
+
+  def test_sizeMismatch(self):
+    for size in (len(LOKLISTE) - 1, len(LOKLISTE) + 1):
+      reassembler = mcanconfigstream.McanConfigReassembler(lambda mcanHash: lambda chunk: None)
+      with self.assertRaises(ValueError):
+        for frame in streamFrames(LOKLISTE, size=size):
+          reassembler.feed(frame)
+      self.assertEqual(len(reassembler), 0)
+
+  def test_empty(self):
+    def startFrame(crc):
+      cmd = mcancommand.McanCommand(0xef1d)
+      cmd.setCommand(0x42, dlc=6)
+      cmd.setDeviceId(0)
+      cmd.setByte('d4', crc >> 8)
+      cmd.setByte('d5', crc & 0xff)
+      return cmd.frame
+    completed = []
+    chunks = []
+    reassembler = mcanconfigstream.McanConfigReassembler(
+                    lambda mcanHash: chunks.append, compressed=False
+                  , onComplete=lambda mcanHash, stream: completed.append(stream))
+    stream = reassembler.feed(startFrame(0xffff))
+    self.assertTrue(stream.valid)
+    self.assertEqual(completed, [stream])
+    self.assertEqual((chunks, len(reassembler)), ([], 0))
+    # komprimiert fehlt die Laenge der entpackten Daten
+    reassembler = mcanconfigstream.McanConfigReassembler(lambda mcanHash: chunks.append)
+    stream = reassembler.feed(startFrame(0xffff))
+    self.assertFalse(stream.valid)
+    self.assertEqual(len(reassembler), 0)
+
+  def test_tooLong(self):
+    sinks = []
+    reassembler = mcanconfigstream.McanConfigReassembler(sinks.append, maxLength=64)
+    frames = streamFrames(LOKLISTE)
+    self.assertTrue(all(reassembler.feed(frame) is None for frame in frames))
+    self.assertEqual(reassembler.rejected, 1)
+    self.assertEqual(sinks, [])
+    self.assertEqual(len(reassembler), 0)
+    with self.assertRaises(ValueError):
+      mcanconfigstream.McanConfigStream(mcanconfigstream.MAXLENGTH + 1, 0, None)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,74 @@
+""" Tests fuer die Zuordnung von Antworten (mcancorrelator)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import asyncio
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcancorrelator, mcancommand
+
+def frame(cmd, dlc, uid=0, dataL=0, response=False):
+  buf = bytearray(13)
+  mcancommand.packFrame(buf, 0, 0, cmd | response, 0x4711, dlc, uid, dataL)
+  return buf
+
+class McanCorrelatorTest(unittest.IsolatedAsyncioTestCase):
+
+  async def test_future(self):
+    correlator = mcancorrelator.McanCorrelator(clock=lambda: 0.0)
+    sent = []
+    future = correlator.request(sent.append, frame(0x0e, 7, 0x4006))
+    self.assertEqual(len(sent), 1)
+    self.assertFalse(correlator.feed(frame(0x0e, 7, 0x4007, response=True)))
+    self.assertFalse(correlator.feed(frame(0x0e, 7, 0x4006)))
+    self.assertTrue(correlator.feed(frame(0x0e, 7, 0x4006, 0x12345678, response=True)))
+    msg = await future
+    self.assertEqual(msg.getDeviceId(), 0x4006)
+    self.assertEqual(len(correlator), 0)
+
+    future = correlator.expect(0x06, 0x4008, timeout=0.1)
+    self.assertEqual(correlator.tick(), 0)
+    self.assertEqual(correlator.tick(), 1)
+    with self.assertRaises(asyncio.TimeoutError):
+      await future
+
+  def test_callbackAndCollect(self):
+    correlator = mcancorrelator.McanCorrelator(resolution=0.1, slots=4, clock=lambda: 0.0)
+    results = []
+    correlator.expect(0x0e, 0x4006, callback=results.append, timeout=1.0)
+    pending = correlator.expect(0x30, callback=results.append, timeout=0.5, collect=True)
+    self.assertTrue(correlator.feed(frame(0x30, 8, 0x4d549bc7, response=True)))
+    self.assertTrue(correlator.feed(frame(0x30, 8, 0x43546e5a, response=True)))
+    self.assertEqual(correlator.advance(0.55), 1)
+    self.assertTrue(pending.done)
+    self.assertEqual([msg.getDeviceId() for msg in results[0]], [0x4d549bc7, 0x43546e5a])
+    self.assertEqual(correlator.advance(0.95), 0)
+    self.assertEqual(correlator.advance(1.0), 1)
+    self.assertEqual(results[1:], [None])
+    self.assertEqual(len(correlator), 0)
+
+  def test_collectDoesNotBlock(self):
+    correlator = mcancorrelator.McanCorrelator(clock=lambda: 0.0)
+    collected = []
+    results = []
+    correlator.expect(0x30, callback=collected.append, collect=True)
+    correlator.expect(0x30, callback=results.append)
+    response = frame(0x30, 0, response=True)
+    self.assertTrue(correlator.feed(response))
+    self.assertEqual(len(results), 1)
+    self.assertEqual(len(correlator), 1)
+    # Kopie, nicht der Puffer des Aufrufers
+    response[9] = 0xff
+    self.assertEqual(results[0].array[9], 0)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,71 @@
+""" Tests fuer die Unterdrueckung gleicher Datenrahmen (mcandedup)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import os
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcandedup, mcanlog
+
+LOGFILE = os.path.join(os.path.dirname(__file__), 'testdata', 'mcan-20201216113413.log')
+
+PING     = bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32')
+TRACK_ON = bytes.fromhex('00 23 0b 06 08 00 00 00 2d 00 01 00 00')
+TRACK_OFF= bytes.fromhex('00 23 0b 06 08 00 00 00 2d 01 00 00 00')
+TRACK_1E = bytes.fromhex('00 23 0b 06 08 00 00 00 1e 00 01 00 00')
+
+class McanDedupTest(unittest.TestCase):
+
+  def test_window(self):
+    dedup = mcandedup.McanDedup(window=1.0, maxEntries=2)
+    self.assertFalse(dedup.isDuplicate(PING, 10.0))
+    self.assertTrue(dedup.isDuplicate(PING, 10.5))
+    self.assertFalse(dedup.isDuplicate(PING, 11.0))
+    self.assertFalse(dedup.isDuplicate(TRACK_ON, 11.0))
+    self.assertFalse(dedup.isDuplicate(TRACK_1E, 11.0))
+    # PING ist aus dem LRU-Speicher verdraengt
+    self.assertEqual(len(dedup), 2)
+    self.assertFalse(dedup.isDuplicate(PING, 11.1))
+    self.assertEqual((dedup.passed, dedup.suppressed), (5, 1))
+    self.assertEqual(dedup.suppressedCommands, {0x30: 1})
+
+  def test_fields(self):
+    dedup = mcandedup.McanDedup(window=1.0, fields=('cmdAndResp', 'd2', 'd3'), commands=(0x22,))
+    self.assertEqual( dedup.filter([TRACK_ON, TRACK_ON, TRACK_1E, PING, PING], 0.0)
+                    , [TRACK_ON, TRACK_1E, PING, PING])
+    received = []
+    handler = mcandedup.McanDedup(clock=lambda: 0.0).wrap(received.extend)
+    handler([PING, PING])
+    handler([PING])
+    self.assertEqual(received, [PING])
+    with self.assertRaises(ValueError):
+      mcandedup.McanDedup(fields=('cmd',))
+
+  def test_transitions(self):
+    # EIN -> AUS -> EIN: jeder Wechsel wird weitergegeben, nur die
+    # Wiederholung des letzten Zustands unterdrueckt
+    dedup = mcandedup.McanDedup(window=1.0)
+    self.assertEqual( [dedup.isDuplicate(frame, 0.0) for frame in (TRACK_ON, TRACK_OFF, TRACK_ON, TRACK_ON)]
+                    , [False, False, False, True])
+    self.assertEqual(len(dedup), 1)
+
+  def test_log(self):
+    dedup = mcandedup.McanDedup(window=2.0)
+    with mcanlog.McanLogReader(LOGFILE) as reader:
+      passed = [frame for timestamp, frame in reader.frames() if not dedup.isDuplicate(frame, timestamp)]
+    self.assertEqual(len(passed) + dedup.suppressed, 38)
+    # die Track-state-Datenrahmen im Mitschnitt sind echte Wechsel
+    self.assertEqual(dedup.suppressedCommands, {})
+    self.assertEqual(len(passed), 38)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,124 @@
+""" Tests fuer die asyncio-Anbindung (mcangateway) gegen einen lokalen
+    Ersatz-Server
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import asyncio
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcangateway, mcancommand, mcandecode, mcanmetrics
+
+class EchoUdp(asyncio.DatagramProtocol):
+  """ beantwortet jeden Datenrahmen mit gesetztem Antwortbit
+  """
+  def connection_made(self, transport):
+    self.transport = transport
+
+  def datagram_received(self, data, addr):
+    response = bytearray(data)
+    response[1] |= 0x01
+    self.transport.sendto(bytes(response), addr)
+
+class EchoTcp(asyncio.Protocol):
+  """ beantwortet alle Daten mit gesetztem Antwortbit, verteilt auf
+      mehrere Pakete
+  """
+  def connection_made(self, transport):
+    self.transport = transport
+
+  def data_received(self, data):
+    response = bytearray(data)
+    for offset in range(1, len(response), 13):
+      response[offset] |= 0x01
+    for offset in range(0, len(response), 5):
+      self.transport.write(bytes(response[offset:offset+5]))
+
+class McanGatewayTest(unittest.IsolatedAsyncioTestCase):
+
+  def setUp(self):
+    self.received = []
+    self.batchSizes = []
+    self.event = asyncio.Event()
+
+  def handler(self, frames):
+    self.batchSizes.append(len(frames))
+    self.received.extend(mcandecode.McanDecode(frame.array).decode(record=True) for frame in frames)
+    if len(self.received) >= 3:
+      self.event.set()
+
+  def commands(self):
+    commands = []
+    for contact in (1, 2, 3):
+      cmd = mcancommand.McanCommand(0xcb7f)
+      cmd.setCommand(0x22)
+      cmd.setTrackState(0, contact, 1, 0)
+      commands.append(cmd)
+    return commands
+
+  async def test_udp(self):
+    loop = asyncio.get_running_loop()
+    server, _ = await loop.create_datagram_endpoint(EchoUdp, local_addr=('127.0.0.1', 0))
+    port = server.get_extra_info('sockname')[1]
+    metrics = mcanmetrics.McanMetrics()
+    gateway = mcangateway.McanGateway(self.handler, metrics=metrics)
+    await gateway.openUdp('127.0.0.1', sendPort=port, recvPort=0, localHost='127.0.0.1')
+    # zu kurze Datagramme und unvollstaendige Datenrahmen werden verworfen
+    gateway.send(b'\x00\x23\x0b')
+    commands = self.commands()
+    gateway.send(bytes(commands[0].array) + b'\x00\x23\x0b')
+    for cmd in commands[1:]:
+      await gateway.write(cmd)
+    await asyncio.wait_for(self.event.wait(), 5)
+    gateway.close()
+    server.close()
+    await gateway.waitClosed()
+    self.assertNotIn(0, self.batchSizes)
+    self.assertEqual(sorted(rec.contact for rec in self.received), [1, 2, 3])
+    self.assertTrue(all(rec.response == 1 for rec in self.received))
+    snapshot = metrics.snapshot()
+    self.assertEqual(snapshot['sent'], 4)
+    self.assertEqual(snapshot['received'], 3)
+    self.assertEqual(snapshot['dropped'], 2)
+    self.assertEqual(gateway.dropped, 2)
+    self.assertEqual((gateway.errors, snapshot['errors']), (0, 0))
+    # Fehler des Sockets werden gezaehlt und gemerkt
+    error = ConnectionRefusedError()
+    gateway._errorReceived(error)
+    self.assertEqual((gateway.errors, gateway.lastError), (1, error))
+    self.assertEqual(metrics.snapshot()['errors'], 1)
+
+  async def test_tcp(self):
+    server = await asyncio.get_running_loop().create_server(EchoTcp, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    gateway = mcangateway.McanGateway(self.handler)
+    await gateway.openTcp('127.0.0.1', port)
+    buf = bytearray(3 * 13)
+    for i, cmd in enumerate(self.commands()):
+      cmd.writeInto(buf, i * 13)
+    # angehaltener Transport: writeFrames() wartet bis zur Freigabe
+    gateway._pauseWriting()
+    self.assertFalse(gateway.isWritable)
+    task = asyncio.ensure_future(gateway.writeFrames(buf))
+    await asyncio.sleep(0.01)
+    self.assertFalse(task.done())
+    gateway._resumeWriting()
+    await task
+    await asyncio.wait_for(self.event.wait(), 5)
+    gateway.close()
+    await gateway.waitClosed()
+    server.close()
+    await server.wait_closed()
+    self.assertEqual([rec.contact for rec in self.received], [1, 2, 3])
+    self.assertEqual([rec.command for rec in self.received], [0x22] * 3)
+
+if __name__ == '__main__':
+  unittest.main()
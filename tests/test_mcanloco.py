@@ -0,0 +1,56 @@
+""" Tests fuer den Zwischenspeicher der Lok-Zustaende (mcanloco)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanloco, mcancommand, mcandecode
+
+UID = 0x4006
+
+def locFrame(cmd, dlc, d4=0, d5=0, uid=UID, response=False):
+  frame = bytearray(13)
+  mcancommand.packFrame(frame, 0, 0, cmd | response, 0x4711, dlc, uid
+                       , (d4 << 24) | (d5 << 16))
+  return frame
+
+class McanLocoTest(unittest.TestCase):
+
+  def test_update(self):
+    cache = mcanloco.McanLocoCache()
+    self.assertIsNone(cache.speed(UID))
+    self.assertTrue(cache.update(locFrame(0x08, 6, 0x01, 0xf4)))
+    self.assertEqual(cache.speed(UID), 500)
+    self.assertFalse(cache.update(locFrame(0x08, 6, 0x01, 0xf4, response=True)))
+    self.assertFalse(cache.update(locFrame(0x08, 4)))
+    seq = cache.sequence
+    self.assertTrue(cache.update(locFrame(0x0a, 5, mcanloco.SWITCH)))
+    self.assertEqual(cache.direction(UID), mcanloco.BACKWARD)
+    self.assertEqual(cache.speed(UID), 0)
+    rec = mcandecode.McanDecode(locFrame(0x0c, 6, 3, 1, uid=0xc005)).decode(record=True)
+    self.assertTrue(cache.update(rec))
+    self.assertTrue(cache.function(0xc005, 3))
+    self.assertEqual(cache.functions(0xc005), 0b1000)
+    self.assertEqual(cache.changedSince(seq), [UID, 0xc005])
+    self.assertEqual(cache.changedSince(cache.sequence), [])
+    self.assertEqual(cache.state(UID), (0, mcanloco.BACKWARD, 0, seq + 1))
+    self.assertEqual(len(cache), 2)
+
+  def test_decode(self):
+    rec = mcandecode.McanDecode(locFrame(0x08, 6, 0x01, 0xf4)).decode(record=True)
+    self.assertEqual(rec.speed, 500)
+    self.assertIn('Speed:          500', str(rec))
+    rec = mcandecode.McanDecode(locFrame(0x0a, 5, 2)).decode(record=True)
+    self.assertIn('Direction:      2 backward', str(rec))
+
+if __name__ == '__main__':
+  unittest.main()
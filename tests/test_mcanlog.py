@@ -0,0 +1,52 @@
+""" Tests fuer das Lesen von Mitschnitten im Textformat (mcanlog)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import os
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanlog, mcanbatch
+
+LOGFILE = os.path.join(os.path.dirname(__file__), 'testdata', 'mcan-20201216113413.log')
+
+class McanLogTest(unittest.TestCase):
+
+  def test_frames(self):
+    with mcanlog.McanLogReader(LOGFILE) as reader:
+      frames = list(reader.frames())
+    self.assertEqual(len(frames), 38)
+    timestamp, frame = frames[8]
+    self.assertEqual(mcanlog.formatTimestamp(timestamp), '16.12.2020 11:34:19')
+    self.assertEqual(frame, bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32'))
+    with open(LOGFILE) as logFile:
+      self.assertEqual(mcanlog.formatLine(timestamp, frame), logFile.readlines()[8].strip())
+
+  def test_seek(self):
+    start = mcanlog.parseTimestamp('16.12.2020 11:34:25')
+    end = mcanlog.parseTimestamp('16.12.2020 11:34:27')
+    with mcanlog.McanLogReader(LOGFILE) as reader:
+      frames = list(reader.frames(start, end))
+      self.assertEqual(len(frames), 7)
+      self.assertEqual(frames[0][0], start)
+      self.assertEqual(list(reader.frames(start + 3600)), [])
+      decoded = [msg.decode(record=True) for _, msg in reader.decoded(start, end)]
+    self.assertEqual([rec.contact for rec in decoded], [45] * 7)
+
+  def test_batches(self):
+    with mcanlog.McanLogReader(LOGFILE) as reader:
+      batches = list(reader.batches(size=16))
+    self.assertEqual([len(timestamps) for timestamps, _ in batches], [16, 16, 6])
+    cols = mcanbatch.decodeFrames(batches[2][1])
+    self.assertEqual(list(cols.command), [0, 0, 0x36, 0x30, 0x30, 0x30])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,52 @@
+""" Tests fuer die Zaehler der Dekodierung (mcanmetrics)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanmetrics, mcandecode
+
+FRAMES = [ bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32')
+         , bytes.fromhex('00 23 0b 06 08 00 00 00 2d 00 01 00 00')
+         , bytes.fromhex('00 22 0b 06 08 00 00 00 2d 01 00 00 00')
+         , bytes.fromhex('00 7e 0b 06 08 00 00 00 2d 01 00 00 00')
+         , bytes.fromhex('00 00 ef 1d 06 63 73 38 20 77 00 00 00')
+         ]
+
+class McanMetricsTest(unittest.TestCase):
+
+  def tearDown(self):
+    mcandecode.McanDecode.setMetrics(None)
+
+  def test_metrics(self):
+    metrics = mcanmetrics.McanMetrics()
+    mcandecode.McanDecode.setMetrics(metrics)
+    self.assertIs(mcandecode.McanDecode.getMetrics(), metrics)
+    for frame in FRAMES:
+      mcandecode.McanDecode(frame).decode(record=True)
+    snapshot = metrics.snapshot()
+    self.assertEqual(snapshot['frames'], 5)
+    self.assertEqual(snapshot['commands'], {0x30: 1, 0x22: 2, 0x7e: 1, 0x00: 1})
+    self.assertEqual(snapshot['responses'], {'command': 3, 'response': 2})
+    self.assertEqual(snapshot['hashes'], {0xb713: 1, 0x0b06: 3, 0xef1d: 1})
+    self.assertEqual(snapshot['unknownCommands'], {0x7e: 1})
+    self.assertEqual(snapshot['unknownSubcommands'], {0x77: 1})
+    self.assertEqual(sum(snapshot['latencyUs'].values()), 5)
+
+    metrics.reset()
+    self.assertEqual(metrics.snapshot()['frames'], 0)
+    mcandecode.McanDecode.setMetrics(None)
+    mcandecode.McanDecode(FRAMES[0]).decode()
+    self.assertEqual(metrics.snapshot()['frames'], 0)
+
+if __name__ == '__main__':
+  unittest.main()
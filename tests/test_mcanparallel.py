@@ -0,0 +1,53 @@
+""" Tests fuer die Dekodierung mit mehreren Prozessen (mcanparallel)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import os
+import sys
+import tempfile
+sys.path.insert(0, "../")
+
+from mcan import mcanparallel, mcancapture, mcanlog, mcanbatch
+
+LOGFILE = os.path.join(os.path.dirname(__file__), 'testdata', 'mcan-20201216113413.log')
+
+class McanParallelTest(unittest.TestCase):
+
+  def expected(self):
+    with mcanlog.McanLogReader(LOGFILE) as reader:
+      timestamps, buf = next(reader.batches(size=100))
+    return timestamps, mcanbatch.decodeFrames(buf)
+
+  def checkColumns(self, columns):
+    timestamps, expected = self.expected()
+    self.assertEqual(len(columns), 38)
+    self.assertEqual(list(columns.timestamps), list(timestamps))
+    for i in range(len(columns)):
+      self.assertEqual(columns.row(i), expected.row(i))
+
+  def test_decodeLog(self):
+    self.checkColumns(mcanparallel.decodeParallel(LOGFILE, workers=2, chunkSize=500, batchSize=4))
+
+  def test_decodeCapture(self):
+    with tempfile.TemporaryDirectory() as tmpDir:
+      path = os.path.join(tmpDir, 'capture.mcap')
+      mcancapture.convertLog(LOGFILE, path)
+      self.assertTrue(mcanparallel.isCapture(path))
+      self.checkColumns(mcanparallel.decodeParallel(path, workers=2, chunkSize=10 * mcancapture.RECORDLEN, batchSize=4))
+
+  def test_empty(self):
+    with tempfile.TemporaryDirectory() as tmpDir:
+      path = os.path.join(tmpDir, 'empty.log')
+      open(path, 'w').close()
+      self.assertEqual(len(mcanparallel.decodeParallel(path, workers=1)), 0)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,109 @@
+""" Tests fuer die Wiedergabe von Mitschnitten (mcanreplay)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import asyncio
+import queue
+import unittest
+import os
+import sys
+import tempfile
+sys.path.insert(0, "../")
+
+from mcan import mcanreplay, mcancapture, mcanlog
+
+LOGFILE = os.path.join(os.path.dirname(__file__), 'testdata', 'mcan-20201216113413.log')
+
+class FakeClock():
+  def __init__(self):
+    self.now = 100.0
+    self.sleeps = []
+
+  def __call__(self):
+    return self.now
+
+  def sleep(self, seconds):
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+class McanReplayTest(unittest.TestCase):
+
+  def test_scaled(self):
+    clock = FakeClock()
+    sent = []
+    replay = mcanreplay.McanReplay(LOGFILE, lambda msg: sent.append((clock.now, bytes(msg.array)))
+                                  , speed=10, batchSize=8, clock=clock)
+    report = replay.run(clock.sleep)
+    self.assertEqual(report.frames, 38)
+    self.assertAlmostEqual(report.duration, 2.5)
+    self.assertEqual(report.late, 0)
+    with mcanlog.McanLogReader(LOGFILE) as reader:
+      expected = [(100.0 + (timestamp - 1608118454) / 10, bytes(frame)) for timestamp, frame in reader.frames()]
+    self.assertEqual(len(sent), len(expected))
+    for (sentTime, frame), (expectedTime, expectedFrame) in zip(sent, expected):
+      self.assertAlmostEqual(sentTime, expectedTime)
+      self.assertEqual(frame, expectedFrame)
+
+  def test_drift(self):
+    clock = FakeClock()
+    def slowSink(msg):
+      clock.now += 0.01
+    report = mcanreplay.McanReplay(LOGFILE, slowSink, speed=1000, clock=clock).run(clock.sleep)
+    self.assertEqual(report.frames, 38)
+    self.assertGreater(report.late, 0)
+    self.assertGreater(report.maxDrift, 0.01)
+    self.assertIn('late:', str(report))
+
+  def test_maxSpeedCapture(self):
+    with tempfile.TemporaryDirectory() as tmpDir:
+      path = os.path.join(tmpDir, 'capture.mcap')
+      mcancapture.convertLog(LOGFILE, path)
+      frames = queue.Queue()
+      clock = FakeClock()
+      report = mcanreplay.McanReplay(path, frames, speed=mcanreplay.MAXSPEED, clock=clock).run(clock.sleep)
+      self.assertEqual(clock.sleeps, [])
+      self.assertEqual(report.frames, 38)
+      self.assertEqual(frames.qsize(), 38)
+      self.assertEqual(frames.get().getCommand(), 0x06)
+
+  def test_async(self):
+    frames = asyncio.Queue()
+    report = asyncio.run(mcanreplay.McanReplay(LOGFILE, frames, speed=mcanreplay.MAXSPEED).runAsync())
+    self.assertEqual(report.frames, 38)
+    self.assertEqual(frames.qsize(), 38)
+
+  def test_asyncYields(self):
+    class Sink():
+      def __init__(self):
+        self.frames = 0
+        self.drains = 0
+      def send(self, msg):
+        self.frames += 1
+      async def drain(self):
+        self.drains += 1
+    async def replayWithTicker():
+      ticks = []
+      async def ticker():
+        while True:
+          ticks.append(sink.frames)
+          await asyncio.sleep(0)
+      task = asyncio.ensure_future(ticker())
+      await asyncio.sleep(0)
+      report = await mcanreplay.McanReplay(LOGFILE, sink, speed=mcanreplay.MAXSPEED, batchSize=8).runAsync()
+      task.cancel()
+      return report, ticks
+    sink = Sink()
+    report, ticks = asyncio.run(replayWithTicker())
+    self.assertEqual(report.frames, 38)
+    self.assertEqual(sink.drains, 4)
+    self.assertEqual(ticks[:5], [0, 8, 16, 24, 32])
+
+if __name__ == '__main__':
+  unittest.main()
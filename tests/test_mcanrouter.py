@@ -0,0 +1,64 @@
+""" Tests fuer die Verteilung von Datenrahmen (mcanrouter)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanrouter, mcanmetrics
+
+PING     = bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32')
+TRACK_2D = bytes.fromhex('00 23 0b 06 08 00 00 00 2d 00 01 00 00')
+TRACK_1E = bytes.fromhex('00 23 0b 04 08 00 00 00 1e 00 01 00 00')
+
+class McanRouterTest(unittest.TestCase):
+
+  def test_route(self):
+    router = mcanrouter.McanRouter()
+    calls = []
+    def handler(name):
+      return lambda msg: calls.append((name, msg.getContact()))
+    router.subscribe(handler('all'))
+    router.subscribe(handler('track'), command='Track state')
+    router.subscribe(handler('command'), command=0x22, response=False)
+    router.subscribe(handler('hash'), command=0x22, hash=0x0b04)
+    router.subscribe(handler('device'), deviceId=0x4d549bc7)
+    subId = router.subscribe(handler('range'), command=0x22, contacts=(40, 50))
+
+    self.assertEqual(router.route(PING), 2)
+    self.assertEqual(router.route(TRACK_2D), 3)
+    self.assertEqual(router.route(TRACK_1E), 3)
+    self.assertEqual(calls, [ ('all', 0x9bc7), ('device', 0x9bc7)
+                            , ('all', 45), ('track', 45), ('range', 45)
+                            , ('all', 30), ('track', 30), ('hash', 30)
+                            ])
+    router.unsubscribe(subId)
+    self.assertEqual(len(router), 5)
+    self.assertEqual(router.route(TRACK_2D), 2)
+    with self.assertRaises(ValueError):
+      router.subscribe(handler('none'), command='no such command')
+
+  def test_metrics(self):
+    metrics = mcanmetrics.McanMetrics()
+    router = mcanrouter.McanRouter(metrics=metrics)
+    router.subscribe(lambda msg: None, command='Track state')
+    router.subscribe(lambda msg: None, contacts=(40, 50))
+    for frame in (PING, TRACK_2D, TRACK_1E):
+      router.route(frame)
+    snapshot = metrics.snapshot()
+    self.assertEqual(snapshot['routed'], 3)
+    self.assertEqual(snapshot['unrouted'], 1)
+    self.assertEqual(snapshot['handlerCalls'], 3)
+    self.assertEqual(sum(snapshot['routeLatencyUs'].values()), 3)
+    self.assertEqual(snapshot['frames'], 0)
+
+if __name__ == '__main__':
+  unittest.main()
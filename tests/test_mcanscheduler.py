@@ -0,0 +1,63 @@
+""" Tests fuer die Sende-Warteschlange (mcanscheduler)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanscheduler, mcancommand
+
+def frame(cmd, dlc, dataH=0, dataL=0, prio=0):
+  buf = bytearray(13)
+  mcancommand.packFrame(buf, 0, prio, cmd, 0x4711, dlc, dataH, dataL)
+  return bytes(buf)
+
+def speed(uid, value):
+  return frame(0x08, 6, uid, value << 16)
+
+STOPP = frame(0x00, 5, 0, 0x00 << 24)
+GO    = frame(0x00, 5, 0, 0x01 << 24)
+
+class McanSchedulerTest(unittest.TestCase):
+
+  def test_order(self):
+    scheduler = mcanscheduler.McanScheduler()
+    scheduler.put(speed(0x4006, 100))
+    scheduler.put(frame(0x22, 8, 0x0001002d, 0x0001 << 16, prio=1))
+    scheduler.put(frame(0x22, 8, 0x0001002d, 0x0100 << 16, prio=1))
+    scheduler.put(GO)
+    self.assertFalse(scheduler.put(speed(0x4007, 200)))
+    self.assertTrue(scheduler.put(speed(0x4006, 300)))
+    scheduler.put(STOPP)
+    self.assertEqual(len(scheduler), 5)
+    self.assertEqual(scheduler.coalesced, 2)
+    # ersetzte Befehle behalten ihren Platz
+    self.assertEqual(scheduler.due(), [ STOPP, speed(0x4006, 300), GO, speed(0x4007, 200)
+                                      , frame(0x22, 8, 0x0001002d, 0x0100 << 16, prio=1)])
+    self.assertEqual(len(scheduler), 0)
+    self.assertIsNone(scheduler.get())
+
+  def test_budget(self):
+    scheduler = mcanscheduler.McanScheduler(fps=10, burst=2, clock=lambda: 0.0)
+    for uid in range(5):
+      scheduler.put(speed(uid, 10))
+    self.assertEqual(len(scheduler.due(0.0)), 2)
+    self.assertAlmostEqual(scheduler.delay(0.0), 0.1)
+    scheduler.put(STOPP)
+    self.assertEqual(scheduler.due(0.0), [STOPP])
+    self.assertEqual(len(scheduler.due(0.15)), 1)
+    sent = []
+    self.assertEqual(scheduler.sendDue(sent.append, 1.0), 2)
+    self.assertEqual(sent, [speed(3, 10), speed(4, 10)])
+    self.assertIsNone(scheduler.delay(1.0))
+
+if __name__ == '__main__':
+  unittest.main()
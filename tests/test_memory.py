@@ -0,0 +1,93 @@
+""" Tests fuer den Speicherbedarf je Datenrahmen (MicroPython-Profil)
+    Gemessen wird mit tracemalloc unter CPython; ein Objekt mit __dict__
+    ueberschreitet die Grenzen deutlich.
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (c) 2021
+"""
+import os
+import subprocess
+import tracemalloc
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import mcanmsgarray, mcandecode, mcancommand, mcanhash, states
+
+PING = bytes.fromhex('00 31 b7 13 08 4d 54 9b c7 03 70 00 32')
+COUNT = 1000
+
+# Grenzen in Bytes je Objekt bzw. je dekodiertem Datenrahmen
+BUDGET = { 'McanMsgArray' : 64
+         , 'McanDecode'   : 80
+         , 'McanCommand'  : 160
+         , 'McanHash'     : 96
+         , 'States'       : 160
+         }
+DECODE_PEAK = 1024
+DECODE_RETAINED = 256
+
+class MemoryTest(unittest.TestCase):
+
+  def setUp(self):
+    self.frames = [bytearray(PING) for _ in range(COUNT)]
+
+  def tearDown(self):
+    tracemalloc.stop()
+
+  def perObject(self, make):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    objects = [make(frame) for frame in self.frames]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del objects
+    return used / COUNT
+
+  def test_slots(self):
+    for obj in ( mcanmsgarray.McanMsgArray(), mcandecode.McanDecode(PING)
+               , mcancommand.McanCommand(0x4711), mcanhash.McanHash(0x4d549bc7)
+               , states.States()):
+      self.assertFalse(hasattr(obj, '__dict__'), type(obj).__name__)
+
+  def test_objectBudget(self):
+    sizes = { 'McanMsgArray' : self.perObject(mcanmsgarray.McanMsgArray)
+            , 'McanDecode'   : self.perObject(mcandecode.McanDecode)
+            , 'McanCommand'  : self.perObject(lambda frame: mcancommand.McanCommand(0x4711))
+            , 'McanHash'     : self.perObject(lambda frame: mcanhash.McanHash(0x4d549bc7))
+            , 'States'       : self.perObject(lambda frame: states.States())
+            }
+    for name, size in sizes.items():
+      self.assertLessEqual(size, BUDGET[name], name)
+
+  def test_decodeBudget(self):
+    decoders = [mcandecode.McanDecode(frame) for frame in self.frames]
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for msg in decoders:
+      msg.decode(record=True)
+    current, peak = tracemalloc.get_traced_memory()
+    self.assertLessEqual(peak - base, DECODE_PEAK)
+    self.assertLessEqual(current - base, DECODE_RETAINED)
+
+  def test_lazyNames(self):
+    # eigener Prozess: andere Tests haben die Namen bereits geladen
+    script = ( 'import sys\n'
+               'from mcan import mcandecode\n'
+               'mcandecode.McanDecode(bytes.fromhex("{}")).decode(record=True)\n'
+               'print("mcan.mcannames" in sys.modules)\n'
+               'mcandecode.McanDecode.commandName(0x30)\n'
+               'print("mcan.mcannames" in sys.modules)\n').format(PING.hex())
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run( [sys.executable, '-c', script], cwd=root
+                        , capture_output=True, text=True, check=True).stdout
+    self.assertEqual(out.split(), ['False', 'True'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,121 @@
+""" Tests fuer die Verwaltung der Rueckmelder-Zustaende (states)
+
+    Author: Rainer Maier-Lohmann
+    ---------------------------------------------------------------------------
+    "THE BEER-WARE LICENSE" (Revision 42):
+    <r.m-l@gmx.de> wrote this file.  As long as you retain this notice you
+    can do whatever you want with this stuff. If we meet some day, and you
+    think this stuff is worth it, you can buy me a beer in return.
+    ---------------------------------------------------------------------------
+    (C) 2021
+"""
+import unittest
+import sys
+sys.path.insert(0, "../")
+
+from mcan import states, mcancommand
+
+class StatesTest(unittest.TestCase):
+
+  def test_States(self):
+    st = states.States()
+    st.setStateBits(0b1000000000011010)
+    self.assertTrue(st.isChanged)
+    self.assertEqual(st.shortStr, '0101100000000001')
+    self.assertEqual(st.changedStates, [[2, 1, 0], [4, 1, 0], [5, 1, 0], [16, 1, 0]])
+    st.setRecentToCurrent()
+    st.setStateBitOff(16)
+    st.setStateBitOn(1)
+    self.assertEqual(st.getStateBit(16), (0, 1))
+    self.assertEqual(st.changedStates, [[1, 1, 0], [16, 0, 1]])
+
+  def test_StateBank(self):
+    bank = states.StateBank(64)
+    self.assertEqual(len(bank), 1024)
+    self.assertFalse(bank.isChanged)
+    bank.setState(1000, 1)
+    bank.setWords(2, [0x8001, 0x0002])
+    self.assertEqual(bank.getWord(2), 0x8001)
+    self.assertEqual(bank.changedStates, [[17, 1, 0], [32, 1, 0], [34, 1, 0], [1000, 1, 0]])
+    bank.setRecentToCurrent()
+    self.assertFalse(bank.isChanged)
+    self.assertEqual(bank.getState(1000), (1, 1))
+    bank.setState(1000, 0)
+    bank.setWord(3, 0x0002)
+    self.assertEqual(bank.changedStates, [[1000, 0, 1]])
+    bank.setState(1000, 1)
+    self.assertFalse(bank.isChanged)
+
+  def test_ContactHistory(self):
+    bank = states.StateBank(2)
+    history = states.ContactHistory(32, depth=4, debounceOn=0.02, debounceOff=0.1, bank=bank)
+    # Prellen kuerzer als die Entprellzeit
+    self.assertFalse(history.update(5, 1, 1.0))
+    self.assertFalse(history.update(5, 0, 1.005))
+    self.assertFalse(history.update(5, 1, 1.01))
+    self.assertFalse(bank.isChanged)
+    self.assertTrue(history.update(5, 1, 1.03))
+    self.assertEqual(history.getState(5), (1, 0))
+    self.assertEqual(bank.changedStates, [[5, 1, 0]])
+    self.assertFalse(history.update(5, 0, 1.5))
+    self.assertEqual(history.poll(1.55), [])
+    self.assertEqual(history.poll(1.6), [[5, 0, 1]])
+    history.update(5, 1, 2.0)
+    history.update(20, 1, 2.0)
+    self.assertEqual(history.poll(2.02), [[5, 1, 0], [20, 1, 0]])
+    self.assertEqual(history.history(5), [(1.01, 1), (1.5, 0), (2.0, 1)])
+    self.assertEqual(history.occupiedTime(5, 0, 3.0), 0.49 + 1.0)
+    self.assertEqual(history.occupiedTime(5, 1.2, 2.1), 0.3 + 0.1)
+    self.assertEqual(history.occupiedSince(5, 2.5), 0.5)
+    self.assertEqual(history.occupiedSince(6, 2.5), 0)
+    # der Ringpuffer behaelt die letzten depth Eintraege
+    history.setDebounce(5, 0, 0)
+    for ms in range(3000, 3004):
+      history.update(5, ms & 1, ms / 1000)
+    self.assertEqual(history.history(5), [(3.0, 0), (3.001, 1), (3.002, 0), (3.003, 1)])
+    self.assertFalse(hasattr(history, '__dict__'))
+    with self.assertRaises(ValueError):
+      history.setDebounce(5, 0, 70)
+    with self.assertRaises(ValueError):
+      states.ContactHistory(4, debounceOn=-1)
+    history.setDebounce(5, states.MAXDEBOUNCE, 0)
+    self.assertFalse(hasattr(bank, '__dict__'))
+
+  def test_packTrackStates(self):
+    modules = [states.States(), states.States()]
+    modules[0].setStateBitOn(3)
+    modules[1].setStateBitOn(14)
+    buf = bytearray(3 * 13)
+    with self.assertRaises(ValueError):
+      mcancommand.packTrackStates(bytearray(13), 0, modules, 0, 0xcb7f)
+    self.assertTrue(modules[0].isChanged)
+    count = mcancommand.packTrackStates(buf, 13, modules, 0, 0xcb7f, commit=True)
+    self.assertEqual(count, 2)
+    self.assertEqual(buf[13:26], bytes.fromhex('00 22 cb 7f 08 00 00 00 03 00 01 00 00'))
+    self.assertEqual(buf[26:39], bytes.fromhex('00 22 cb 7f 08 00 00 00 1e 00 01 00 00'))
+    self.assertFalse(modules[0].isChanged)
+    self.assertFalse(modules[1].isChanged)
+
+    # nur die geschriebenen Kontakte werden als gesendet markiert
+    bank = states.StateBank(2)
+    bank.setState(3, 1)
+    changes = bank.changedStates
+    bank.setState(20, 1)
+    for contact, state, _ in changes:
+      bank.setRecentState(contact, state)
+    self.assertEqual(bank.changedStates, [[20, 1, 0]])
+    self.assertEqual(len(mcancommand.trackStateFrames(bank, 0, 0xcb7f, commit=True)), 13)
+    self.assertFalse(bank.isChanged)
+    modules[1].setStateBitOff(14)
+    modules[1].setStateBitOn(2)
+    modules[1].setRecentStateBit(2, 1)
+    self.assertEqual(modules[1].changedStates, [[14, 0, 1]])
+
+    bank = states.StateBank(4)
+    bank.setWord(2, 0x0001)
+    frames = mcancommand.trackStateFrames(bank, 5, 0xcb7f, response=True)
+    self.assertEqual(frames, bytes.fromhex('00 23 cb 7f 08 00 05 00 11 00 01 00 00'))
+    self.assertTrue(bank.isChanged)
+
+if __name__ == '__main__':
+  unittest.main()